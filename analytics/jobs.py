@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from analytics.snapshots import export_snapshot
+from jobs.models import Job
+from jobs.registry import enqueue, job
+
+
+@job('analytics.export_snapshot', concurrency=1)
+def export_snapshot_job(job: Job) -> None:
+    """
+    Export a snapshot and schedule the next one
+    """
+    path = export_snapshot()
+    job.report_progress(100, f'Exported {path.name}')
+    if not Job.objects.filter(kind=job.kind, status='queued').exists():
+        enqueue(job.kind, run_after=timezone.now() + timedelta(seconds=getattr(settings, 'ANALYTICS_SNAPSHOT_INTERVAL', 15 * 60)))
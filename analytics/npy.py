@@ -0,0 +1,61 @@
+"""
+NumPy ``.npy`` files (format 1.0) of one-dimensional little-endian
+columns, written and memory-mapped with the standard library so
+snapshots can be read with or without NumPy installed
+"""
+import ast
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Sequence
+
+MAGIC = b'\x93NUMPY\x01\x00'
+# .npy dtype -> array typecode / memoryview format
+TYPECODES = {
+    '<i8': 'q',
+    '<i4': 'i',
+    '<f8': 'd',
+    '|b1': 'b',
+    '<M8[D]': 'q',
+    '<M8[s]': 'q',
+}
+
+
+def write_column(path: Path, dtype: str, values: array) -> None:
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    header = repr({'descr': dtype, 'fortran_order': False, 'shape': (len(values),)}).encode('latin1')
+    # Data starts on a 64 byte boundary, the header ending in a newline
+    padding = -(len(MAGIC) + 2 + len(header) + 1) % 64
+    header += b' ' * padding + b'\n'
+    with open(path, 'wb') as file:
+        file.write(MAGIC + struct.pack('<H', len(header)) + header)
+        values.tofile(file)
+
+
+def read_column(path: Path) -> Sequence:
+    """
+    The column memory-mapped read only: nothing is read from disk until
+    it is used and the pages are shared between processes
+    """
+    with open(path, 'rb') as file:
+        prefix = file.read(len(MAGIC) + 2)
+        if prefix[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not a version 1.0 .npy file')
+        header_length, = struct.unpack('<H', prefix[len(MAGIC):])
+        header = ast.literal_eval(file.read(header_length).decode('latin1'))
+        typecode = TYPECODES[header['descr']]
+        length, = header['shape']
+        offset = len(prefix) + header_length
+        if not length:
+            return array(typecode)
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)[offset:offset + length * array(typecode).itemsize]
+    if sys.byteorder != 'little':
+        values = array(typecode, view.tobytes())
+        values.byteswap()
+        return values
+    return view.cast(typecode)
@@ -0,0 +1,65 @@
+"""
+Reports aggregated from the current snapshot instead of the live tables
+"""
+import datetime
+from collections import defaultdict
+from typing import Optional
+
+from analytics.snapshots import Snapshot, date_value, datetime_value
+
+
+def current_snapshot(snapshot: Optional[Snapshot] = None) -> Snapshot:
+    snapshot = snapshot or Snapshot.current()
+    if snapshot is None:
+        raise LookupError('No analytics snapshot has been exported yet')
+    return snapshot
+
+
+def budgets_by_month(snapshot: Optional[Snapshot] = None, status: Optional[str] = 'approved') -> dict[datetime.date, dict]:
+    """
+    Number of events, expected budgets and estimated costs by the month
+    the events start in, for events in ``status`` or all of them
+    """
+    events = current_snapshot(snapshot)['events']
+    wanted = events.categories('_status').index(status) if status in events.categories('_status') else None
+    if status is not None and wanted is None:
+        return {}
+    months = defaultdict(lambda: {'events': 0, 'expected_budget': 0.0, 'estimated_cost': 0.0})
+    for code, month, budget, cost in zip(events['_status'], events['from_month'], events['expected_budget'], events['estimated_cost']):
+        if wanted is not None and code != wanted:
+            continue
+        totals = months[date_value(month)]
+        totals['events'] += 1
+        totals['expected_budget'] += budget
+        if cost == cost:  # not NaN
+            totals['estimated_cost'] += cost
+    return dict(sorted(months.items(), key=lambda item: (item[0] is None, item[0])))
+
+
+def recruitment_by_department(snapshot: Optional[Snapshot] = None) -> dict[str, dict[str, int]]:
+    """
+    Number of recruitment requests by department and status
+    """
+    recruitments = current_snapshot(snapshot)['recruitments']
+    departments, statuses = recruitments.categories('requesting_department'), recruitments.categories('_status')
+    counts = defaultdict(lambda: defaultdict(int))
+    for department, status in zip(recruitments['requesting_department'], recruitments['_status']):
+        counts[departments[department]][statuses[status]] += 1
+    return {department: dict(by_status) for department, by_status in sorted(counts.items())}
+
+
+def task_throughput_by_subteam(snapshot: Optional[Snapshot] = None) -> dict[str, dict[tuple[int, int], int]]:
+    """
+    Number of tasks approved by each subteam group per ISO week
+    """
+    snapshot = current_snapshot(snapshot)
+    tasks, groups = snapshot['tasks'], snapshot['groups']
+    group_names = dict(zip(groups['id'], groups.decoded('name')))
+    throughput = defaultdict(lambda: defaultdict(int))
+    for group_id, closed_at in zip(tasks['group_id'], tasks['closed_at']):
+        closed = datetime_value(closed_at)
+        if closed is None:
+            continue
+        year, week, _ = closed.isocalendar()
+        throughput[group_names.get(group_id, str(group_id))][year, week] += 1
+    return {name: dict(sorted(weeks.items())) for name, weeks in sorted(throughput.items())}
@@ -0,0 +1,256 @@
+import datetime
+import json
+import math
+import os
+import shutil
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.utils import timezone
+
+from analytics.npy import read_column, write_column
+from archive.archiver import ARCHIVED_MODELS
+from archive.models import ArchivedRecord
+from events.models import Event
+from financial.models import FinancialRequest
+from staff.models import Recruitment
+from tasks.models import Task
+
+BATCH_SIZE = 10000
+CURRENT = 'CURRENT'
+MANIFEST = 'manifest.json'
+EPOCH = datetime.date(1970, 1, 1)
+# Missing integers, dates and datetimes, which NumPy reads as NaT
+NULL = -2 ** 63
+# kind -> (.npy dtype, array typecode)
+KINDS = {
+    'int': ('<i8', 'q'),
+    'float': ('<f8', 'd'),
+    'bool': ('|b1', 'b'),
+    'date': ('<M8[D]', 'q'),
+    'datetime': ('<M8[s]', 'q'),
+    # Codes into the column's categories in the manifest, -1 for none
+    'category': ('<i4', 'i'),
+}
+
+
+@dataclass(frozen=True)
+class SnapshotTable:
+    name: str
+    model: type[models.Model]
+    columns: dict[str, str]
+
+
+TABLES = [
+    SnapshotTable('events', Event, {
+        'id': 'int', '_status': 'category', 'client_id': 'int', 'project_id': 'int', 'event_type': 'category',
+        'from_date': 'date', 'to_date': 'date', 'from_month': 'date', 'attendes': 'int', 'amenities': 'int',
+        'expected_budget': 'float', 'estimated_cost': 'float', 'closed_at': 'datetime',
+    }),
+    SnapshotTable('tasks', Task, {
+        'id': 'int', '_status': 'category', 'group_id': 'int', 'assigned_to_id': 'int', 'project_id': 'int',
+        'priority': 'category', 'closed_at': 'datetime',
+    }),
+    SnapshotTable('financial_requests', FinancialRequest, {
+        'id': 'int', '_status': 'category', 'requesting_department': 'category', 'project_id': 'int',
+        'required_amount': 'float', 'anomaly_score': 'float', 'closed_at': 'datetime',
+    }),
+    SnapshotTable('recruitments', Recruitment, {
+        'id': 'int', '_status': 'category', 'requesting_department': 'category', 'contract_type': 'category',
+        'years_of_experience': 'int', 'closed_at': 'datetime',
+    }),
+    SnapshotTable('groups', Group, {'id': 'int', 'name': 'category'}),
+]
+
+
+def snapshot_directory() -> Path:
+    return Path(getattr(settings, 'ANALYTICS_SNAPSHOT_DIR', settings.BASE_DIR / 'data' / 'snapshots'))
+
+
+def encode(kind: str, value, categories: dict) -> float:
+    if kind == 'category':
+        if value is None:
+            return -1
+        return categories.setdefault(value, len(categories))
+    if value is None:
+        return math.nan if kind == 'float' else NULL
+    if kind == 'float':
+        return float(value)
+    if kind == 'date':
+        return (value - EPOCH).days
+    if kind == 'datetime':
+        return math.floor(value.timestamp())
+    return int(value)
+
+
+def archived_rows(table: SnapshotTable, batch_size: int):
+    """
+    The archived records of the table's model in primary key batches,
+    as rows of the primary key and the columns
+    """
+    fields = {field.attname: field for field in table.model._meta.concrete_fields}
+    content_type = ContentType.objects.get_for_model(table.model)
+    last_pk = 0
+    while True:
+        batch = list(
+            ArchivedRecord.objects.filter(content_type=content_type, pk__gt=last_pk)
+            .order_by('pk').values_list('pk', 'object_id', 'data')[:batch_size]
+        )
+        if not batch:
+            break
+        yield [
+            (object_id, *(
+                object_id if fields[name].primary_key else fields[name].to_python(data.get(fields[name].name))
+                for name in table.columns
+            ))
+            for _, object_id, data in batch
+        ]
+        last_pk = batch[-1][0]
+
+
+def export_table(table: SnapshotTable, directory: Path, batch_size: int) -> dict:
+    """
+    Write every column of a table, reading it in short primary key
+    batches so no long read transaction is held against the writers.
+    Archived records are part of the table, so reports over closed
+    records keep their history.
+    """
+    names = list(table.columns)
+    columns = {name: array(KINDS[kind][1]) for name, kind in table.columns.items()}
+    categories = {name: {} for name, kind in table.columns.items() if kind == 'category'}
+    rows = 0
+    # A record archived while the table is read is exported only once
+    seen = set()
+
+    def add(batch: list) -> None:
+        nonlocal rows
+        for position, name in enumerate(names, start=1):
+            kind, column, column_categories = table.columns[name], columns[name], categories.get(name)
+            column.extend(encode(kind, row[position], column_categories) for row in batch)
+        rows += len(batch)
+
+    last_pk = 0
+    while True:
+        batch = list(
+            table.model._base_manager.filter(pk__gt=last_pk).order_by('pk').values_list('pk', *names)[:batch_size]
+        )
+        if not batch:
+            break
+        add(batch)
+        seen.update(row[0] for row in batch)
+        last_pk = batch[-1][0]
+    if table.model._meta.label in ARCHIVED_MODELS:
+        for batch in archived_rows(table, batch_size):
+            add([row for row in batch if row[0] not in seen])
+
+    (directory / table.name).mkdir()
+    manifest = {'rows': rows, 'columns': {}}
+    for name, kind in table.columns.items():
+        dtype = KINDS[kind][0]
+        write_column(directory / table.name / f'{name}.npy', dtype, columns[name])
+        manifest['columns'][name] = {'kind': kind, 'dtype': dtype}
+        if kind == 'category':
+            manifest['columns'][name]['categories'] = list(categories[name])
+    return manifest
+
+
+def export_snapshot(directory: Optional[Path] = None, batch_size: int = BATCH_SIZE) -> Path:
+    """
+    Write a new snapshot of every table and make it the current one.
+    It is written under a temporary name and renamed when complete, so
+    readers never see a partial snapshot.
+    """
+    directory = directory or snapshot_directory()
+    created_at = timezone.now()
+    name = created_at.strftime('%Y%m%dT%H%M%S%fZ')
+    partial = directory / f'.{name}.partial'
+    partial.mkdir(parents=True)
+    try:
+        manifest = {'created_at': created_at.isoformat(), 'tables': {}}
+        for table in TABLES:
+            manifest['tables'][table.name] = export_table(table, partial, batch_size)
+        (partial / MANIFEST).write_text(json.dumps(manifest))
+        partial.rename(directory / name)
+    except BaseException:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+    pointer = directory / f'.{CURRENT}.partial'
+    pointer.write_text(name)
+    os.replace(pointer, directory / CURRENT)
+    prune(directory, keep=max(1, getattr(settings, 'ANALYTICS_SNAPSHOT_KEEP', 3)))
+    return directory / name
+
+
+def prune(directory: Path, keep: int) -> None:
+    """
+    Delete all but the newest ``keep`` snapshots. Readers that still map
+    the files of a deleted one keep reading them until they let go.
+    """
+    snapshots = sorted(path for path in directory.iterdir() if path.is_dir() and not path.name.startswith('.'))
+    for path in snapshots[:-keep]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class Table:
+    """
+    A snapshot table whose columns are memory-mapped on first use
+    """
+    def __init__(self, path: Path, manifest: dict):
+        self.path = path
+        self.rows = manifest['rows']
+        self.manifest = manifest['columns']
+        self.columns = {}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, name: str):
+        if name not in self.columns:
+            if name not in self.manifest:
+                raise KeyError(f'{self.path.name} has no column {name}')
+            self.columns[name] = read_column(self.path / f'{name}.npy')
+        return self.columns[name]
+
+    def categories(self, name: str) -> list:
+        return self.manifest[name]['categories']
+
+    def decoded(self, name: str) -> list:
+        """
+        The values of a category column
+        """
+        categories = self.categories(name)
+        return [categories[code] if code >= 0 else None for code in self[name]]
+
+
+class Snapshot:
+    def __init__(self, path: Path):
+        self.path = path
+        manifest = json.loads((path / MANIFEST).read_text())
+        self.created_at = datetime.datetime.fromisoformat(manifest['created_at'])
+        self.tables = {name: Table(path / name, table) for name, table in manifest['tables'].items()}
+
+    def __getitem__(self, name: str) -> Table:
+        return self.tables[name]
+
+    @classmethod
+    def current(cls, directory: Optional[Path] = None) -> Optional['Snapshot']:
+        directory = directory or snapshot_directory()
+        try:
+            name = (directory / CURRENT).read_text().strip()
+        except FileNotFoundError:
+            return None
+        return cls(directory / name)
+
+
+def date_value(days: int) -> Optional[datetime.date]:
+    return None if days == NULL else EPOCH + datetime.timedelta(days=days)
+
+
+def datetime_value(seconds: int) -> Optional[datetime.datetime]:
+    return None if seconds == NULL else datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc)
@@ -0,0 +1,164 @@
+import datetime
+import math
+import shutil
+import tempfile
+from array import array
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from analytics import reports
+from analytics.npy import read_column, write_column
+from analytics.snapshots import NULL, Snapshot, date_value, datetime_value, export_snapshot
+from archive.archiver import archive_closed
+from events.models import Event
+from staff.models import Recruitment
+from tasks.models import Task
+
+def create_event(from_date: str, budget: int, **kwargs) -> Event:
+    """
+    Create an event pending approval
+    """
+    fields = {
+        'client_name': 'Test Client',
+        'event_type': 'Wedding',
+        'from_date': from_date,
+        'to_date': from_date,
+        'attendes': 100,
+        'expected_budget': budget,
+    }
+    fields.update(kwargs)
+    return Event.objects.create(**fields)
+
+class NpyTestCase(TestCase):
+    def setUp(self) -> None:
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_round_trip(self):
+        """
+        Test that columns read back memory-mapped with the values they were written with
+        """
+        for dtype, values in (
+            ('<i8', array('q', [1, -2, NULL, 2 ** 40])),
+            ('<f8', array('d', [0.5, math.inf, -1.25])),
+            ('<i4', array('i', [0, 7, -1])),
+            ('|b1', array('b', [1, 0, 1])),
+            ('<i8', array('q')),
+        ):
+            path = self.directory / 'column.npy'
+            write_column(path, dtype, values)
+            self.assertEqual(list(read_column(path)), list(values))
+
+    def test_npy_layout(self):
+        """
+        Test that files follow the .npy 1.0 layout, with the data aligned to 64 bytes
+        """
+        path = self.directory / 'column.npy'
+        write_column(path, '<M8[D]', array('q', [19000, 19001]))
+        data = path.read_bytes()
+        self.assertEqual(data[:8], b'\x93NUMPY\x01\x00')
+        header_length = int.from_bytes(data[8:10], 'little')
+        self.assertEqual((10 + header_length) % 64, 0)
+        self.assertIn(b"'descr': '<M8[D]'", data[10:10 + header_length])
+        self.assertIn(b"'shape': (2,)", data[10:10 + header_length])
+        self.assertEqual(len(data), 10 + header_length + 16)
+
+class SnapshotTestCase(TestCase):
+    def setUp(self) -> None:
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.settings = override_settings(ANALYTICS_SNAPSHOT_DIR=self.directory, ANALYTICS_SNAPSHOT_KEEP=2)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+    def test_export_and_reports(self):
+        """
+        Test that reports aggregate the snapshot, not the tables changed after it
+        """
+        create_event('2024-05-03', 1000, _status='approved')
+        create_event('2024-05-20', 500, _status='approved')
+        create_event('2024-06-01', 700, _status='approved')
+        create_event('2024-06-02', 9000)
+        user = User.objects.create(username='requester')
+        for department in ('admin', 'admin', 'production'):
+            Recruitment.objects.create(
+                requester=user, requesting_department=department, years_of_experience=1, job_title='Test',
+            )
+        group = Group.objects.create(name='Subteam Audio')
+        task = Task.objects.create(project_ref='P-1', description='Test', sender=user, group=group, _status='approved')
+        Task.objects.filter(pk=task.pk).update(closed_at=timezone.make_aware(datetime.datetime(2024, 5, 8, 12)))
+        Task.objects.create(project_ref='P-1', description='Test', sender=user, group=group)
+
+        export_snapshot(batch_size=2)
+        create_event('2024-05-04', 100000, _status='approved')
+
+        self.assertEqual(reports.budgets_by_month(), {
+            datetime.date(2024, 5, 1): {'events': 2, 'expected_budget': 1500.0, 'estimated_cost': 0.0},
+            datetime.date(2024, 6, 1): {'events': 1, 'expected_budget': 700.0, 'estimated_cost': 0.0},
+        })
+        self.assertEqual(reports.budgets_by_month(status=None)[datetime.date(2024, 6, 1)]['events'], 2)
+        self.assertEqual(reports.recruitment_by_department(), {
+            'admin': {'pending_hr_approval': 2}, 'production': {'pending_hr_approval': 1},
+        })
+        self.assertEqual(reports.task_throughput_by_subteam(), {'Subteam Audio': {(2024, 19): 1}})
+
+    def test_archived_records_are_reported(self):
+        """
+        Test that approved events moved to the archive still count in the reports
+        """
+        archived = create_event('2021-03-10', 800, _status='approved')
+        Event.objects.filter(pk=archived.pk).update(closed_at=timezone.now() - datetime.timedelta(days=400))
+        create_event('2021-03-20', 200, _status='approved')
+        self.assertEqual(archive_closed(datetime.timedelta(days=180)), 1)
+        self.assertFalse(Event.objects.filter(pk=archived.pk).exists())
+
+        snapshot = Snapshot(export_snapshot(batch_size=1))
+        self.assertEqual(reports.budgets_by_month(snapshot), {
+            datetime.date(2021, 3, 1): {'events': 2, 'expected_budget': 1000.0, 'estimated_cost': 0.0},
+        })
+        events = snapshot['events']
+        self.assertEqual(sorted(events['id']), sorted([archived.pk, archived.pk + 1]))
+        position = list(events['id']).index(archived.pk)
+        self.assertEqual(date_value(events['from_date'][position]), datetime.date(2021, 3, 10))
+        self.assertIsNotNone(datetime_value(events['closed_at'][position]))
+
+    def test_snapshot_columns(self):
+        """
+        Test that missing values and dates survive the export
+        """
+        event = create_event('2024-05-03', 1000)
+        snapshot = Snapshot(export_snapshot())
+        events = snapshot['events']
+        self.assertEqual(len(events), 1)
+        self.assertEqual(list(events['id']), [event.pk])
+        self.assertEqual(date_value(events['from_date'][0]), datetime.date(2024, 5, 3))
+        self.assertEqual(events['closed_at'][0], NULL)
+        self.assertTrue(math.isnan(events['estimated_cost'][0]))
+        self.assertEqual(events.decoded('_status'), ['pending_senior_approval'])
+
+    def test_current_and_pruning(self):
+        """
+        Test that the newest complete snapshot is current and only the newest ones are kept
+        """
+        self.assertIsNone(Snapshot.current())
+        with self.assertRaises(LookupError):
+            reports.budgets_by_month()
+        paths = [export_snapshot() for _ in range(3)]
+        self.assertEqual(Snapshot.current().path, paths[-1])
+        self.assertEqual(sorted(path for path in self.directory.iterdir() if path.is_dir()), paths[1:])
+
+    def test_command(self):
+        """
+        Test that the command exports a snapshot or queues the periodic job
+        """
+        output = StringIO()
+        call_command('export_snapshot', stdout=output)
+        self.assertIn('0 events', output.getvalue())
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('export_snapshot', '--schedule', stdout=output)
+        self.assertIn('Queued the periodic snapshot export', output.getvalue())
@@ -0,0 +1,52 @@
+import json
+
+from django.contrib import admin
+from django.utils.html import format_html
+
+from archive.models import ArchivedRecord
+
+
+class ArchivedRecordAdmin(admin.ModelAdmin):
+    """
+    Read-only view over the archived records of every workflow
+    """
+    list_display = (
+        'summary',
+        'content_type',
+        'object_id',
+        'status',
+        'closed_at',
+    )
+    list_filter = (
+        'content_type',
+        'status',
+    )
+    search_fields = (
+        'summary',
+    )
+    date_hierarchy = 'closed_at'
+    fields = (
+        'content_type',
+        'object_id',
+        'summary',
+        'status',
+        'closed_at',
+        'archived_at',
+        'record',
+    )
+    readonly_fields = fields
+
+    @admin.display(description='Archived record')
+    def record(self, obj: ArchivedRecord) -> str:
+        return format_html('<pre>{}</pre>', json.dumps(obj.data, indent=2, ensure_ascii=False))
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+admin.site.register(ArchivedRecord, ArchivedRecordAdmin)
@@ -0,0 +1,142 @@
+import time
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core import serializers
+from django.db import models, transaction
+from django.db.models import Max
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from archive.models import ArchivedRecord
+
+# Workflow models that are archived, with the fields making up the
+# searchable summary of an archived record
+ARCHIVED_MODELS = {
+    'events.Event': ('record_number', 'client_name'),
+    'financial.FinancialRequest': ('project_reference', 'requesting_department'),
+    'staff.Recruitment': ('job_title', 'requesting_department'),
+    'tasks.Task': ('project_ref',),
+}
+
+# Related rows deleted along with an archived record, kept in its
+# archived data under the relation's name
+ARCHIVED_RELATIONS = {
+    'events.Event': ('assignments',),
+}
+
+# Set while archive_batch deletes the rows it copied, so post_delete
+# receivers can tell archiving a record from deleting it
+archiving: ContextVar[bool] = ContextVar('archiving', default=False)
+
+
+def archive_after() -> timedelta:
+    return timedelta(days=getattr(settings, 'ARCHIVE_AFTER_DAYS', 180))
+
+
+def summarize(obj: models.Model) -> str:
+    fields = ARCHIVED_MODELS[obj._meta.label]
+    values = [str(getattr(obj, field)) for field in fields if getattr(obj, field) not in (None, '')]
+    return ' '.join(values)[:255]
+
+
+def archivable(model: type[models.Model], cutoff) -> models.QuerySet:
+    """
+    The records of ``model`` closed before ``cutoff``. An event is closed
+    once approved, which can be long before it takes place, so events
+    also have to be over by then.
+    """
+    queryset = model.objects.filter(closed_at__lt=cutoff)
+    if model._meta.label == 'events.Event':
+        queryset = queryset.filter(to_date__lt=cutoff.date())
+    return queryset
+
+
+def archived_data(obj: models.Model) -> dict:
+    data = serializers.serialize('python', [obj])[0]['fields']
+    for name in ARCHIVED_RELATIONS.get(obj._meta.label, ()):
+        data[name] = [
+            {'id': row['pk'], **row['fields']}
+            for row in serializers.serialize('python', getattr(obj, name).all())
+        ]
+    return data
+
+
+def archived_max(model: type[models.Model], field: str, after: int = 0) -> Optional[int]:
+    """
+    The largest integer ``field`` of the archived records of ``model``
+    with a primary key above ``after``
+    """
+    return ArchivedRecord.objects.filter(
+        content_type=ContentType.objects.get_for_model(model),
+        object_id__gt=after,
+    ).aggregate(last=Max(Cast(KeyTextTransform(field, 'data'), models.BigIntegerField())))['last']
+
+
+def archive_batch(model: type[models.Model], cutoff, batch_size: int) -> int:
+    """
+    Move one batch of closed records older than ``cutoff`` to the archive.
+
+    Related rows of ``ARCHIVED_RELATIONS`` are deleted with the record
+    and kept in its archived data. Copy and delete happen in one
+    transaction, so an interrupted run leaves every record either
+    archived or untouched and simply resumes on the next run.
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    with transaction.atomic():
+        batch = list(
+            archivable(model, cutoff)
+            .prefetch_related(*ARCHIVED_RELATIONS.get(model._meta.label, ()))
+            .order_by('pk')[:batch_size]
+        )
+        if not batch:
+            return 0
+        ArchivedRecord.objects.bulk_create([
+            ArchivedRecord(
+                content_type=content_type,
+                object_id=obj.pk,
+                summary=summarize(obj),
+                status=obj._status,
+                closed_at=obj.closed_at,
+                data=archived_data(obj),
+            )
+            for obj in batch
+        ], ignore_conflicts=True)
+        token = archiving.set(True)
+        try:
+            model.objects.filter(pk__in=[obj.pk for obj in batch]).delete()
+        finally:
+            archiving.reset(token)
+    return len(batch)
+
+
+def archive_closed(
+    older_than: Optional[timedelta] = None,
+    batch_size: int = 500,
+    pause: float = 0,
+    progress: Optional[Callable[[str, int], None]] = None,
+) -> int:
+    """
+    Archive every closed workflow record older than ``older_than``
+    (``ARCHIVE_AFTER_DAYS`` by default), ``batch_size`` records at a time,
+    sleeping ``pause`` seconds between batches to let approvers write
+    """
+    cutoff = timezone.now() - (older_than if older_than is not None else archive_after())
+    total = 0
+    for label in ARCHIVED_MODELS:
+        model = apps.get_model(label)
+        while True:
+            archived = archive_batch(model, cutoff, batch_size)
+            if not archived:
+                break
+            total += archived
+            if progress:
+                progress(label, archived)
+            if pause:
+                time.sleep(pause)
+    return total
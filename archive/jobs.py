@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from archive.archiver import ARCHIVED_MODELS, archive_after, archive_closed
+from jobs.models import Job
+from jobs.registry import job
+
+
+@job('archive.archive_closed', concurrency=1)
+def archive_closed_job(job: Job) -> None:
+    days = job.payload.get('days', archive_after().days)
+    labels = list(ARCHIVED_MODELS)
+    total = 0
+
+    def progress(label: str, archived: int) -> None:
+        nonlocal total
+        total += archived
+        done = labels.index(label) + 1
+        job.report_progress(100 * done // len(labels), f'Archived {total} records')
+
+    archive_closed(timedelta(days=days), batch_size=job.payload.get('batch_size', 500), progress=progress)
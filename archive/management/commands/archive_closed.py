@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from archive.archiver import archive_after, archive_closed
+
+
+class Command(BaseCommand):
+    help = 'Move closed workflow records older than ARCHIVE_AFTER_DAYS to the archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=archive_after().days,
+                            help='Archive records closed more than this many days ago')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        def progress(label: str, archived: int) -> None:
+            self.stdout.write(f'{label}: archived {archived} records')
+
+        total = archive_closed(
+            timedelta(days=options['days']),
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} records'))
@@ -0,0 +1,27 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class ArchivedRecord(models.Model):
+    """
+    A closed workflow record moved out of its hot table. The original row
+    is kept as-is in ``data`` and is never edited again.
+    """
+    content_type = models.ForeignKey('contenttypes.ContentType', on_delete=models.PROTECT)
+    object_id = models.BigIntegerField()
+    summary = models.CharField(max_length=255, db_index=True)
+    status = models.CharField(max_length=40)
+    closed_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['content_type', 'object_id'], name='archive_unique_record'),
+        ]
+        indexes = [
+            models.Index(fields=['content_type', 'closed_at'], name='archive_type_closed_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.content_type.name} {self.object_id}: {self.summary}'
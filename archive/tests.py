@@ -0,0 +1,160 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth.models import Group, User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from archive.archiver import archive_closed
+from archive.models import ArchivedRecord
+from events.models import Event
+from financial.models import FinancialRequest
+from scheduling.models import Assignment
+
+def create_event(client_name: str, status: str, closed_days_ago: int = None, date: str = '2021-01-01') -> Event:
+    """
+    Create an event, optionally closed some days ago
+    """
+    event: Event = Event.objects.create(
+        client_name=client_name,
+        event_type='Test Event',
+        from_date=date,
+        to_date=date,
+        attendes=100,
+        expected_budget=1000,
+        _status=status,
+    )
+    if closed_days_ago is not None:
+        Event.objects.filter(pk=event.pk).update(closed_at=timezone.now() - timedelta(days=closed_days_ago))
+    return event
+
+class ClosedAtTestCase(TestCase):
+    def test_closed_at_is_set_when_record_closes(self):
+        """
+        Test that closed_at is recorded once the record reaches a closed status
+        """
+        event = create_event('Test Client', 'pending_senior_final_approval')
+        self.assertIsNone(event.closed_at)
+        event.save()
+        self.assertEqual(event._status, 'approved')
+        self.assertIsNotNone(event.closed_at)
+
+    def test_rejected_event_is_closed(self):
+        """
+        Test that rejected events count as closed
+        """
+        event = create_event('Test Client', 'rejected')
+        self.assertIsNotNone(event.closed_at)
+
+class ArchiveTestCase(TestCase):
+    def test_archive_moves_only_old_closed_records(self):
+        """
+        Test that only records closed before the cutoff leave the hot table
+        """
+        old = create_event('Old Client', 'approved', closed_days_ago=400)
+        recent = create_event('Recent Client', 'approved', closed_days_ago=10)
+        pending = create_event('Pending Client', 'pending_senior_approval')
+        self.assertEqual(archive_closed(timedelta(days=180)), 1)
+        self.assertQuerysetEqual(Event.objects.order_by('pk'), [recent, pending])
+        record = ArchivedRecord.objects.get()
+        self.assertEqual(record.content_type, ContentType.objects.get_for_model(Event))
+        self.assertEqual(record.object_id, old.pk)
+        self.assertEqual(record.status, 'approved')
+        self.assertEqual(record.summary, f'{old.record_number} Old Client')
+        self.assertEqual(record.data['client_name'], 'Old Client')
+        self.assertEqual(record.data['expected_budget'], '1000.00')
+
+    def test_archive_runs_in_batches_and_resumes(self):
+        """
+        Test that archiving works through all records batch by batch
+        and a second run finds nothing left to do
+        """
+        for i in range(5):
+            create_event(f'Client {i}', 'rejected', closed_days_ago=400)
+        FinancialRequest.objects.filter(pk=FinancialRequest.objects.create(
+            requesting_department='financial',
+            project_reference='test',
+            required_amount=1000,
+            _status='approved',
+        ).pk).update(closed_at=timezone.now() - timedelta(days=400))
+        batches = []
+        total = archive_closed(timedelta(days=180), batch_size=2, progress=lambda label, n: batches.append((label, n)))
+        self.assertEqual(total, 6)
+        self.assertEqual(batches, [
+            ('events.Event', 2), ('events.Event', 2), ('events.Event', 1),
+            ('financial.FinancialRequest', 1),
+        ])
+        self.assertEqual(archive_closed(timedelta(days=180)), 0)
+        self.assertEqual(ArchivedRecord.objects.count(), 6)
+
+    def test_upcoming_events_stay(self):
+        """
+        Test that an event approved long ago is only archived once it is over
+        """
+        upcoming = create_event('Upcoming Client', 'approved', closed_days_ago=400,
+                                date=str(timezone.localdate() + timedelta(days=30)))
+        self.assertEqual(archive_closed(timedelta(days=180)), 0)
+        self.assertQuerysetEqual(Event.objects.all(), [upcoming])
+
+    def test_assignments_are_archived_with_their_event(self):
+        """
+        Test that the staff assignments of an archived event are kept in its archived record
+        """
+        event = create_event('Old Client', 'approved', closed_days_ago=400)
+        member = User.objects.create_user(username='member', password='memberpass')
+        assignment = Assignment.objects.create(event=event, member=member, group=Group.objects.create(name='Subteam'))
+        self.assertEqual(archive_closed(timedelta(days=180)), 1)
+        self.assertFalse(Assignment.objects.exists())
+        archived = ArchivedRecord.objects.get().data['assignments']
+        self.assertEqual(
+            [(row['id'], row['event'], row['member'], row['from_date']) for row in archived],
+            [(assignment.pk, event.pk, member.pk, '2021-01-01')],
+        )
+
+    def test_record_numbers_continue_after_the_archive(self):
+        """
+        Test that a new event does not reuse the record number of an archived one
+        """
+        create_event('First Client', 'approved', closed_days_ago=400)
+        last = create_event('Second Client', 'approved', closed_days_ago=400)
+        self.assertEqual(archive_closed(timedelta(days=180)), 2)
+        self.assertEqual(create_event('New Client', 'pending_senior_approval').record_number, last.record_number + 1)
+
+    def test_archive_command(self):
+        """
+        Test that the management command honours --days
+        """
+        create_event('Test Client', 'approved', closed_days_ago=30)
+        call_command('archive_closed', days=60, stdout=StringIO())
+        self.assertEqual(ArchivedRecord.objects.count(), 0)
+        call_command('archive_closed', days=7, stdout=StringIO())
+        self.assertEqual(ArchivedRecord.objects.count(), 1)
+
+class ArchiveAdminTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='admin', password='adminpass')
+        self.client.login(username='admin', password='adminpass')
+        create_event('Archived Client', 'approved', closed_days_ago=400)
+        create_event('Another Client', 'approved', closed_days_ago=400)
+        archive_closed()
+
+    def test_archive_is_searchable(self):
+        """
+        Test that archived records can be searched from the combined view
+        """
+        response = self.client.get('/archive/archivedrecord/', {'q': 'Archived'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Archived Client')
+        self.assertNotContains(response, 'Another Client')
+
+    def test_archive_is_read_only(self):
+        """
+        Test that archived records can be viewed but not changed or deleted
+        """
+        record = ArchivedRecord.objects.first()
+        response = self.client.get(f'/archive/archivedrecord/{record.pk}/change/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'name="_save"')
+        response = self.client.post(f'/archive/archivedrecord/{record.pk}/delete/', {'post': 'yes'})
+        self.assertEqual(response.status_code, 403)
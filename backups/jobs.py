@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from backups.online import online_backup
+from jobs.models import Job
+from jobs.registry import enqueue, job
+
+
+@job('backups.online_backup', concurrency=1)
+def online_backup_job(job: Job) -> None:
+    """
+    Refresh the reporting copy and schedule the next refresh
+    """
+    # No progress until the copy is done: recording it is a write to the
+    # database being copied, which would restart the copy
+    result = online_backup(settings.REPORTING_DATABASE_PATH)
+    job.report_progress(100, f'Copied {result.pages} pages, {result.restarts} restarts')
+    if not Job.objects.filter(kind=job.kind, status='queued').exists():
+        enqueue(job.kind, run_after=timezone.now() + timedelta(seconds=getattr(settings, 'BACKUP_INTERVAL', 60 * 60)))
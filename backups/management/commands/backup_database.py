@@ -0,0 +1,40 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backups.online import BackupRestarted, online_backup, source_path
+from jobs.registry import enqueue_once
+
+
+class Command(BaseCommand):
+    help = 'Copy the SQLite database without blocking writers, by default to the read-only reporting copy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', type=Path, help='Where to write the copy instead of REPORTING_DATABASE_PATH')
+        parser.add_argument('--pages', type=int, help='Pages copied per step')
+        parser.add_argument('--pause', type=float, help='Seconds to wait between steps')
+        parser.add_argument('--schedule', action='store_true',
+                            help='Queue a background refresh of the reporting copy every BACKUP_INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            enqueue_once('backups.online_backup')
+            self.stdout.write(self.style.SUCCESS('Queued the periodic reporting copy refresh'))
+            return
+        try:
+            source = source_path()
+        except ValueError as error:
+            raise CommandError(str(error))
+        started = time.perf_counter()
+        try:
+            result = online_backup(
+                options['output'] or settings.REPORTING_DATABASE_PATH, source, options['pages'], options['pause'],
+            )
+        except BackupRestarted as error:
+            raise CommandError(f'{error}, try again when the database is less busy')
+        seconds = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Copied {result.pages} pages to {result.path} in {seconds:.2f}s with {result.restarts} restarts'
+        ))
@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Pages copied per step; between steps the source is not locked
+PAGES = 256
+PAUSE = 0.05
+# Every write to the source by another connection restarts the copy.
+# After a restart the pause is doubled, and after this many restarts the
+# backup gives up rather than copy the rest in one step, which would
+# lock out writers until it is done.
+MAX_RESTARTS = 5
+
+
+class BackupRestarted(Exception):
+    pass
+
+
+@dataclass
+class BackupResult:
+    path: Path
+    pages: int
+    restarts: int
+
+
+def source_path(alias: str = DEFAULT_DB_ALIAS) -> str:
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        raise ValueError(f'The online backup needs SQLite, {alias} is {connection.vendor}')
+    return str(connection.settings_dict['NAME'])
+
+
+def online_backup(
+    target: Path,
+    source: Optional[str] = None,
+    pages: Optional[int] = None,
+    pause: Optional[float] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> BackupResult:
+    """
+    Copy the database with SQLite's online backup API, ``pages`` pages
+    at a time with a ``pause`` between steps so writers are never held
+    up for long. The copy is consistent, written under a temporary name
+    and then read-only, replacing ``target`` in one rename. Raises
+    :class:`BackupRestarted` when writes restarted the copy more than
+    ``MAX_RESTARTS`` times.
+    """
+    source = source or source_path()
+    pages = pages or getattr(settings, 'BACKUP_PAGES', PAGES)
+    pause = getattr(settings, 'BACKUP_PAUSE', PAUSE) if pause is None else pause
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(f'.{target.name}.partial')
+    partial.unlink(missing_ok=True)
+
+    restarts = 0
+    last_remaining = None
+
+    def step(status: int, remaining: int, total: int) -> None:
+        nonlocal restarts, last_remaining
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > MAX_RESTARTS:
+                raise BackupRestarted(f'Writes restarted the backup more than {MAX_RESTARTS} times')
+        last_remaining = remaining
+        if progress is not None:
+            progress(total - remaining, total)
+        # The source is unlocked between steps. The backup's own sleep
+        # only applies when a step finds it busy, so pause here.
+        if remaining and pause:
+            time.sleep(pause * 2 ** restarts)
+
+    with closing(sqlite3.connect(source, uri=source.startswith('file:'))) as source_connection:
+        try:
+            with closing(sqlite3.connect(partial)) as target_connection:
+                source_connection.backup(target_connection, pages=pages, progress=step, sleep=max(pause, 0.001))
+        except BackupRestarted:
+            partial.unlink(missing_ok=True)
+            raise
+    with closing(sqlite3.connect(partial)) as target_connection:
+        # Readable without a -wal or -shm file next to it
+        target_connection.execute('PRAGMA journal_mode=DELETE')
+        copied_pages, = target_connection.execute('PRAGMA page_count').fetchone()
+        check, = target_connection.execute('PRAGMA quick_check').fetchone()
+    if check != 'ok':
+        partial.unlink()
+        raise sqlite3.DatabaseError(f'The backup failed its integrity check: {check}')
+    os.chmod(partial, 0o444)
+    os.replace(partial, target)
+    return BackupResult(target, copied_pages, restarts)
@@ -0,0 +1,72 @@
+import functools
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPORTING_DB_ALIAS = 'reporting'
+
+reading_reports: ContextVar[bool] = ContextVar('reading_reports', default=False)
+
+
+def reporting_copy_exists() -> bool:
+    path = getattr(settings, 'REPORTING_DATABASE_PATH', None)
+    return path is not None and REPORTING_DB_ALIAS in settings.DATABASES and os.path.exists(path)
+
+
+@contextmanager
+def reporting_reads():
+    """
+    Read from the reporting copy, if there is one, inside the block
+    """
+    token = reading_reports.set(True)
+    try:
+        yield
+    finally:
+        reading_reports.reset(token)
+
+
+def reporting_view(view):
+    """
+    Serve GET and HEAD requests of a view from the reporting copy. Other
+    requests may act on what they read and keep reading the live data.
+    Template responses are rendered before leaving the copy, as their
+    querysets are only evaluated then.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        with reporting_reads():
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        return response
+    return wrapper
+
+
+class ReportingRouter:
+    """
+    Sends the reads of reporting views to the read-only copy made by
+    ``manage.py backup_database`` and everything else to the default
+    database, which is the only one written and migrated
+    """
+    def db_for_read(self, model, **hints):
+        if reading_reports.get() and reporting_copy_exists():
+            return REPORTING_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPORTING_DB_ALIAS}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPORTING_DB_ALIAS:
+            return False
+        return None
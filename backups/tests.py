@@ -0,0 +1,159 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import closing
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from backups.online import MAX_RESTARTS, BackupRestarted, online_backup
+from backups.routers import ReportingRouter, reporting_reads
+from events.models import Event
+from jobs.models import Job
+
+def create_source(path: Path, rows: int) -> None:
+    """
+    Create an SQLite database of ``rows`` rows spread over many pages
+    """
+    with closing(sqlite3.connect(path)) as connection:
+        connection.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, payload TEXT)')
+        connection.executemany('INSERT INTO item (payload) VALUES (?)', [('x' * 500,)] * rows)
+        connection.commit()
+
+def count_rows(path: Path) -> int:
+    with closing(sqlite3.connect(f'{path.as_uri()}?mode=ro', uri=True)) as connection:
+        return connection.execute('SELECT COUNT(*) FROM item').fetchone()[0]
+
+class OnlineBackupTestCase(TestCase):
+    def setUp(self) -> None:
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.source = self.directory / 'source.sqlite3'
+        create_source(self.source, 1000)
+
+    def test_incremental_copy(self):
+        """
+        Test that the copy is made in steps, is complete and replaces the previous copy read-only
+        """
+        target = self.directory / 'copy.sqlite3'
+        steps = []
+        result = online_backup(target, str(self.source), pages=10, pause=0, progress=lambda done, total: steps.append(done))
+        self.assertGreater(len(steps), 10)
+        self.assertEqual(result.restarts, 0)
+        self.assertEqual(count_rows(target), 1000)
+        self.assertFalse(os.stat(target).st_mode & 0o222)
+        self.assertEqual(sorted(path.name for path in self.directory.iterdir()), ['copy.sqlite3', 'source.sqlite3'])
+
+    def test_writes_during_copy(self):
+        """
+        Test that writers are not blocked by the copy, which backs off after a restart and completes
+        """
+        target = self.directory / 'copy.sqlite3'
+        writer = sqlite3.connect(self.source)
+        self.addCleanup(writer.close)
+        steps = []
+
+        def write(done: int, total: int) -> None:
+            steps.append(done)
+            if len(steps) in (2, 6):
+                writer.execute('INSERT INTO item (payload) VALUES (?)', ('y',))
+                writer.commit()
+
+        with mock.patch('backups.online.time.sleep') as sleep:
+            result = online_backup(target, str(self.source), pages=10, pause=0.01, progress=write)
+        self.assertEqual(result.restarts, 2)
+        self.assertEqual(max(call.args[0] for call in sleep.call_args_list), 0.04)
+        self.assertEqual(count_rows(target), 1002)
+
+    def test_gives_up_instead_of_blocking_writers(self):
+        """
+        Test that a copy restarted too often fails without locking the source for a full copy
+        """
+        target = self.directory / 'copy.sqlite3'
+        writer = sqlite3.connect(self.source, timeout=0)
+        self.addCleanup(writer.close)
+
+        def write(done: int, total: int) -> None:
+            writer.execute('INSERT INTO item (payload) VALUES (?)', ('y',))
+            writer.commit()
+
+        with self.assertRaisesMessage(BackupRestarted, f'more than {MAX_RESTARTS} times'):
+            online_backup(target, str(self.source), pages=10, pause=0, progress=write)
+        self.assertEqual(sorted(path.name for path in self.directory.iterdir()), ['source.sqlite3'])
+        with self.assertRaises(CommandError), override_settings(REPORTING_DATABASE_PATH=target), \
+                mock.patch('backups.management.commands.backup_database.online_backup', side_effect=BackupRestarted('busy')):
+            call_command('backup_database', stdout=StringIO())
+
+    def test_command(self):
+        """
+        Test that the command refreshes the reporting copy or queues the periodic refresh
+        """
+        target = self.directory / 'reporting.sqlite3'
+        output = StringIO()
+        with override_settings(REPORTING_DATABASE_PATH=target):
+            call_command('backup_database', '--pages', '5', stdout=output)
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('backup_database', '--schedule', stdout=output)
+        self.assertIn('0 restarts', output.getvalue())
+        self.assertTrue(target.exists())
+        self.assertTrue(Job.objects.filter(kind='backups.online_backup').exists())
+
+class ReportingRouterTestCase(TestCase):
+    databases = {'default', 'reporting'}
+
+    def setUp(self) -> None:
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        self.copy = directory / 'reporting.sqlite3'
+
+    def test_routing(self):
+        """
+        Test that only reads inside reporting_reads go to the copy, and only once it exists
+        """
+        router = ReportingRouter()
+        with override_settings(REPORTING_DATABASE_PATH=self.copy):
+            with reporting_reads():
+                self.assertIsNone(router.db_for_read(Event))
+            self.copy.touch()
+            with reporting_reads():
+                self.assertEqual(router.db_for_read(Event), 'reporting')
+                self.assertEqual(router.db_for_write(Event), 'default')
+            self.assertIsNone(router.db_for_read(Event))
+        self.assertFalse(router.allow_migrate('reporting', 'events'))
+        self.assertIsNone(router.allow_migrate('default', 'events'))
+
+    def use_copy(self) -> None:
+        """
+        Point the reporting connection, a mirror of the test database, at a copy of it
+        """
+        online_backup(self.copy)
+        reporting = connections['reporting']
+        # The mirror shares its settings with the default connection
+        mirrored = reporting.settings_dict
+        reporting.close()
+        reporting.settings_dict = {**mirrored, 'NAME': f'{self.copy.as_uri()}?mode=ro'}
+
+        def restore() -> None:
+            reporting.close()
+            reporting.settings_dict = mirrored
+        self.addCleanup(restore)
+
+    def test_reporting_view(self):
+        """
+        Test that the project summary is read from the reporting copy
+        """
+        self.use_copy()
+        user = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(user)
+        with override_settings(REPORTING_DATABASE_PATH=self.copy), \
+                CaptureQueriesContext(connections['reporting']) as reporting:
+            response = self.client.get('/projects/project/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('projects_project' in query['sql'] for query in reporting.captured_queries))
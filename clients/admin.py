@@ -0,0 +1,113 @@
+from django.contrib import admin, messages
+from django.db.models import Count, Max, Min, Sum, Value
+from django.db.models.functions import Concat
+from django.db.models.query import QuerySet
+from django.http import HttpRequest
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
+
+from clients.models import Client
+from clients.registry import canonical, merge_clients, normalize_name, similar_clients
+from events.models import Event
+
+
+class EventHistoryInline(admin.TabularInline):
+    """
+    Every event of the client, newest first
+    """
+    model = Event
+    fk_name = 'client'
+    fields = ('record_number', 'client_name', 'event_type', 'from_date', 'to_date', 'expected_budget', '_status')
+    readonly_fields = fields
+    ordering = ('-from_date', '-id')
+    show_change_link = True
+    extra = 0
+    verbose_name_plural = 'history'
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class ClientAdmin(admin.ModelAdmin):
+    list_display = (
+        'name',
+        'normalized_name',
+        'event_count',
+        'merged_into',
+    )
+    search_fields = (
+        'normalized_name',
+    )
+    fields = (
+        'name',
+        'normalized_name',
+        'merged_into',
+        'summary',
+        'similar',
+    )
+    readonly_fields = (
+        'normalized_name',
+        'merged_into',
+        'summary',
+        'similar',
+    )
+    inlines = [EventHistoryInline]
+    actions = ['merge']
+
+    def get_queryset(self, request: HttpRequest) -> QuerySet[Client]:
+        return super().get_queryset(request).select_related('merged_into').annotate(event_count=Count('events'))
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Prefix match on the normalized name, as an index range scan
+        """
+        term = normalize_name(search_term)
+        if not term:
+            return queryset, False
+        return queryset.filter(
+            normalized_name__gte=term,
+            normalized_name__lt=Concat(Value(term), Value(chr(0x10FFFF))),
+        ), False
+
+    @admin.display(description='Events', ordering='event_count')
+    def event_count(self, obj: Client) -> int:
+        return obj.event_count
+
+    @admin.display(description='Summary')
+    def summary(self, obj: Client) -> str:
+        totals = obj.events.aggregate(
+            count=Count('id'), budget=Sum('expected_budget'), first=Min('from_date'), last=Max('from_date'),
+        )
+        if not totals['count']:
+            return 'No events'
+        return f"{totals['count']} events from {totals['first']} to {totals['last']}, {totals['budget']} total budget"
+
+    @admin.display(description='Possible duplicates')
+    def similar(self, obj: Client) -> str:
+        matches = similar_clients(obj)
+        if not matches:
+            return '-'
+        return format_html_join(', ', '<a href="{}">{}</a> ({}%)', (
+            (reverse('admin:clients_client_change', args=[client.pk]), client.name, round(similarity * 100))
+            for client, similarity in matches
+        ))
+
+    @admin.action(description='Merge selected clients into the oldest one')
+    def merge(self, request: HttpRequest, queryset: QuerySet[Client]) -> None:
+        clients = list(queryset.order_by('created_at', 'id'))
+        if len(clients) < 2:
+            self.message_user(request, 'Select at least two clients to merge.', messages.WARNING)
+            return
+        target, duplicates = clients[0], clients[1:]
+        moved = merge_clients(target, duplicates)
+        self.message_user(request, format_html(
+            'Merged {} clients into {}, moving {} events.', len(duplicates), canonical(target).name, moved,
+        ))
+
+admin.site.register(Client, ClientAdmin)
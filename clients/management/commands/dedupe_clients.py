@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from clients.models import Client
+from clients.registry import link_events, merge_clients, similar_clients
+
+
+class Command(BaseCommand):
+    help = 'Link events to clients and report or merge duplicate clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--threshold', type=float, default=0.5,
+                            help='Trigram similarity above which clients are reported as duplicates')
+        parser.add_argument('--merge', nargs='+', type=int, metavar='CLIENT_ID',
+                            help='Merge the clients with these ids into the first one')
+
+    def handle(self, *args, **options):
+        if options['merge']:
+            self.merge(options['merge'])
+            return
+
+        linked = link_events(options['batch_size'], progress=lambda n: self.stdout.write(f'Linked {n} events'))
+        self.stdout.write(self.style.SUCCESS(f'Linked {linked} events to clients'))
+
+        reported = set()
+        for client in Client.objects.filter(merged_into__isnull=True).order_by('id').iterator(options['batch_size']):
+            for other, similarity in similar_clients(client, options['threshold']):
+                pair = frozenset({client.pk, other.pk})
+                if pair in reported:
+                    continue
+                reported.add(pair)
+                self.stdout.write(f'{client.pk} {client.name!r} ~ {other.pk} {other.name!r} ({similarity:.0%})')
+
+    def merge(self, client_ids: list[int]) -> None:
+        clients = Client.objects.in_bulk(client_ids)
+        missing = set(client_ids) - set(clients)
+        if missing:
+            raise CommandError(f'Unknown clients: {", ".join(map(str, sorted(missing)))}')
+        target = clients[client_ids[0]]
+        moved = merge_clients(target, [clients[pk] for pk in client_ids[1:]])
+        self.stdout.write(self.style.SUCCESS(f'Merged {len(client_ids) - 1} clients into {target}, moving {moved} events'))
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Client',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('normalized_name', models.CharField(max_length=255, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('merged_into', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='duplicates', to='clients.client')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ClientTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='clients.client')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='clienttrigram',
+            constraint=models.UniqueConstraint(fields=('trigram', 'client'), name='client_trigram_unique'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import models
+
+
+class Client(models.Model):
+    """
+    A client events are organised for. Names that normalize the same
+    belong to one client; merged duplicates point at the client they
+    were merged into so their spellings keep resolving to it.
+    """
+    name = models.CharField(max_length=255)
+    normalized_name = models.CharField(max_length=255, unique=True)
+    merged_into = models.ForeignKey(
+        'self',
+        on_delete=models.PROTECT,
+        blank=True,
+        null=True,
+        related_name='duplicates',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class ClientTrigram(models.Model):
+    """
+    Trigram index over normalized client names, used to find likely
+    duplicates with an index lookup on any database backend
+    """
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='trigrams')
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['trigram', 'client'], name='client_trigram_unique'),
+        ]
@@ -0,0 +1,132 @@
+import re
+import unicodedata
+from typing import Callable, Iterable, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+
+from clients.models import Client, ClientTrigram
+
+# Legal form suffixes that do not tell clients apart
+LEGAL_SUFFIXES = frozenset({
+    'ab', 'ag', 'co', 'corp', 'corporation', 'gmbh', 'inc', 'incorporated',
+    'limited', 'llc', 'ltd', 'oy', 'plc', 'sa',
+})
+
+
+def normalize_name(name: str) -> str:
+    """
+    "ACME Inc.", "Acme" and " acme " all normalize to "acme"
+    """
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c for c in name if not unicodedata.combining(c)).casefold()
+    words = re.sub(r'[^\w]+', ' ', name).split()
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return ' '.join(words)[:255]
+
+
+def trigrams(normalized_name: str) -> set[str]:
+    padded = f'  {normalized_name} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def canonical(client: Client) -> Client:
+    while client.merged_into_id is not None:
+        client = client.merged_into
+    return client
+
+
+def client_for_name(name: str) -> Client:
+    """
+    The client a free-text client name belongs to, created on first use
+    """
+    normalized_name = normalize_name(name)
+    client = Client.objects.select_related('merged_into').filter(normalized_name=normalized_name).first()
+    if client is None:
+        try:
+            with transaction.atomic():
+                client = Client.objects.create(name=name.strip(), normalized_name=normalized_name)
+                ClientTrigram.objects.bulk_create(
+                    [ClientTrigram(client=client, trigram=trigram) for trigram in trigrams(normalized_name)]
+                )
+        except IntegrityError:
+            # Created by a concurrent request in the meantime
+            client = Client.objects.get(normalized_name=normalized_name)
+    return canonical(client)
+
+
+def similar_clients(client: Client, threshold: float = 0.5, limit: int = 10) -> list[tuple[Client, float]]:
+    """
+    Clients whose normalized names share at least ``threshold`` of their
+    trigrams with ``client`` (Jaccard similarity), most similar first
+    """
+    own = trigrams(client.normalized_name)
+    candidates = (
+        ClientTrigram.objects.filter(trigram__in=own, client__merged_into__isnull=True)
+        .exclude(client=client)
+        .values('client')
+        .annotate(shared=Count('id'))
+        .order_by('-shared')[:limit * 5]
+    )
+    sizes = dict(
+        ClientTrigram.objects.filter(client__in=[c['client'] for c in candidates])
+        .values_list('client').annotate(size=Count('id')).order_by()
+    )
+    scored = [
+        (c['client'], c['shared'] / (len(own) + sizes[c['client']] - c['shared']))
+        for c in candidates
+    ]
+    scored = sorted((s for s in scored if s[1] >= threshold), key=lambda s: -s[1])[:limit]
+    clients = Client.objects.in_bulk([client_id for client_id, _ in scored])
+    return [(clients[client_id], similarity) for client_id, similarity in scored]
+
+
+def merge_clients(target: Client, duplicates: Iterable[Client]) -> int:
+    """
+    Move the events of ``duplicates`` to ``target``, or to the client it
+    was merged into, and keep the duplicates as aliases of it. Returns the
+    number of events moved.
+    """
+    from events.models import Event
+    # A target that is itself an alias merges into the client it resolves
+    # to; the aliases on the way there must not point back at themselves
+    chain = {target.pk}
+    while target.merged_into_id is not None:
+        target = target.merged_into
+        chain.add(target.pk)
+    duplicate_ids = [d.pk for d in duplicates if d.pk not in chain]
+    with transaction.atomic():
+        moved = Event.objects.filter(client_id__in=duplicate_ids).update(client=target)
+        # Aliases of the duplicates now resolve to the target directly
+        Client.objects.filter(merged_into_id__in=duplicate_ids).exclude(pk=target.pk).update(merged_into=target)
+        Client.objects.filter(pk__in=duplicate_ids).exclude(pk=target.pk).update(merged_into=target)
+    return moved
+
+
+def link_events(batch_size: int = 500, progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Attach events without a client to one, streaming over them in
+    primary key batches
+    """
+    from events.models import Event
+    linked = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            Event.objects.filter(pk__gt=last_pk, client__isnull=True)
+            .order_by('pk').only('client_name')[:batch_size]
+        )
+        if not batch:
+            return linked
+        clients = {}
+        for event in batch:
+            if event.client_name not in clients:
+                clients[event.client_name] = client_for_name(event.client_name)
+            event.client = clients[event.client_name]
+        # Plain UPDATEs: linking is bookkeeping, not a workflow change
+        Event.objects.bulk_update(batch, ['client'])
+        linked += len(batch)
+        last_pk = batch[-1].pk
+        if progress:
+            progress(linked)
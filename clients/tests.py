@@ -0,0 +1,130 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from clients.models import Client
+from clients.registry import client_for_name, merge_clients, normalize_name, similar_clients
+from events.models import Event
+
+def create_event(client_name: str) -> Event:
+    """
+    Create a pending event
+    """
+    return Event.objects.create(
+        client_name=client_name,
+        event_type='Test Event',
+        from_date='2021-01-01',
+        to_date='2021-01-01',
+        attendes=100,
+        expected_budget=1000,
+    )
+
+class ClientRegistryTestCase(TestCase):
+    def test_normalize_name(self):
+        """
+        Test that case, punctuation, accents and legal suffixes are ignored
+        """
+        self.assertEqual(normalize_name('ACME Inc.'), 'acme')
+        self.assertEqual(normalize_name('  acme '), 'acme')
+        self.assertEqual(normalize_name('Café Nord AB'), 'cafe nord')
+        self.assertEqual(normalize_name('Inc'), 'inc')
+
+    def test_events_share_client(self):
+        """
+        Test that events with differently written names of one client get the same client
+        """
+        events = [create_event(name) for name in ('Acme', 'ACME Inc', 'acme')]
+        self.assertEqual(Client.objects.count(), 1)
+        self.assertEqual({event.client_id for event in events}, {events[0].client_id})
+        self.assertEqual(events[0].client.name, 'Acme')
+        with self.assertNumQueries(1):
+            self.assertEqual(Event.objects.filter(client=events[0].client).count(), 3)
+
+    def test_renaming_moves_event(self):
+        """
+        Test that changing the client name of an event moves it to the other client
+        """
+        event = create_event('Acme')
+        event = Event.objects.get(pk=event.pk)
+        event.client_name = 'Globex'
+        event.save()
+        self.assertEqual(event.client.normalized_name, 'globex')
+
+    def test_similar_clients(self):
+        """
+        Test that names sharing most trigrams are reported as likely duplicates
+        """
+        acme = client_for_name('Acme Events')
+        client_for_name('Acme Event')
+        client_for_name('Globex')
+        self.assertEqual([c.name for c, _ in similar_clients(acme)], ['Acme Event'])
+
+    def test_merge(self):
+        """
+        Test that merging moves the events and keeps the duplicate name resolving to the target
+        """
+        create_event('Acme')
+        create_event('The Acme Company')
+        acme = Client.objects.get(normalized_name='acme')
+        duplicate = Client.objects.get(normalized_name='the acme company')
+        self.assertEqual(merge_clients(acme, [duplicate]), 1)
+        self.assertEqual(acme.events.count(), 2)
+        self.assertEqual(create_event('The ACME Company Ltd').client, acme)
+
+    def test_merge_into_merged_client(self):
+        """
+        Test that merging into a client already merged away uses the client it resolves to
+        """
+        create_event('Acme')
+        create_event('The Acme Company')
+        acme = Client.objects.get(normalized_name='acme')
+        duplicate = Client.objects.get(normalized_name='the acme company')
+        merge_clients(duplicate, [acme])
+        acme.refresh_from_db()
+        merge_clients(acme, [acme, duplicate])
+        acme.refresh_from_db()
+        duplicate.refresh_from_db()
+        self.assertIsNone(duplicate.merged_into_id)
+        self.assertEqual(acme.merged_into, duplicate)
+        self.assertEqual(create_event('Acme').client, duplicate)
+        self.assertEqual(duplicate.events.count(), 3)
+
+
+class DedupeCommandTestCase(TestCase):
+    def test_links_existing_events(self):
+        """
+        Test that events saved before the registry are linked in batches and duplicates reported
+        """
+        for name in ('Acme Events', 'ACME EVENTS', 'Acme Event'):
+            create_event(name)
+        Event.objects.update(client=None)
+        Client.objects.all().delete()
+        output = StringIO()
+        call_command('dedupe_clients', batch_size=2, stdout=output)
+        self.assertIn('Linked 3 events to clients', output.getvalue())
+        self.assertIn("'Acme Events' ~", output.getvalue())
+        self.assertFalse(Event.objects.filter(client__isnull=True).exists())
+        self.assertEqual(Client.objects.count(), 2)
+
+        first, second = Client.objects.order_by('id')
+        call_command('dedupe_clients', merge=[first.pk, second.pk], stdout=output)
+        self.assertEqual(first.events.count(), 3)
+
+
+class ClientHistoryTestCase(TestCase):
+    def test_history(self):
+        """
+        Test that the client page lists the events of the client and its summary
+        """
+        user = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(user)
+        event = create_event('Acme')
+        create_event('Acme Inc')
+        response = self.client.get(f'/clients/client/{event.client_id}/change/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Acme Inc')
+        self.assertContains(response, '2 events from 2021-01-01 to 2021-01-01')
+        response = self.client.get('/clients/client/', {'q': 'ACM'})
+        self.assertEqual(list(response.context['cl'].result_list), [event.client])
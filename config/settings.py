@@ -47,6 +47,18 @@ INSTALLED_APPS = [
     'tasks',
     'staff',
     'financial',
+    'workflow',
+    'archive',
+    'roles',
+    'outbox',
+    'jobs',
+    'notifications',
+    'live',
+    'clients',
+    'projects',
+    'scheduling',
+    'analytics',
+    'backups',
 ]
 
 MIDDLEWARE = [
@@ -84,13 +96,25 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Read-only copy of the database made by `manage.py backup_database`,
+# read by reporting views through backups.routers.ReportingRouter
+REPORTING_DATABASE_PATH = Path(os.environ.get('REPORTING_DATABASE_PATH', BASE_DIR / 'data' / 'reporting.sqlite3'))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'data' /' db.sqlite3',
-    }
+    },
+    'reporting': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': REPORTING_DATABASE_PATH.as_uri() + '?mode=ro',
+        'OPTIONS': {'uri': True},
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['backups.routers.ReportingRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -131,4 +155,43 @@ STATIC_URL = '/static/'
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Closed workflow records older than this are moved to the archive
+# by `manage.py archive_closed`
+
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 180))
+
+# Approver notification digests are mailed through this server
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'workflow@localhost')
+
+# Columnar snapshots of the workflow tables that reports read instead of
+# the live tables; `manage.py export_snapshot --schedule` keeps them fresh
+ANALYTICS_SNAPSHOT_DIR = os.environ.get('ANALYTICS_SNAPSHOT_DIR', BASE_DIR / 'data' / 'snapshots')
+ANALYTICS_SNAPSHOT_INTERVAL = int(os.environ.get('ANALYTICS_SNAPSHOT_INTERVAL', 15 * 60))
+ANALYTICS_SNAPSHOT_KEEP = int(os.environ.get('ANALYTICS_SNAPSHOT_KEEP', 3))
+
+# The online backup copies this many pages per step and pauses between
+# steps, so writers wait at most for one step
+BACKUP_PAGES = int(os.environ.get('BACKUP_PAGES', 256))
+BACKUP_PAUSE = float(os.environ.get('BACKUP_PAUSE', 0.05))
+BACKUP_INTERVAL = int(os.environ.get('BACKUP_INTERVAL', 60 * 60))
+
+# `manage.py test` restores a snapshot of the migrated test database kept
+# in TEST_SNAPSHOT_DIR instead of migrating, hashes passwords with the
+# fast TEST_PASSWORD_HASHERS and runs TEST_PARALLEL processes
+TEST_RUNNER = 'workflow.testing.FastTestRunner'
+TEST_SNAPSHOT_DIR = os.environ.get('TEST_SNAPSHOT_DIR', BASE_DIR / 'data' / 'test_snapshots')
+TEST_PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+TEST_PARALLEL = os.environ.get('TEST_PARALLEL', 'auto')
+TEST_REPORT_SLOWEST = int(os.environ.get('TEST_REPORT_SLOWEST', 10))
+
+# Each process looks for event features stored by the others at most
+# this often when finding similar past events
+SIMILARITY_REFRESH_SECONDS = int(os.environ.get('SIMILARITY_REFRESH_SECONDS', 30))
+
+# Outbox ids skipped by a consumer because their transaction had not
+# committed yet are read again for this many seconds
+OUTBOX_GAP_WINDOW = int(os.environ.get('OUTBOX_GAP_WINDOW', 60))
@@ -1,9 +1,26 @@
+import datetime
+import re
+from typing import Optional
 from django.contrib import admin
 from django import forms
 from django.contrib.auth.models import User
-from events.models import Event
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.db.models.functions import Upper
+from django.http import HttpRequest, JsonResponse
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from events.models import Amenity, Event, RateCard
+from events.similarity import similar_events
+from jobs.registry import enqueue_once
+from live.admin import LiveQueueMixin
+from roles.models import Role
+from roles.registry import has_role
+from workflow.admin import VersionedAdminMixin, prefix_search
+from workflow.filters import FacetCountFieldListFilter
+from workflow.forms import VersionedModelForm
 
-class EventAdminForm(forms.ModelForm):
+class EventAdminForm(VersionedModelForm):
     approval = forms.ChoiceField(choices=[
         ('approved', 'Approve'),
         ('rejected', 'Reject'),
@@ -15,29 +32,163 @@ class EventAdminForm(forms.ModelForm):
         
 
 
-class EventAdmin(admin.ModelAdmin):
+# "4711", "#4711", "R4711" or "R-4711"
+RECORD_NUMBER_RE = re.compile(r'^(#|r-?)?(\d{1,18})$', re.IGNORECASE)
+
+class AmenityFilter(admin.ListFilter):
+    """
+    Filters on any combination of wanted and unwanted amenities through
+    the packed ``amenities`` column
+    """
+    title = 'amenities'
+    with_parameter = 'amenities_with'
+    without_parameter = 'amenities_without'
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        for parameter in self.expected_parameters():
+            if parameter in params:
+                self.used_parameters[parameter] = params.pop(parameter)
+
+    def mask(self, parameter: str) -> int:
+        value = self.used_parameters.get(parameter, '0')
+        return int(value) & Amenity.mask(Amenity) if value.isdigit() else 0
+
+    def has_output(self):
+        return True
+
+    def expected_parameters(self):
+        return [self.with_parameter, self.without_parameter]
+
+    def queryset(self, request, queryset):
+        include, exclude = self.mask(self.with_parameter), self.mask(self.without_parameter)
+        return queryset.with_amenities(include, exclude)
+
+    def choices(self, changelist):
+        include, exclude = self.mask(self.with_parameter), self.mask(self.without_parameter)
+        yield {
+            'selected': not include and not exclude,
+            'query_string': changelist.get_query_string(remove=self.expected_parameters()),
+            'display': 'All',
+        }
+        for amenity in Amenity:
+            label = amenity.field_name.replace('_', ' & ')
+            for selected, display, new_include, new_exclude in (
+                (bool(include & amenity), f'With {label}', include ^ amenity, exclude & ~amenity),
+                (bool(exclude & amenity), f'Without {label}', include & ~amenity, exclude ^ amenity),
+            ):
+                # Clicking a selected choice clears it again
+                yield {
+                    'selected': selected,
+                    'query_string': changelist.get_query_string(
+                        {self.with_parameter: new_include, self.without_parameter: new_exclude},
+                    ),
+                    'display': display,
+                }
+
+
+class EventAdmin(VersionedAdminMixin, LiveQueueMixin, admin.ModelAdmin):
     form = EventAdminForm
-    list_display = ['record_number', 'client_name', '_status']
+    list_display = ['record_number', 'client_name', 'expected_budget', 'estimated_cost', '_status']
     search_fields = ['record_number', 'client_name']
-    readonly_fields = ['_status',]
-    list_filter = ['_status',]
+    readonly_fields = ['_status', 'cost_estimate', 'similar_past_events']
+    list_filter = [('_status', FacetCountFieldListFilter), AmenityFilter]
+
+    class Media:
+        js = LiveQueueMixin.Media.js + ('events/similar.js',)
 
     def get_readonly_fields(self, request, obj=None):
         user: User = request.user
         if user.is_superuser:
-            return []
+            return ['cost_estimate', 'similar_past_events']
         return self.readonly_fields
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('similar/', self.admin_site.admin_view(self.similar_view), name='%s_%s_similar' % info),
+        ] + super().get_urls()
+
+    def similar_view(self, request: HttpRequest) -> JsonResponse:
+        """
+        The approved events nearest to the event described by the query
+        string, which carries the change form's own field names. Also
+        served to users who may only add events, for the add form.
+        """
+        if not (self.has_add_permission(request) or self.has_view_permission(request)):
+            raise PermissionDenied
+        params = request.GET
+        try:
+            attendes = int(params.get('attendes') or 0)
+            from_date = datetime.date.fromisoformat(params['from_date']) if params.get('from_date') else None
+            to_date = datetime.date.fromisoformat(params['to_date']) if params.get('to_date') else None
+            exclude = int(params['exclude']) if params.get('exclude') else None
+        except ValueError:
+            return JsonResponse({'error': 'Invalid attendees, dates or event'}, status=400)
+        days = (to_date - from_date).days + 1 if from_date and to_date else 1
+        amenities = Amenity.mask(amenity for amenity in Amenity if params.get(amenity.field_name) in ('on', 'true', '1'))
+        return JsonResponse({'results': similar_events(params.get('event_type', ''), attendes, days, amenities, exclude=exclude)})
+
+    @admin.display(description='Similar past events')
+    def similar_past_events(self, obj: Optional[Event]) -> str:
+        """
+        Rendered for the saved event and refreshed by similar.js as the
+        form is edited
+        """
+        results = []
+        if obj is not None and obj.pk is not None:
+            results = similar_events(
+                obj.event_type, int(obj.attendes), (obj.duration_days or 0) + 1, obj.amenities, exclude=obj.pk,
+            )
+        items = format_html_join('', '<li>{} {} ({}, {} attendees, {} days): {}</li>', (
+            (f"#{result['record_number']}", result['client_name'], result['event_type'],
+             result['attendes'], result['days'], result['approved_budget'])
+            for result in results
+        )) or format_html('<li>{}</li>', 'No similar approved events')
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return format_html(
+            '<ul id="similar-events" data-url="{}" data-exclude="{}">{}</ul>',
+            reverse('admin:%s_%s_similar' % info), obj.pk if obj is not None and obj.pk else '', items,
+        )
+
+    @admin.display(description='Cost estimate')
+    def cost_estimate(self, obj: Optional[Event]) -> str:
+        if obj is None or obj.pk is None:
+            return 'Estimated when the event is saved'
+        if obj.estimated_cost is None:
+            return 'No rate card in effect'
+        if not obj.estimated_cost:
+            return f'{obj.estimated_cost}'
+        ratio = obj.expected_budget / obj.estimated_cost
+        return f'{obj.estimated_cost} at current rates; the expected budget is {ratio:.0%} of it'
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Record numbers are looked up by equality and client names by
+        prefix, both through an index instead of a LIKE '%term%' scan
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        match = RECORD_NUMBER_RE.match(search_term)
+        if match and match.group(1):
+            return queryset.filter(record_number=int(match.group(2))), False
+        client_name = prefix_search('client_name', 'client_name_upper', search_term)
+        queryset = queryset.alias(client_name_upper=Upper('client_name'))
+        if match:
+            return queryset.filter(client_name | Q(record_number=int(match.group(2)))), False
+        return queryset.filter(client_name), False
     
     def has_change_permission(self, request, obj=None):
         if obj:
             user = request.user
-            if user.groups.filter(name='Customer Service').exists() and obj._status != 'created':
+            if has_role(user, Role.CUSTOMER_SERVICE) and obj._status != 'created':
                 return False
-            elif user.groups.filter(name='Senior Customer Service').exists() and obj._status not in ['pending_senior_approval', 'pending_senior_approval_last']:
+            elif has_role(user, Role.SENIOR_CUSTOMER_SERVICE) and obj._status not in ['pending_senior_approval', 'pending_senior_approval_last']:
                 return False
-            elif user.groups.filter(name='Financial Manager').exists() and obj._status != 'pending_finance_approval':
+            elif has_role(user, Role.FINANCIAL_MANAGER) and obj._status != 'pending_finance_approval':
                 return False
-            elif user.groups.filter(name='Administration Manager').exists() and obj._status != 'pending_admin_approval':
+            elif has_role(user, Role.ADMINISTRATION_MANAGER) and obj._status != 'pending_admin_approval':
                 return False
         return super().has_change_permission(request, obj)
     
@@ -47,4 +198,16 @@ class EventAdmin(admin.ModelAdmin):
             obj._status = 'rejected'
         super().save_model(request, obj, form, change)
 
-admin.site.register(Event, EventAdmin)
\ No newline at end of file
+admin.site.register(Event, EventAdmin)
+
+
+class RateCardAdmin(admin.ModelAdmin):
+    list_display = ['valid_from', 'per_event', 'per_attendee_day', 'meals_per_attendee_day', 'drinks_per_attendee_day']
+    ordering = ['-valid_from']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        enqueue_once('events.reprice')
+        self.message_user(request, 'Events will be re-estimated with the new rates in the background.')
+
+admin.site.register(RateCard, RateCardAdmin)
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save
 
 
 class EventsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'events'
+
+    def ready(self):
+        from events.models import Event
+        from events.similarity import index_approved
+        post_save.connect(index_approved, sender=Event, dispatch_uid='events_index_approved')
@@ -0,0 +1,9 @@
+from events.pricing import reprice_events
+from jobs.models import Job
+from jobs.registry import job
+
+
+@job('events.reprice', concurrency=1)
+def reprice_job(job: Job) -> None:
+    repriced = reprice_events()
+    job.report_progress(100, f'Re-estimated {repriced} events')
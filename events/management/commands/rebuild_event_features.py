@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events.similarity import BATCH_SIZE, rebuild_features
+
+
+class Command(BaseCommand):
+    help = 'Recompute the similarity features of every approved event'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stored = rebuild_features(batch_size=options['batch_size'])
+        seconds = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Stored the features of {stored} events in {seconds:.2f}s'))
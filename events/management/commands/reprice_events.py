@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events.pricing import BATCH_SIZE, reprice_events
+
+
+class Command(BaseCommand):
+    help = 'Re-estimate the cost of every event with the current rate card'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        repriced = reprice_events(batch_size=options['batch_size'])
+        seconds = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Re-estimated {repriced} events in {seconds:.2f}s ({repriced / seconds if seconds else 0:.0f} events/s)'
+        ))
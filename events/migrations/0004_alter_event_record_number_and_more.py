@@ -0,0 +1,23 @@
+# Generated by Django 4.2.6 on 2026-10-19 01:38
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_event_closed_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='record_number',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(django.db.models.functions.text.Upper('client_name'), name='event_client_name_upper_idx'),
+        ),
+    ]
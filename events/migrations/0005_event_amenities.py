@@ -0,0 +1,41 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:02
+
+from django.db import migrations, models
+from django.db.models import F
+
+AMENITY_BITS = {
+    'decorations': 1,
+    'meals': 2,
+    'drinks': 4,
+    'photos_filming': 8,
+    'parties': 16,
+}
+
+
+def set_amenities(apps, schema_editor):
+    """
+    Pack the amenity booleans of existing events, one UPDATE per amenity
+    """
+    Event = apps.get_model('events', 'Event')
+    for field, bit in AMENITY_BITS.items():
+        Event.objects.filter(**{field: True}).update(amenities=F('amenities').bitor(bit))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_alter_event_record_number_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='amenities',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(set_amenities, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['_status', 'from_date', 'amenities'], name='event_status_date_amenity_idx'),
+        ),
+    ]
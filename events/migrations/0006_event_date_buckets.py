@@ -0,0 +1,66 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:04
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def set_date_buckets(apps, schema_editor):
+    """
+    Fill the date buckets of existing events in primary key batches,
+    each committed on its own so writers are not locked out for long
+    """
+    Event = apps.get_model('events', 'Event')
+    last_pk = 0
+    while True:
+        batch = list(
+            Event.objects.filter(pk__gt=last_pk).order_by('pk').only('from_date', 'to_date')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        for event in batch:
+            iso_year, iso_week, _ = event.from_date.isocalendar()
+            event.from_month = event.from_date.replace(day=1)
+            event.from_week = iso_year * 100 + iso_week
+            event.duration_days = (event.to_date - event.from_date).days
+        Event.objects.bulk_update(batch, ['from_month', 'from_week', 'duration_days'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('events', '0005_event_amenities'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='duration_days',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='from_month',
+            field=models.DateField(blank=True, editable=False, help_text='First day of the month of from_date', null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='from_week',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='ISO year and week of from_date as YYYYWW', null=True),
+        ),
+        migrations.RunPython(set_date_buckets, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['_status', 'from_month'], name='event_status_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['_status', 'from_week'], name='event_status_week_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['_status', 'duration_days'], name='event_status_duration_idx'),
+        ),
+    ]
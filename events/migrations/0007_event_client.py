@@ -0,0 +1,20 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0001_initial'),
+        ('events', '0006_event_date_buckets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='client',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='events', to='clients.client'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+        ('events', '0007_event_client'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='events', to='projects.project'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_event_project'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='estimated_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.CreateModel(
+            name='RateCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valid_from', models.DateField()),
+                ('per_event', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('per_attendee_day', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('meals_per_attendee_day', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('drinks_per_attendee_day', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('parties_per_attendee', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('decorations_per_day', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('photos_filming_per_day', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-valid_from'], name='rate_card_valid_from_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_rate_card'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventFeature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.BigIntegerField(unique=True)),
+                ('record_number', models.BigIntegerField(blank=True, null=True)),
+                ('client_name', models.CharField(max_length=255)),
+                ('event_type', models.CharField(max_length=255)),
+                ('attendes', models.IntegerField()),
+                ('days', models.IntegerField()),
+                ('amenities', models.PositiveSmallIntegerField()),
+                ('approved_budget', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('vector', models.BinaryField()),
+            ],
+        ),
+    ]
@@ -1,9 +1,117 @@
+import datetime
+from enum import IntFlag
+from typing import Iterable, Union
+
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Upper
 
+from workflow.models import WorkflowModel
 
-class Event(models.Model):
-    record_number = models.BigIntegerField(blank=True, null=True)
+
+class Amenity(IntFlag):
+    """
+    Bits of ``Event.amenities``, one per amenity BooleanField
+    """
+    DECORATIONS = 1
+    MEALS = 2
+    DRINKS = 4
+    PHOTOS_FILMING = 8
+    PARTIES = 16
+
+    @property
+    def field_name(self) -> str:
+        return self.name.lower()
+
+    @classmethod
+    def mask(cls, amenities: Union[int, Iterable['Amenity']]) -> int:
+        if isinstance(amenities, int):
+            return int(amenities)
+        mask = 0
+        for amenity in amenities:
+            mask |= amenity
+        return mask
+
+
+def date_buckets(from_date: datetime.date, to_date: datetime.date) -> tuple:
+    """
+    Month, ISO week and length in days of an event
+    """
+    if from_date is None:
+        return None, None, None
+    iso_year, iso_week, _ = from_date.isocalendar()
+    duration = (to_date - from_date).days if to_date is not None else None
+    return from_date.replace(day=1), iso_year * 100 + iso_week, duration
+
+
+class EventQuerySet(models.QuerySet):
+    def with_amenities(
+        self,
+        include: Union[int, Iterable[Amenity]] = (),
+        exclude: Union[int, Iterable[Amenity]] = (),
+    ) -> 'EventQuerySet':
+        """
+        Events offering every amenity in ``include`` and none in ``exclude``,
+        as the single predicate ``amenities & (include | exclude) = include``
+        """
+        include, exclude = Amenity.mask(include), Amenity.mask(exclude)
+        if include & exclude:
+            return self.none()
+        if not include | exclude:
+            return self
+        return self.alias(amenity_bits=F('amenities').bitand(include | exclude)).filter(amenity_bits=include)
+
+    def in_month(self, year: int, month: int) -> 'EventQuerySet':
+        return self.filter(from_month=datetime.date(year, month, 1))
+
+    def in_iso_week(self, year: int, week: int) -> 'EventQuerySet':
+        return self.filter(from_week=year * 100 + week)
+
+
+class RateCard(models.Model):
+    """
+    Prices events are estimated with, from ``valid_from`` until the next
+    rate card. Amounts are per event, per attendee and day, or per day.
+    """
+    valid_from = models.DateField()
+    per_event = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    per_attendee_day = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    meals_per_attendee_day = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    drinks_per_attendee_day = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    parties_per_attendee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    decorations_per_day = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    photos_filming_per_day = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-valid_from'], name='rate_card_valid_from_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'Rates from {self.valid_from}'
+
+
+class Event(WorkflowModel):
+    closed_statuses = ('approved', 'rejected')
+
+    record_number = models.BigIntegerField(blank=True, null=True, db_index=True)
     client_name = models.CharField(max_length=255, blank=False, null=False)
+    # Resolved from client_name on save
+    client = models.ForeignKey(
+        'clients.Client',
+        on_delete=models.PROTECT,
+        blank=True,
+        null=True,
+        editable=False,
+        related_name='events',
+    )
+    project = models.ForeignKey(
+        'projects.Project',
+        on_delete=models.PROTECT,
+        blank=True,
+        null=True,
+        related_name='events',
+    )
     event_type = models.CharField(max_length=255, blank=False, null=False)
     from_date = models.DateField(blank=False, null=False)
     to_date = models.DateField(blank=False, null=False)
@@ -14,6 +122,15 @@ class Event(models.Model):
     photos_filming = models.BooleanField(default=False)
     parties = models.BooleanField(default=False)
     expected_budget = models.DecimalField(max_digits=10, decimal_places=2, blank=False, null=False)
+    # From the current rate card, see events.pricing
+    estimated_cost = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True, editable=False)
+    # The amenity booleans packed as Amenity bits, kept in sync on save
+    amenities = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Report buckets derived from the dates on save, so grouping and
+    # calendar queries range-scan an index instead of computing per row
+    from_month = models.DateField(blank=True, null=True, editable=False, help_text='First day of the month of from_date')
+    from_week = models.PositiveIntegerField(blank=True, null=True, editable=False, help_text='ISO year and week of from_date as YYYYWW')
+    duration_days = models.IntegerField(blank=True, null=True, editable=False)
 
     _status = models.CharField(max_length=40, choices=[
         ('pending_senior_approval', 'Pending Senior Customer Service Approval'),
@@ -24,18 +141,53 @@ class Event(models.Model):
         ('rejected', 'Rejected')
     ], default='pending_senior_approval')
 
+    objects = EventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(Upper('client_name'), name='event_client_name_upper_idx'),
+            models.Index(fields=['_status', 'from_date', 'amenities'], name='event_status_date_amenity_idx'),
+            models.Index(fields=['_status', 'from_month'], name='event_status_month_idx'),
+            models.Index(fields=['_status', 'from_week'], name='event_status_week_idx'),
+            models.Index(fields=['_status', 'duration_days'], name='event_status_duration_idx'),
+        ]
+
     def save(self, *args, **kwargs) -> None:
         self.move_to_next_status()
         self.set_record_number()
+        self.set_amenities()
+        self.set_date_buckets()
+        self.set_client()
+        self.set_estimated_cost()
         super(Event, self).save(*args, **kwargs)
 
+    def set_estimated_cost(self) -> None:
+        from events.pricing import estimate
+        self.estimated_cost = estimate(self)
+
+    def set_client(self) -> None:
+        loaded_values = getattr(self, '_loaded_values', None) or {}
+        if self.client_id is None or loaded_values.get('client_name') != self.client_name:
+            from clients.registry import client_for_name
+            self.client = client_for_name(self.client_name)
+
+    def set_date_buckets(self) -> None:
+        from_date = self._meta.get_field('from_date').to_python(self.from_date)
+        to_date = self._meta.get_field('to_date').to_python(self.to_date)
+        self.from_month, self.from_week, self.duration_days = date_buckets(from_date, to_date)
+
+    def set_amenities(self) -> None:
+        self.amenities = Amenity.mask(amenity for amenity in Amenity if getattr(self, amenity.field_name))
+
     def set_record_number(self) -> None:
         if self.record_number is not None:
             return
-        if Event.objects.count() == 0:
-            self.record_number = 1
-        else:
-            self.record_number = Event.objects.last().record_number + 1
+        from archive.archiver import archived_max
+        last = Event.objects.last()
+        # Archived events keep their record numbers and the newest events
+        # may all have been archived
+        archived = archived_max(Event, 'record_number', after=last.pk if last else 0)
+        self.record_number = max(last.record_number if last else 0, archived or 0) + 1
 
     def move_to_next_status(self) -> None:
         """
@@ -56,3 +208,21 @@ class Event(models.Model):
         else:
             raise Exception('Invalid status')
 
+
+class EventFeature(models.Model):
+    """
+    The similarity features of an approved event, packed as float32s.
+    Kept when the event itself is archived, so the history stays searchable.
+    """
+    event_id = models.BigIntegerField(unique=True)
+    record_number = models.BigIntegerField(blank=True, null=True)
+    client_name = models.CharField(max_length=255)
+    event_type = models.CharField(max_length=255)
+    attendes = models.IntegerField()
+    days = models.IntegerField()
+    amenities = models.PositiveSmallIntegerField()
+    approved_budget = models.DecimalField(max_digits=10, decimal_places=2)
+    vector = models.BinaryField()
+
+    def __str__(self) -> str:
+        return f'Features of event {self.record_number}'
@@ -0,0 +1,100 @@
+import datetime
+from decimal import Decimal
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Value
+from django.db.models.functions import Coalesce, Round
+from django.utils import timezone
+
+from events.models import Amenity, Event, RateCard
+
+BATCH_SIZE = 50_000
+
+
+def current_rate_card(on: Optional[datetime.date] = None) -> Optional[RateCard]:
+    on = on or timezone.localdate()
+    return RateCard.objects.filter(valid_from__lte=on).order_by('-valid_from', '-id').first()
+
+
+def estimate(event: Event, rate_card: Optional[RateCard] = None) -> Optional[Decimal]:
+    """
+    Estimated cost of a single event
+    """
+    rate_card = rate_card or current_rate_card()
+    if rate_card is None:
+        return None
+    days = (event.duration_days or 0) + 1
+    attendes = int(event.attendes)
+    amenities = Amenity(event.amenities)
+    per_attendee_day = rate_card.per_attendee_day
+    if Amenity.MEALS in amenities:
+        per_attendee_day += rate_card.meals_per_attendee_day
+    if Amenity.DRINKS in amenities:
+        per_attendee_day += rate_card.drinks_per_attendee_day
+    per_day = Decimal(0)
+    if Amenity.DECORATIONS in amenities:
+        per_day += rate_card.decorations_per_day
+    if Amenity.PHOTOS_FILMING in amenities:
+        per_day += rate_card.photos_filming_per_day
+    cost = rate_card.per_event + attendes * days * per_attendee_day + days * per_day
+    if Amenity.PARTIES in amenities:
+        cost += attendes * rate_card.parties_per_attendee
+    return cost.quantize(Decimal('0.01'))
+
+
+def estimate_expression(rate_card: RateCard):
+    """
+    :func:`estimate` as a database expression over the event columns,
+    so a whole table is priced by a single UPDATE
+    """
+    def has(amenity: Amenity):
+        # 1 when the amenity bit is set, 0 otherwise
+        return F('amenities').bitand(amenity) / Value(int(amenity))
+
+    def rate(value: Decimal):
+        return Value(value, output_field=DecimalField(max_digits=12, decimal_places=2))
+
+    days = Coalesce(F('duration_days'), Value(0)) + Value(1)
+    per_attendee_day = (
+        rate(rate_card.per_attendee_day)
+        + has(Amenity.MEALS) * rate(rate_card.meals_per_attendee_day)
+        + has(Amenity.DRINKS) * rate(rate_card.drinks_per_attendee_day)
+    )
+    per_day = (
+        has(Amenity.DECORATIONS) * rate(rate_card.decorations_per_day)
+        + has(Amenity.PHOTOS_FILMING) * rate(rate_card.photos_filming_per_day)
+    )
+    cost = (
+        rate(rate_card.per_event)
+        + F('attendes') * days * per_attendee_day
+        + days * per_day
+        + has(Amenity.PARTIES) * F('attendes') * rate(rate_card.parties_per_attendee)
+    )
+    return Round(ExpressionWrapper(cost, output_field=DecimalField(max_digits=14, decimal_places=2)), 2)
+
+
+def reprice_events(rate_card: Optional[RateCard] = None, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Re-estimate every event with ``rate_card`` (the current one by
+    default), one UPDATE per primary key range
+    """
+    rate_card = rate_card or current_rate_card()
+    if rate_card is None:
+        return 0
+    expression = estimate_expression(rate_card)
+    repriced = 0
+    last_pk = 0
+    while True:
+        boundary = list(
+            Event.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[batch_size - 1:batch_size]
+        )
+        upper = boundary[0] if boundary else None
+        with transaction.atomic():
+            batch = Event.objects.filter(pk__gt=last_pk)
+            if upper is not None:
+                batch = batch.filter(pk__lte=upper)
+            repriced += batch.update(estimated_cost=expression)
+        if upper is None:
+            return repriced
+        last_pk = upper
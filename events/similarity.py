@@ -0,0 +1,251 @@
+import heapq
+import math
+import time
+from array import array
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+
+from events.models import Amenity, Event, EventFeature
+
+AMENITY_WEIGHT = 0.5
+BATCH_SIZE = 1000
+# Seconds between checks for features stored by other processes
+REFRESH_INTERVAL = 30
+
+
+def normalize_event_type(event_type: str) -> str:
+    return ' '.join(event_type.casefold().split())
+
+
+def feature_vector(attendes: int, days: int, amenities: int) -> tuple[float, ...]:
+    """
+    Attendees and length on a log scale, so 100 against 200 attendees is as
+    far apart as 1000 against 2000, and one dimension per amenity
+    """
+    return (
+        math.log1p(max(attendes, 0)),
+        math.log1p(max(days, 1)),
+        *(AMENITY_WEIGHT if amenities & amenity else 0.0 for amenity in Amenity),
+    )
+
+
+def event_vector(event: Event) -> tuple[float, ...]:
+    return feature_vector(int(event.attendes), (event.duration_days or 0) + 1, event.amenities)
+
+
+class KDTree:
+    """
+    A k-d tree over points of equal dimension, built balanced from the
+    points loaded at once and grown by insertion afterwards
+    """
+    def __init__(self, points: Iterable[tuple[tuple[float, ...], int]] = ()):
+        self.root = self.build(list(points), 0)
+
+    def build(self, points: list, depth: int) -> Optional[list]:
+        if not points:
+            return None
+        axis = depth % len(points[0][0])
+        points.sort(key=lambda point: point[0][axis])
+        middle = len(points) // 2
+        point, key = points[middle]
+        return [point, key, axis, self.build(points[:middle], depth + 1), self.build(points[middle + 1:], depth + 1)]
+
+    def insert(self, point: tuple[float, ...], key: int) -> None:
+        if self.root is None:
+            self.root = [point, key, 0, None, None]
+            return
+        node = self.root
+        while True:
+            axis = node[2]
+            side = 3 if point[axis] < node[0][axis] else 4
+            if node[side] is None:
+                node[side] = [point, key, (axis + 1) % len(point), None, None]
+                return
+            node = node[side]
+
+    def nearest(self, point: tuple[float, ...], k: int) -> list[tuple[float, int]]:
+        """
+        The ``k`` nearest keys with their euclidean distances, nearest first
+        """
+        best: list[tuple[float, int]] = []  # max-heap of (-squared distance, key)
+
+        def visit(node):
+            if node is None:
+                return
+            node_point, key, axis = node[0], node[1], node[2]
+            distance = sum((a - b) ** 2 for a, b in zip(point, node_point))
+            if len(best) < k:
+                heapq.heappush(best, (-distance, key))
+            elif distance < -best[0][0]:
+                heapq.heapreplace(best, (-distance, key))
+            difference = point[axis] - node_point[axis]
+            near, far = (node[3], node[4]) if difference < 0 else (node[4], node[3])
+            visit(near)
+            if len(best) < k or difference ** 2 < -best[0][0]:
+                visit(far)
+
+        visit(self.root)
+        return sorted((math.sqrt(-distance), key) for distance, key in best)
+
+
+class FeatureIndex:
+    """
+    The approved events of this process, one tree per event type plus one
+    over all of them. A query first reads the features stored since the
+    last check, which this process makes after storing features itself
+    and otherwise every SIMILARITY_REFRESH_SECONDS. Replaced features are
+    deleted and stored again under a new id, so when the table holds
+    fewer rows than the index the index is reloaded.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.last_id = 0
+        self.size = None
+        self.trees: dict[str, KDTree] = {}
+        self.all = KDTree()
+        self.built = 0
+        self.inserted = 0
+        self.stale = False
+        self.checked_at = 0.0
+
+    def changed(self) -> None:
+        """
+        Check the table at the next query instead of at the next interval
+        """
+        self.stale = True
+
+    def refresh(self) -> None:
+        now = time.monotonic()
+        interval = getattr(settings, 'SIMILARITY_REFRESH_SECONDS', REFRESH_INTERVAL)
+        if self.size is not None and not self.stale and now - self.checked_at < interval:
+            return
+        self.stale = False
+        self.checked_at = now
+        stored = EventFeature.objects.aggregate(count=Count('id'), last_id=Max('id'))
+        if self.size is not None and stored['last_id'] == self.last_id and stored['count'] == self.size:
+            return
+        rows = [] if self.size is None else self.read(stored['last_id'])
+        # Insertions unbalance the trees, so they are rebuilt once they
+        # have grown by more than their built size
+        if self.size is None or self.size + len(rows) != stored['count'] or self.inserted + len(rows) > max(64, self.built):
+            self.reset()
+            self.checked_at = now
+            rows = self.read(stored['last_id'])
+            self.size = self.built = len(rows)
+            by_type: dict[str, list] = {}
+            for row_id, event_type, vector in rows:
+                by_type.setdefault(event_type, []).append((vector, row_id))
+            self.trees = {event_type: KDTree(points) for event_type, points in by_type.items()}
+            self.all = KDTree([(vector, row_id) for row_id, _, vector in rows])
+            return
+        for row_id, event_type, vector in rows:
+            self.trees.setdefault(event_type, KDTree()).insert(vector, row_id)
+            self.all.insert(vector, row_id)
+        self.inserted += len(rows)
+        self.size += len(rows)
+
+    def read(self, last_id: Optional[int]) -> list:
+        """
+        The features stored after the last one read, up to ``last_id``
+        """
+        rows = []
+        for row_id, event_type, packed in (
+            EventFeature.objects.filter(id__gt=self.last_id, id__lte=last_id or 0)
+            .order_by('id').values_list('id', 'event_type', 'vector')
+        ):
+            rows.append((row_id, event_type, tuple(array('f', bytes(packed)))))
+        self.last_id = last_id or 0
+        return rows
+
+    def nearest(self, event_type: str, vector: tuple[float, ...], k: int) -> list[tuple[float, int]]:
+        """
+        The nearest events of the same type, topped up with the nearest
+        of any type when there are fewer than ``k``
+        """
+        self.refresh()
+        found = self.trees[event_type].nearest(vector, k) if event_type in self.trees else []
+        if len(found) < k:
+            seen = {key for _, key in found}
+            found += [match for match in self.all.nearest(vector, k + len(found)) if match[1] not in seen][:k - len(found)]
+        return found
+
+
+index = FeatureIndex()
+
+
+def similar_events(event_type: str, attendes: int, days: int, amenities: int, k: int = 5, exclude: Optional[int] = None) -> list[dict]:
+    vector = feature_vector(attendes, days, amenities)
+    matches = index.nearest(normalize_event_type(event_type), vector, k + 1)
+    features = EventFeature.objects.in_bulk([key for _, key in matches])
+    results = []
+    for distance, key in matches:
+        feature = features.get(key)
+        if feature is None or feature.event_id == exclude:
+            continue
+        results.append({
+            'event_id': feature.event_id,
+            'record_number': feature.record_number,
+            'client_name': feature.client_name,
+            'event_type': feature.event_type,
+            'attendes': feature.attendes,
+            'days': feature.days,
+            'amenities': [amenity.field_name for amenity in Amenity if feature.amenities & amenity],
+            'approved_budget': str(feature.approved_budget),
+            'distance': round(distance, 3),
+        })
+    return results[:k]
+
+
+def store_features(events: Iterable[Event]) -> int:
+    """
+    Store or replace the features of approved events
+    """
+    features = [
+        EventFeature(
+            event_id=event.pk,
+            record_number=event.record_number,
+            client_name=event.client_name,
+            event_type=normalize_event_type(event.event_type),
+            attendes=int(event.attendes),
+            days=(event.duration_days or 0) + 1,
+            amenities=event.amenities,
+            approved_budget=event.expected_budget,
+            vector=array('f', event_vector(event)).tobytes(),
+        )
+        for event in events
+    ]
+    EventFeature.objects.filter(event_id__in=[f.event_id for f in features]).delete()
+    EventFeature.objects.bulk_create(features)
+    index.changed()
+    return len(features)
+
+
+def index_approved(sender, instance: Event, created: bool, raw: bool, **kwargs) -> None:
+    """
+    Add an event to the index once it is approved
+    """
+    if raw or instance._status != 'approved':
+        return
+    store_features([instance])
+
+
+def rebuild_features(batch_size: int = BATCH_SIZE) -> int:
+    """
+    Recompute the features of every approved event in primary key
+    batches. Features of archived events are kept.
+    """
+    stored = 0
+    last_pk = 0
+    while True:
+        batch = list(Event.objects.filter(pk__gt=last_pk, _status='approved').order_by('pk')[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic():
+            stored += store_features(batch)
+        last_pk = batch[-1].pk
+    return stored
@@ -0,0 +1,64 @@
+/*
+ * Refreshes the "Similar past events" panel of the event change form from
+ * the admin's similar/ endpoint as the fields it depends on are edited.
+ */
+'use strict';
+{
+    const FIELDS = ['event_type', 'attendes', 'from_date', 'to_date'];
+    const AMENITIES = ['decorations', 'meals', 'drinks', 'photos_filming', 'parties'];
+    let timer = null;
+
+    function render(panel, results) {
+        panel.replaceChildren();
+        if (!results.length) {
+            const item = document.createElement('li');
+            item.textContent = 'No similar approved events';
+            panel.appendChild(item);
+            return;
+        }
+        for (const result of results) {
+            const item = document.createElement('li');
+            item.textContent = '#' + result.record_number + ' ' + result.client_name + ' (' + result.event_type + ', '
+                + result.attendes + ' attendees, ' + result.days + ' days): ' + result.approved_budget;
+            panel.appendChild(item);
+        }
+    }
+
+    function refresh(panel) {
+        const params = new URLSearchParams();
+        for (const name of FIELDS) {
+            const input = document.getElementById('id_' + name);
+            if (input && input.value) {
+                params.set(name, input.value);
+            }
+        }
+        for (const name of AMENITIES) {
+            const input = document.getElementById('id_' + name);
+            if (input && input.checked) {
+                params.set(name, 'on');
+            }
+        }
+        if (panel.dataset.exclude) {
+            params.set('exclude', panel.dataset.exclude);
+        }
+        fetch(panel.dataset.url + '?' + params, {credentials: 'same-origin'})
+            .then(response => response.ok ? response.json() : null)
+            .then(data => data && render(panel, data.results));
+    }
+
+    window.addEventListener('load', function() {
+        const panel = document.getElementById('similar-events');
+        if (!panel) {
+            return;
+        }
+        for (const name of FIELDS.concat(AMENITIES)) {
+            const input = document.getElementById('id_' + name);
+            if (input) {
+                input.addEventListener('change', function() {
+                    clearTimeout(timer);
+                    timer = setTimeout(() => refresh(panel), 300);
+                });
+            }
+        }
+    });
+}
@@ -1,35 +1,27 @@
-from django.contrib.contenttypes.models import ContentType
+import datetime
+import random
+from decimal import Decimal
+from io import StringIO
+from django.db.models import Count
 from django.http import HttpResponse
-from django.test import TestCase
-from django.contrib.auth.models import Group, Permission, User
-from events.models import Event
-
-def create_user() -> User:
-    """
-    Create a user for testing
-    """
-    return User.objects.create_user(
-        username='testuser',
-        password='testpass',
-        is_staff=True,
-    )
-
-def create_group(group_name: str, permissions: list[str] = []) -> Group:
-    """
-    Create a group
-    """
-    group: Group = Group.objects.get_or_create(name=group_name)[0]
-    content_type: ContentType = ContentType.objects.get_for_model(Event)
-    perms: list[Permission] = Permission.objects.filter(content_type=content_type, codename__in=permissions)
-    group.permissions.set(perms)
-    return group
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from events import similarity
+from events.models import Amenity, Event, EventFeature, RateCard
+from events.pricing import estimate
+from workflow.query_plans import capture_plans
+from workflow.testing import create_group, create_user
 
 class CustomerServiceTestCase(TestCase):
-    def setUp(self):
-        self.user = create_user()
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
         group = create_group('Customer service', ["add_event"])
-        self.user.groups.add(group)
-        self.client.login(username='testuser', password='testpass')
+        cls.user.groups.add(group)
+
+    def setUp(self):
+        self.client.force_login(self.user)
 
     def test_user_has_permission_to_create_events(self):
         """
@@ -170,11 +162,14 @@ class CustomerServiceTestCase(TestCase):
 
 
 class SeniorCustomerServiceTestCase(TestCase):
-    def setUp(self):
-        self.user = create_user()
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
         group = create_group('Senior customer service', ["change_event", "view_event"])
-        self.user.groups.add(group)
-        self.client.login(username='testuser', password='testpass')
+        cls.user.groups.add(group)
+
+    def setUp(self):
+        self.client.force_login(self.user)
 
     def test_user_has_permission_to_change_events(self):
         """
@@ -463,11 +458,14 @@ class SeniorCustomerServiceTestCase(TestCase):
 
 
 class FinancialManagerTestCase(TestCase):
-    def setUp(self):
-        self.user = create_user()
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
         group = create_group('Financial manager', ["change_event", "view_event"])
-        self.user.groups.add(group)
-        self.client.login(username='testuser', password='testpass')
+        cls.user.groups.add(group)
+
+    def setUp(self):
+        self.client.force_login(self.user)
 
     def test_user_has_permission_to_change_events(self):
         """
@@ -672,11 +670,14 @@ class FinancialManagerTestCase(TestCase):
         self.assertEqual(event._status, 'rejected')
 
 class AdministrationManagerTestCase(TestCase):
-    def setUp(self):
-        self.user = create_user()
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
         group = create_group('Administration Manager', ["change_event", "view_event"])
-        self.user.groups.add(group)
-        self.client.login(username='testuser', password='testpass')
+        cls.user.groups.add(group)
+
+    def setUp(self):
+        self.client.force_login(self.user)
 
     def test_user_has_permission_to_change_events(self):
         """
@@ -884,4 +885,441 @@ class AdministrationManagerTestCase(TestCase):
         self.assertEqual(response.status_code, 403)
         self.assertEqual(Event.objects.count(), 0)
 
-    
\ No newline at end of file
+    
+class ConcurrentApprovalTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        group = create_group('Senior customer service', ["change_event", "view_event"])
+        cls.user.groups.add(group)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post_approval(self, event: Event, client_name: str, loaded_version: int) -> HttpResponse:
+        return self.client.post(f'/events/event/{event.pk}/change/', {
+            'record_number': '',
+            'client_name': client_name,
+            'event_type': 'Test Event',
+            'from_date': '2021-01-01',
+            'to_date': '2021-01-01',
+            'attendes': 100,
+            'expected_budget': 1000,
+            'approval': 'approved',
+            'loaded_version': loaded_version,
+            '_save': 'Save'
+        })
+
+    def test_change_form_carries_loaded_version(self):
+        """
+        Test that the change form remembers the version it was rendered with
+        """
+        event: Event = Event.objects.create(
+            client_name='Test Client',
+            event_type='Test Event',
+            from_date='2021-01-01',
+            to_date='2021-01-01',
+            attendes=100,
+            expected_budget=1000,
+        )
+        response = self.client.get(f'/events/event/{event.pk}/change/')
+        self.assertContains(response, 'name="loaded_version" value="0"')
+
+    def test_second_approver_gets_fresh_form(self):
+        """
+        Test that a stale approval is rejected and the form reloaded
+        instead of moving the event forward twice
+        """
+        event: Event = Event.objects.create(
+            client_name='Test Client',
+            event_type='Test Event',
+            from_date='2021-01-01',
+            to_date='2021-01-01',
+            attendes=100,
+            expected_budget=1000,
+        )
+        response = self.post_approval(event, 'First Approver', loaded_version=0)
+        self.assertEqual(response.status_code, 302)
+        response = self.post_approval(event, 'Second Approver', loaded_version=0)
+        self.assertRedirects(response, f'/events/event/{event.pk}/change/', fetch_redirect_response=False)
+        event.refresh_from_db()
+        self.assertEqual(event.client_name, 'First Approver')
+        self.assertEqual(event._status, 'pending_finance_approval')
+        self.assertEqual(event.version, 1)
+        response = self.client.get(response.url)
+        self.assertContains(response, 'changed by someone else')
+
+class EventSearchTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username='admin', password='adminpass')
+        for record_number, client_name in [(4711, 'Acme'), (14711, 'The Acme Company'), (12, '4711 Events')]:
+            Event.objects.create(
+                record_number=record_number,
+                client_name=client_name,
+                event_type='Test Event',
+                from_date='2021-01-01',
+                to_date='2021-01-01',
+                attendes=100,
+                expected_budget=1000,
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def search(self, term: str) -> list[int]:
+        response = self.client.get('/events/event/', {'q': term})
+        self.assertEqual(response.status_code, 200)
+        return sorted(event.record_number for event in response.context['cl'].result_list)
+
+    def test_prefixed_record_number_is_exact_match(self):
+        """
+        Test that #4711 and R-4711 only find record number 4711
+        """
+        self.assertEqual(self.search('#4711'), [4711])
+        self.assertEqual(self.search('R-4711'), [4711])
+        self.assertEqual(self.search('r4711'), [4711])
+
+    def test_plain_number_matches_record_number_or_client_prefix(self):
+        """
+        Test that a plain number finds the record number and clients starting with it
+        """
+        self.assertEqual(self.search('4711'), [12, 4711])
+
+    def test_client_name_prefix_is_case_insensitive(self):
+        """
+        Test that client names are matched by case-insensitive prefix
+        """
+        self.assertEqual(self.search('acme'), [4711])
+        self.assertEqual(self.search('THE ACME'), [14711])
+        self.assertEqual(self.search('Company'), [])
+
+    def test_client_name_prefix_bounds(self):
+        """
+        Test that the prefix range ends right after the names starting with the term and uses the index
+        """
+        Event.objects.create(
+            record_number=99, client_name='Ärzte Acmf', event_type='Test Event', from_date='2021-01-01',
+            to_date='2021-01-01', attendes=100, expected_budget=1000,
+        )
+        self.assertEqual(self.search('acm'), [4711])
+        self.assertEqual(self.search('acmd'), [])
+        self.assertEqual(self.search('Ärzte'), [99])
+        with capture_plans(['events_event']) as plans:
+            self.search('acm')
+        self.assertTrue(any('event_client_name_upper_idx' in step for plan in plans for step in plan.plan))
+
+class AmenityFilterTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        for client_name, from_date, amenities in [
+            ('Meals and photos', '2021-02-10', {'meals': True, 'photos_filming': True}),
+            ('Everything', '2021-02-12', {'meals': True, 'photos_filming': True, 'parties': True, 'drinks': True}),
+            ('Meals only', '2021-02-14', {'meals': True}),
+            ('Last month', '2021-01-10', {'meals': True, 'photos_filming': True}),
+        ]:
+            Event.objects.create(
+                client_name=client_name,
+                event_type='Test Event',
+                from_date=from_date,
+                to_date=from_date,
+                attendes=100,
+                expected_budget=1000,
+                **amenities,
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_amenities_follow_booleans(self):
+        """
+        Test that the amenity bitmask is kept in sync with the booleans on save
+        """
+        event = Event.objects.get(client_name='Meals and photos')
+        self.assertEqual(event.amenities, Amenity.MEALS | Amenity.PHOTOS_FILMING)
+        event.meals = False
+        event.drinks = True
+        event.save()
+        event.refresh_from_db()
+        self.assertEqual(event.amenities, Amenity.DRINKS | Amenity.PHOTOS_FILMING)
+
+    def test_with_amenities(self):
+        """
+        Test that events next month with meals and photos but no parties are found in one query
+        """
+        events = Event.objects.filter(
+            _status='pending_senior_approval',
+            from_date__gte='2021-02-01',
+            from_date__lt='2021-03-01',
+        ).with_amenities(include=[Amenity.MEALS, Amenity.PHOTOS_FILMING], exclude=[Amenity.PARTIES])
+        self.assertEqual([event.client_name for event in events], ['Meals and photos'])
+        self.assertIn('event_status_date_amenity_idx', events.explain())
+
+    def test_contradicting_amenities(self):
+        """
+        Test that asking for and against the same amenity finds nothing
+        """
+        self.assertFalse(Event.objects.with_amenities([Amenity.MEALS], [Amenity.MEALS]).exists())
+        self.assertEqual(Event.objects.with_amenities().count(), 4)
+
+    def test_admin_filter(self):
+        """
+        Test that the changelist filters on wanted and unwanted amenities
+        """
+        response = self.client.get('/events/event/', {
+            'amenities_with': int(Amenity.MEALS | Amenity.PHOTOS_FILMING),
+            'amenities_without': int(Amenity.PARTIES),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(event.client_name for event in response.context['cl'].result_list),
+            ['Last month', 'Meals and photos'],
+        )
+        self.assertContains(response, 'Without parties')
+
+class DateBucketTestCase(TestCase):
+    def create_event(self, from_date: str, to_date: str) -> Event:
+        return Event.objects.create(
+            client_name='Test Client',
+            event_type='Test Event',
+            from_date=from_date,
+            to_date=to_date,
+            attendes=100,
+            expected_budget=1000,
+        )
+
+    def test_buckets_follow_dates(self):
+        """
+        Test that month, ISO week and duration are derived from the dates on save
+        """
+        event = self.create_event('2021-01-01', '2021-01-04')
+        event.refresh_from_db()
+        self.assertEqual(str(event.from_month), '2021-01-01')
+        # 1 January 2021 is in the last ISO week of 2020
+        self.assertEqual(event.from_week, 202053)
+        self.assertEqual(event.duration_days, 3)
+        event.from_date = event.to_date = datetime.date(2021, 3, 15)
+        event.save()
+        event.refresh_from_db()
+        self.assertEqual((str(event.from_month), event.from_week, event.duration_days), ('2021-03-01', 202111, 0))
+
+    def test_month_report_uses_index(self):
+        """
+        Test that calendar and report queries go through the status and bucket indexes
+        """
+        self.create_event('2021-02-03', '2021-02-05')
+        self.create_event('2021-02-20', '2021-02-21')
+        self.create_event('2021-03-01', '2021-03-01')
+        pending = Event.objects.filter(_status='pending_senior_approval')
+        self.assertEqual(pending.in_month(2021, 2).count(), 2)
+        self.assertEqual(pending.in_iso_week(2021, 9).count(), 1)
+        self.assertIn('event_status_month_idx', pending.in_month(2021, 2).explain())
+        self.assertIn('event_status_duration_idx', pending.filter(duration_days__gte=2).explain())
+        self.assertEqual(
+            list(pending.values_list('from_month').annotate(count=Count('id')).order_by('from_month')),
+            [(datetime.date(2021, 2, 1), 2), (datetime.date(2021, 3, 1), 1)],
+        )
+
+class CostEstimateTestCase(TestCase):
+    def setUp(self):
+        self.rate_card = RateCard.objects.create(
+            valid_from='2020-01-01',
+            per_event=500,
+            per_attendee_day=10,
+            meals_per_attendee_day=30,
+            drinks_per_attendee_day=5,
+            parties_per_attendee=20,
+            decorations_per_day=200,
+            photos_filming_per_day=300,
+        )
+
+    def create_event(self, **kwargs) -> Event:
+        fields = {
+            'client_name': 'Test Client',
+            'event_type': 'Test Event',
+            'from_date': '2021-01-01',
+            'to_date': '2021-01-02',
+            'attendes': 100,
+            'expected_budget': 10000,
+        }
+        fields.update(kwargs)
+        return Event.objects.create(**fields)
+
+    def test_single_estimate(self):
+        """
+        Test that an event is estimated from attendees, length and amenities on save
+        """
+        event = self.create_event(meals=True, decorations=True, parties=True)
+        # 500 + 100 attendees * 2 days * (10 + 30) + 2 days * 200 + 100 * 20
+        self.assertEqual(event.estimated_cost, Decimal('10900.00'))
+        self.assertEqual(self.create_event(attendes=1, to_date='2021-01-01').estimated_cost, Decimal('510.00'))
+
+    def test_batch_matches_single_estimates(self):
+        """
+        Test that re-pricing the table in the database gives the same estimates as pricing one event
+        """
+        generator = random.Random(3)
+        for _ in range(40):
+            self.create_event(
+                attendes=generator.randint(1, 500),
+                to_date=f'2021-01-0{generator.randint(1, 9)}',
+                **{field: generator.random() < 0.5 for field in ('decorations', 'meals', 'drinks', 'photos_filming', 'parties')},
+            )
+        self.rate_card.meals_per_attendee_day = Decimal('42.50')
+        self.rate_card.save()
+        output = StringIO()
+        call_command('reprice_events', batch_size=7, stdout=output)
+        self.assertIn('Re-estimated 40 events', output.getvalue())
+        for event in Event.objects.all():
+            self.assertEqual(event.estimated_cost, estimate(event))
+
+    def test_change_form_shows_estimate(self):
+        """
+        Test that the change form compares the expected budget with the estimate
+        """
+        user = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(user)
+        event = self.create_event(expected_budget=1200)
+        response = self.client.get(f'/events/event/{event.pk}/change/')
+        self.assertContains(response, '2500.00 at current rates; the expected budget is 48% of it')
+
+
+class SimilarEventsTestCase(TestCase):
+    def setUp(self):
+        # Rolled back rows reuse their ids, so every test starts from a fresh index
+        similarity.index.reset()
+
+    def create_event(self, **kwargs) -> Event:
+        fields = {
+            'client_name': 'Test Client',
+            'event_type': 'Wedding',
+            'from_date': '2021-01-01',
+            'to_date': '2021-01-02',
+            'attendes': 100,
+            'expected_budget': 10000,
+            '_status': 'approved',
+        }
+        fields.update(kwargs)
+        return Event.objects.create(**fields)
+
+    def test_kd_tree_matches_brute_force(self):
+        """
+        Test that the k-d tree finds the same nearest points as comparing against every point
+        """
+        generator = random.Random(5)
+        points = [(tuple(generator.random() for _ in range(4)), key) for key in range(300)]
+        tree = similarity.KDTree(points[:150])
+        for point, key in points[150:]:
+            tree.insert(point, key)
+        for _ in range(20):
+            query = tuple(generator.random() for _ in range(4))
+            expected = sorted(
+                (sum((a - b) ** 2 for a, b in zip(query, point)) ** 0.5, key) for point, key in points
+            )[:5]
+            found = tree.nearest(query, 5)
+            self.assertEqual([key for _, key in found], [key for _, key in expected])
+
+    def test_approved_events_are_indexed(self):
+        """
+        Test that only approved events get features, and that new ones are found without a rebuild
+        """
+        self.create_event(_status='created')
+        first = self.create_event(attendes=120)
+        self.assertEqual(EventFeature.objects.count(), 1)
+        self.assertEqual([r['event_id'] for r in similarity.similar_events('wedding', 100, 2, 0)], [first.pk])
+        second = self.create_event(attendes=100)
+        results = similarity.similar_events('Wedding', 100, 2, 0)
+        self.assertEqual([r['event_id'] for r in results], [second.pk, first.pk])
+
+    def test_same_type_and_amenities_come_first(self):
+        """
+        Test that events of the same type are preferred and amenities count towards the distance
+        """
+        plain = self.create_event(attendes=100)
+        catered = self.create_event(attendes=110, meals=True, drinks=True)
+        conference = self.create_event(event_type='Conference', attendes=100, meals=True, drinks=True)
+        results = similarity.similar_events('Wedding', 100, 2, Amenity.MEALS | Amenity.DRINKS, k=2)
+        self.assertEqual([r['event_id'] for r in results], [catered.pk, plain.pk])
+        results = similarity.similar_events('Wedding', 100, 2, 0, k=3)
+        self.assertEqual([r['event_id'] for r in results], [plain.pk, catered.pk, conference.pk])
+
+    def test_features_outlive_the_event(self):
+        """
+        Test that the features of a deleted event stay searchable and a rebuild keeps them
+        """
+        event = self.create_event()
+        Event.objects.filter(pk=event.pk).delete()
+        output = StringIO()
+        call_command('rebuild_event_features', stdout=output)
+        self.assertIn('Stored the features of 0 events', output.getvalue())
+        self.assertEqual([r['event_id'] for r in similarity.similar_events('Wedding', 100, 2, 0)], [event.pk])
+
+    @override_settings(SIMILARITY_REFRESH_SECONDS=0)
+    def test_other_processes_see_replaced_features(self):
+        """
+        Test that an index built earlier, as in another worker, reloads when features are replaced or removed
+        """
+        event = self.create_event(attendes=100)
+        other = self.create_event(attendes=300)
+        worker = similarity.FeatureIndex()
+        self.assertEqual([key for _, key in worker.nearest('wedding', similarity.feature_vector(300, 2, 0), 1)],
+                         [EventFeature.objects.get(event_id=other.pk).pk])
+        Event.objects.filter(pk=event.pk).update(attendes=300)
+        similarity.store_features([Event.objects.get(pk=event.pk)])
+        replaced = EventFeature.objects.get(event_id=event.pk)
+        found = worker.nearest('wedding', similarity.feature_vector(300, 2, 0), 2)
+        self.assertEqual(sorted(key for _, key in found), sorted([replaced.pk, EventFeature.objects.get(event_id=other.pk).pk]))
+        self.assertEqual(worker.size, 2)
+        EventFeature.objects.filter(event_id=other.pk).delete()
+        self.assertEqual([key for _, key in worker.nearest('wedding', similarity.feature_vector(300, 2, 0), 2)], [replaced.pk])
+
+    def test_index_checks_the_table_at_an_interval(self):
+        """
+        Test that lookups between checks make no query, and that features stored by this process are found at once
+        """
+        self.create_event(attendes=100)
+        worker = similarity.FeatureIndex()
+        worker.refresh()
+        with self.assertNumQueries(0):
+            worker.refresh()
+        self.create_event(attendes=300)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(worker.nearest('wedding', similarity.feature_vector(300, 2, 0), 2)), 1)
+        worker.changed()
+        self.assertEqual(len(worker.nearest('wedding', similarity.feature_vector(300, 2, 0), 2)), 2)
+        self.assertEqual(len(similarity.similar_events('Wedding', 300, 2, 0)), 2)
+
+    def test_admin_lookup(self):
+        """
+        Test that the change form lists similar events and the lookup endpoint follows the form fields
+        """
+        user = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(user)
+        past = self.create_event(client_name='Past Client', attendes=90, expected_budget=8000)
+        event = self.create_event(_status='created', attendes=100)
+        response = self.client.get(f'/events/event/{event.pk}/change/')
+        self.assertContains(response, 'Past Client')
+        self.assertContains(response, 'events/similar.js')
+        response = self.client.get('/events/event/similar/', {
+            'event_type': 'Wedding', 'attendes': 80, 'from_date': '2022-05-01', 'to_date': '2022-05-02',
+            'exclude': past.pk,
+        })
+        self.assertEqual(response.json(), {'results': []})
+        response = self.client.get('/events/event/similar/', {'event_type': 'Wedding', 'attendes': 80, 'meals': 'on'})
+        self.assertEqual(response.json()['results'][0]['approved_budget'], '8000.00')
+        self.assertEqual(self.client.get('/events/event/similar/', {'attendes': 'many'}).status_code, 400)
+
+    def test_lookup_for_users_adding_events(self):
+        """
+        Test that users who may only add events get the similar events of the add form, and others do not
+        """
+        past = self.create_event(client_name='Past Client', attendes=90)
+        user = create_user()
+        user.groups.add(create_group('Customer service', ['add_event']))
+        self.client.force_login(user)
+        response = self.client.get('/events/event/similar/', {'event_type': 'Wedding', 'attendes': 80})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['event_id'] for r in response.json()['results']], [past.pk])
+        self.client.force_login(create_user('outsider', 'outsiderpass'))
+        self.assertEqual(self.client.get('/events/event/similar/', {'attendes': 80}).status_code, 403)
@@ -1,38 +1,119 @@
-from django.contrib import admin
-from django.http import HttpRequest
+from django.contrib import admin, messages
+from django.http import HttpRequest, HttpResponseRedirect
 from django.contrib.auth.models import User
 from django.db.models.query import QuerySet
-from typing import Any
-from financial.models import FinancialRequest
+from typing import Any, Optional
+from financial.anomalies import anomaly_threshold
+from financial.models import DepartmentBudget, DepartmentStatistics, FinancialRequest, OverBudgetError
+from jobs.registry import enqueue
+from live.admin import LiveQueueMixin
+from roles.models import Role
+from roles.registry import has_role
+from workflow.admin import VersionedAdminMixin
+from workflow.filters import FacetCountFieldListFilter
 
-class FinancialRequestAdmin(admin.ModelAdmin):
+class AnomalyFilter(admin.SimpleListFilter):
+    title = 'anomaly'
+    parameter_name = 'anomalous'
+
+    def lookups(self, request, model_admin):
+        return [('1', 'Unusual amount'), ('0', 'Usual amount')]
+
+    def queryset(self, request, queryset):
+        if self.value() == '1':
+            return queryset.filter(anomaly_score__gte=anomaly_threshold())
+        if self.value() == '0':
+            return queryset.exclude(anomaly_score__gte=anomaly_threshold())
+        return queryset
+
+class FinancialRequestAdmin(VersionedAdminMixin, LiveQueueMixin, admin.ModelAdmin):
     list_display = (
         'requesting_department',
         'project_reference',
         'required_amount',
+        'anomaly_score',
         '_status',
     )
     list_filter = (
-        'requesting_department',
-        '_status',
+        ('requesting_department', FacetCountFieldListFilter),
+        ('_status', FacetCountFieldListFilter),
+        AnomalyFilter,
     )
     search_fields = (
         'project_reference',
     )
     readonly_fields = (
         '_status',
+        'budget_balance',
+        'department_statistics',
     )
+    actions = ['approve_in_background']
+
+    @admin.display(description='Department budget')
+    def budget_balance(self, obj: Optional[FinancialRequest]) -> str:
+        if obj is None or obj.pk is None:
+            return '-'
+        budget = obj.budget()
+        if budget is None:
+            return f'No budget set for {obj.get_requesting_department_display()} in this period'
+        balance = (
+            f'{budget}: {budget.committed} of {budget.ceiling} committed, {budget.remaining} remaining'
+        )
+        if obj._status == 'pending_financial_approval' and obj.required_amount > budget.remaining:
+            return f'{balance}. Approving this request would exceed the budget.'
+        return balance
+
+    @admin.display(description='Department amounts')
+    def department_statistics(self, obj: Optional[FinancialRequest]) -> str:
+        if obj is None or obj.pk is None:
+            return '-'
+        stats = DepartmentStatistics.objects.filter(department=obj.requesting_department).first()
+        if stats is None or not stats.count:
+            return 'No requests yet'
+        running = stats.running()
+        return (
+            f'{running.count} requests, mean {running.mean:.2f}, standard deviation {running.std:.2f}, '
+            f'median {running.quantile(0.5):.2f}, 95th percentile {running.quantile(0.95):.2f}'
+        )
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except OverBudgetError as error:
+            self.message_user(request, str(error), messages.ERROR)
+            return HttpResponseRedirect(request.get_full_path())
+
+    @admin.action(description='Approve selected requests in the background')
+    def approve_in_background(self, request: HttpRequest, queryset: QuerySet[FinancialRequest]) -> None:
+        ids = list(queryset.filter(_status='pending_financial_approval').values_list('pk', flat=True))
+        if not ids:
+            self.message_user(request, 'None of the selected requests are pending approval.', messages.WARNING)
+            return
+        job = enqueue('financial.approve_requests', {'ids': ids})
+        self.message_user(request, f'Approval of {len(ids)} requests queued as job #{job.pk}.')
+
+    def get_actions(self, request: HttpRequest):
+        actions = super().get_actions(request)
+        user: User = request.user
+        if not (user.is_superuser or has_role(user, Role.FINANCIAL_MANAGER)):
+            actions.pop('approve_in_background', None)
+        return actions
+
+    def visible_statuses(self, roles: frozenset[int]) -> Optional[set[str]]:
+        if Role.FINANCIAL_MANAGER in roles:
+            return {'pending_financial_approval'}
+        return None
 
     def get_queryset(self, request: HttpRequest) -> QuerySet[Any]:
         user: User = request.user
-        if user.groups.filter(name__startswith='Financial').exists():
+        if has_role(user, Role.FINANCIAL_MANAGER):
             return FinancialRequest.objects.filter(_status='pending_financial_approval')
         return super().get_queryset(request)
     
     def has_change_permission(self, request, obj=None):
         if obj:
             user = request.user
-            if user.groups.filter(name__startswith='Financial').exists() \
+            if has_role(user, Role.FINANCIAL_MANAGER) \
                 and obj._status != 'pending_financial_approval':
                 return False
         return super().has_change_permission(request, obj)
@@ -40,9 +121,32 @@ class FinancialRequestAdmin(admin.ModelAdmin):
     def get_readonly_fields(self, request, obj=None):
         user: User = request.user
         if user.is_superuser:
-            return []
-        if user.groups.filter(name__startswith='Financial').exists():
-            return [f.name for f in self.model._meta.fields]
+            return ['budget_balance', 'department_statistics']
+        if has_role(user, Role.FINANCIAL_MANAGER):
+            return [f.name for f in self.model._meta.fields] + ['budget_balance', 'department_statistics']
         return super().get_readonly_fields(request, obj)
     
-admin.site.register(FinancialRequest, FinancialRequestAdmin)
\ No newline at end of file
+admin.site.register(FinancialRequest, FinancialRequestAdmin)
+
+
+class DepartmentBudgetAdmin(admin.ModelAdmin):
+    list_display = (
+        'department',
+        'period_start',
+        'period_end',
+        'ceiling',
+        'committed',
+        'remaining',
+    )
+    list_filter = (
+        'department',
+    )
+    readonly_fields = (
+        'committed',
+    )
+
+    @admin.display(description='Remaining')
+    def remaining(self, obj: DepartmentBudget):
+        return obj.remaining
+
+admin.site.register(DepartmentBudget, DepartmentBudgetAdmin)
\ No newline at end of file
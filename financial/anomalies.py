@@ -0,0 +1,86 @@
+from decimal import Decimal
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from financial.models import DepartmentStatistics, FinancialRequest
+from financial.statistics import RunningStatistics
+
+# Requests a department needs before its amounts are scored
+MIN_SAMPLES = 5
+
+
+def anomaly_threshold() -> float:
+    return getattr(settings, 'FINANCIAL_ANOMALY_THRESHOLD', 3.0)
+
+
+def observe(department: str, amount) -> Optional[float]:
+    """
+    Score ``amount`` against the department's statistics and add it to
+    them, in the caller's transaction
+    """
+    amount = float(Decimal(str(amount)))
+    stats = DepartmentStatistics.objects.select_for_update().get_or_create(department=department)[0]
+    running = stats.running()
+    score = running.score(amount, MIN_SAMPLES)
+    running.add(amount)
+    stats.store(running)
+    stats.save()
+    return score
+
+
+def rescore_batch(running: dict[str, RunningStatistics], last_pk: int, batch_size: int) -> list[FinancialRequest]:
+    """
+    Rescore the next ``batch_size`` requests after ``last_pk`` and add
+    them to the ``running`` statistics
+    """
+    batch = list(
+        FinancialRequest.objects.filter(pk__gt=last_pk).order_by('pk')
+        .only('requesting_department', 'required_amount', 'anomaly_score')[:batch_size]
+    )
+    for financial_request in batch:
+        stats = running.setdefault(financial_request.requesting_department, RunningStatistics())
+        amount = float(financial_request.required_amount)
+        financial_request.anomaly_score = stats.score(amount, MIN_SAMPLES)
+        stats.add(amount)
+    # Plain UPDATEs: scores are bookkeeping, not workflow changes
+    FinancialRequest.objects.bulk_update(batch, ['anomaly_score'])
+    return batch
+
+
+def rescore(batch_size: int = 500, progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Rebuild the department statistics from every request in creation
+    order, rescoring each against the requests created before it.
+
+    Every batch is committed on its own so approvers are only kept
+    waiting for one batch. The statistics are replaced in a last
+    transaction that holds them locked while it rescores the requests
+    created in the meantime, so none of them is left out.
+    """
+    running: dict[str, RunningStatistics] = {}
+    rescored = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            batch = rescore_batch(running, last_pk, batch_size)
+        if not batch:
+            break
+        rescored += len(batch)
+        last_pk = batch[-1].pk
+        if progress:
+            progress(rescored)
+    with transaction.atomic():
+        list(DepartmentStatistics.objects.select_for_update())
+        while batch := rescore_batch(running, last_pk, batch_size):
+            rescored += len(batch)
+            last_pk = batch[-1].pk
+        DepartmentStatistics.objects.exclude(department__in=running).delete()
+        for department, stats in running.items():
+            row = DepartmentStatistics(department=department)
+            row.store(stats)
+            DepartmentStatistics.objects.update_or_create(department=department, defaults={
+                'count': row.count, 'mean': row.mean, 'm2': row.m2, 'quantiles': row.quantiles,
+            })
+    return rescored
@@ -0,0 +1,30 @@
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from django.db.models import F
+from django.utils import timezone
+
+from financial.models import DepartmentBudget
+
+
+def budget_for(department: str, on: Optional[date] = None) -> Optional[DepartmentBudget]:
+    on = on or timezone.localdate()
+    return (
+        DepartmentBudget.objects.filter(department=department, period_start__lte=on, period_end__gte=on)
+        .order_by('-period_start').first()
+    )
+
+
+def commit(budget: DepartmentBudget, amount) -> bool:
+    """
+    Atomically add ``amount`` to the committed total if it stays within
+    the ceiling. Returns False, changing nothing, if it would not.
+    """
+    amount = Decimal(str(amount))
+    committed = DepartmentBudget.objects.filter(
+        pk=budget.pk, committed__lte=F('ceiling') - amount,
+    ).update(committed=F('committed') + amount)
+    if committed:
+        budget.committed += amount
+    return bool(committed)
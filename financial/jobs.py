@@ -0,0 +1,35 @@
+from financial.anomalies import rescore
+from financial.models import FinancialRequest, OverBudgetError
+from jobs.models import Job
+from jobs.registry import job
+from workflow.models import ConcurrentUpdateError
+
+
+@job('financial.approve_requests', concurrency=2)
+def approve_requests(job: Job) -> None:
+    """
+    Approve the financial requests listed in ``payload['ids']``, skipping
+    those approved or changed since the job was enqueued and those the
+    department budget cannot cover
+    """
+    ids = job.payload['ids']
+    over_budget = 0
+    for done, financial_request in enumerate(
+        FinancialRequest.objects.filter(pk__in=ids, _status='pending_financial_approval').iterator(), start=1
+    ):
+        try:
+            financial_request.save()
+        except ConcurrentUpdateError:
+            pass
+        except OverBudgetError:
+            over_budget += 1
+        job.report_progress(
+            100 * done // len(ids),
+            f'Processed {done} of {len(ids)} requests, {over_budget} over budget',
+        )
+
+
+@job('financial.rescore', concurrency=1)
+def rescore_job(job: Job) -> None:
+    total = FinancialRequest.objects.count() or 1
+    rescore(progress=lambda done: job.report_progress(100 * done // total, f'Rescored {done} requests'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from financial.anomalies import rescore
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the department statistics and rescore every financial request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = rescore(options['batch_size'], progress=lambda n: self.stdout.write(f'Rescored {n} requests'))
+        self.stdout.write(self.style.SUCCESS(f'Rescored {total} requests'))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-19 01:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financialrequest',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
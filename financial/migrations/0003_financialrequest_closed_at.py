@@ -0,0 +1,31 @@
+# Generated by Django 4.2.6 on 2026-10-19 01:36
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def set_closed_at(apps, schema_editor):
+    """
+    Records closed before closed_at existed count as closed at migration time
+    """
+    FinancialRequest = apps.get_model('financial', 'FinancialRequest')
+    FinancialRequest.objects.filter(
+        _status__in=['approved'],
+        closed_at__isnull=True,
+    ).update(closed_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0002_financialrequest_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financialrequest',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(set_closed_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+        ('financial', '0003_financialrequest_closed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financialrequest',
+            name='project',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='financial_requests', to='projects.project'),
+        ),
+    ]
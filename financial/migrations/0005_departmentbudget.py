@@ -0,0 +1,28 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0004_financialrequest_project'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentBudget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(choices=[('admin', 'Administration'), ('services', 'Services'), ('production', 'Production'), ('financial', 'Financial')], max_length=20)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('ceiling', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('committed', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='departmentbudget',
+            constraint=models.UniqueConstraint(fields=('department', 'period_start'), name='department_budget_unique_period'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0005_departmentbudget'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(choices=[('admin', 'Administration'), ('services', 'Services'), ('production', 'Production'), ('financial', 'Financial')], max_length=20, unique=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('mean', models.FloatField(default=0)),
+                ('m2', models.FloatField(default=0)),
+                ('quantiles', models.JSONField(default=dict)),
+            ],
+            options={
+                'verbose_name_plural': 'department statistics',
+            },
+        ),
+        migrations.AddField(
+            model_name='financialrequest',
+            name='anomaly_score',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='financialrequest',
+            index=models.Index(fields=['_status', 'anomaly_score'], name='financial_status_anomaly_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:43
+
+from django.db import migrations, models
+
+from workflow.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('financial', '0006_anomaly_score'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='financialrequest',
+            index=models.Index(fields=['_status'], name='financial_status_idx'),
+        ),
+    ]
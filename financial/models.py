@@ -1,15 +1,97 @@
-from django.db import models
-
-class FinancialRequest(models.Model):
-    requesting_department = models.CharField(max_length=20, choices=[
-        ("admin", "Administration"),
-        ("services", "Services"),
-        ("production", "Production"),
-        ("financial", "Financial"),
-    ])
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+
+from workflow.models import WorkflowModel
+
+DEPARTMENTS = [
+    ("admin", "Administration"),
+    ("services", "Services"),
+    ("production", "Production"),
+    ("financial", "Financial"),
+]
+
+
+class OverBudgetError(Exception):
+    pass
+
+
+class DepartmentBudget(models.Model):
+    """
+    What a department may commit in a period. ``committed`` is the
+    running total of approved requests, so the remaining balance is
+    read from a single row instead of summing the request history.
+    """
+    department = models.CharField(max_length=20, choices=DEPARTMENTS)
+    period_start = models.DateField()
+    period_end = models.DateField()
+    ceiling = models.DecimalField(max_digits=14, decimal_places=2)
+    committed = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['department', 'period_start'], name='department_budget_unique_period'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.get_department_display()} {self.period_start} – {self.period_end}'
+
+    @property
+    def remaining(self):
+        return self.ceiling - self.committed
+
+    def clean(self) -> None:
+        if self.period_start and self.period_end and self.period_end < self.period_start:
+            raise ValidationError({'period_end': 'The period cannot end before it starts.'})
+        overlapping = DepartmentBudget.objects.filter(
+            department=self.department, period_start__lte=self.period_end, period_end__gte=self.period_start,
+        ).exclude(pk=self.pk)
+        if self.period_start and self.period_end and overlapping.exists():
+            raise ValidationError('The period overlaps another budget of the department.')
+
+class DepartmentStatistics(models.Model):
+    """
+    Running statistics of the amounts a department requests, updated as
+    requests are created (see :class:`financial.statistics.RunningStatistics`)
+    """
+    department = models.CharField(max_length=20, choices=DEPARTMENTS, unique=True)
+    count = models.PositiveIntegerField(default=0)
+    mean = models.FloatField(default=0)
+    m2 = models.FloatField(default=0)
+    quantiles = models.JSONField(default=dict)
+
+    class Meta:
+        verbose_name_plural = 'department statistics'
+
+    def __str__(self) -> str:
+        return self.get_department_display()
+
+    def running(self):
+        from financial.statistics import RunningStatistics
+        return RunningStatistics(self.count, self.mean, self.m2, self.quantiles)
+
+    def store(self, running) -> None:
+        self.count, self.mean, self.m2 = running.count, running.mean, running.m2
+        self.quantiles = running.quantile_state()
+
+
+class FinancialRequest(WorkflowModel):
+    facet_fields = ('requesting_department', '_status')
+
+    requesting_department = models.CharField(max_length=20, choices=DEPARTMENTS)
     project_reference = models.CharField(max_length=255)
+    # Resolved from project_reference on save
+    project = models.ForeignKey(
+        'projects.Project',
+        on_delete=models.PROTECT,
+        blank=True,
+        null=True,
+        editable=False,
+        related_name='financial_requests',
+    )
     required_amount = models.DecimalField(max_digits=10, decimal_places=2)
     reason = models.TextField()
+    # Standard deviations from the department's mean amount when created
+    anomaly_score = models.FloatField(blank=True, null=True, editable=False)
 
     _status = models.CharField(
         max_length=30,
@@ -20,9 +102,58 @@ class FinancialRequest(models.Model):
         default='pending_financial_approval'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['_status', 'anomaly_score'], name='financial_status_anomaly_idx'),
+            # Rows of one status in id order, for the approver's changelist
+            models.Index(fields=['_status'], name='financial_status_idx'),
+        ]
+
     def save(self, *args, **kwargs) -> None:
+        approving = self.pk is not None and self._status == 'pending_financial_approval'
         self.move_to_next_status()
-        super(FinancialRequest, self).save(*args, **kwargs)
+        self.set_project()
+        with transaction.atomic(using=kwargs.get('using')):
+            if self.pk is None:
+                self.score_amount()
+            if approving:
+                self.commit_to_budget()
+            super(FinancialRequest, self).save(*args, **kwargs)
+
+    def score_amount(self) -> None:
+        """
+        Score the amount against the department's requests so far, then
+        add it to the department's running statistics
+        """
+        from financial.anomalies import observe
+        self.anomaly_score = observe(self.requesting_department, self.required_amount)
+
+    def budget(self, on=None):
+        """
+        The budget of the requesting department for the period containing
+        ``on`` (today by default), if there is one
+        """
+        from financial.budgets import budget_for
+        return budget_for(self.requesting_department, on)
+
+    def commit_to_budget(self) -> None:
+        """
+        Add the amount to the department's committed total, unless that
+        takes it over the ceiling. Departments without a budget for the
+        period are not limited.
+        """
+        from financial.budgets import commit
+        budget = self.budget()
+        if budget is not None and not commit(budget, self.required_amount):
+            raise OverBudgetError(
+                f'Approving {self.required_amount} exceeds the remaining budget of {budget}.'
+            )
+
+    def set_project(self) -> None:
+        loaded_values = getattr(self, '_loaded_values', None) or {}
+        if self.project_id is None or loaded_values.get('project_reference') != self.project_reference:
+            from projects.models import project_for_reference
+            self.project = project_for_reference(self.project_reference)
 
     def move_to_next_status(self) -> None:
         """
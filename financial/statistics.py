@@ -0,0 +1,108 @@
+import math
+from bisect import insort
+from typing import Optional
+
+
+class P2Quantile:
+    """
+    Streaming estimate of the ``p`` quantile with the P² algorithm (Jain
+    and Chlamtac, 1985): five markers are kept and moved towards their
+    desired positions with parabolic interpolation, so the estimate needs
+    constant memory however many observations were added. The state is a
+    small JSON-serializable dict.
+    """
+    def __init__(self, p: float, state: Optional[dict] = None):
+        self.p = p
+        state = state or {}
+        self.heights: list[float] = state.get('q', [])
+        self.positions: list[int] = state.get('n', [1, 2, 3, 4, 5])
+        self.desired: list[float] = state.get('d', [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5])
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def state(self) -> dict:
+        return {'q': self.heights, 'n': self.positions, 'd': self.desired}
+
+    def add(self, x: float) -> None:
+        q, n = self.heights, self.positions
+        if len(q) < 5:
+            insort(q, x)
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = max(i for i in range(4) if q[i] <= x)
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self.parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def parabolic(self, i: int, d: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def value(self) -> Optional[float]:
+        if not self.heights:
+            return None
+        if len(self.heights) < 5:
+            # Too few observations for the markers: the exact quantile
+            return self.heights[min(len(self.heights) - 1, int(self.p * len(self.heights)))]
+        return self.heights[2]
+
+
+class RunningStatistics:
+    """
+    Count, mean and variance updated one observation at a time with
+    Welford's algorithm, plus P² estimates of the median and 95th percentile
+    """
+    QUANTILES = (0.5, 0.95)
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0, quantiles: Optional[dict] = None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        quantiles = quantiles or {}
+        self.quantiles = {p: P2Quantile(p, quantiles.get(str(p))) for p in self.QUANTILES}
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        for quantile in self.quantiles.values():
+            quantile.add(x)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def quantile(self, p: float) -> Optional[float]:
+        return self.quantiles[p].value
+
+    def quantile_state(self) -> dict:
+        return {str(p): quantile.state() for p, quantile in self.quantiles.items()}
+
+    def score(self, x: float, min_samples: int) -> Optional[float]:
+        """
+        How many standard deviations ``x`` is from the mean, None while
+        there are too few observations to tell
+        """
+        if self.count < min_samples or self.std == 0:
+            return None
+        return round(abs(x - self.mean) / self.std, 2)
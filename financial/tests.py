@@ -1,38 +1,27 @@
+import random
+import statistics
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection, transaction
 from django.test import TestCase
-from django.contrib.contenttypes.models import ContentType
-from django.contrib.auth.models import User, Group, Permission
-
-from financial.models import FinancialRequest
-
-def create_user(
-    username: str = 'testuser',
-    password: str = 'testpass',
-) -> User:
-    """
-    Create a user for testing
-    """
-    return User.objects.create_user(
-        username=username,
-        password=password,
-        is_staff=True,
-    )
-
-def create_group(group_name: str, permissions: list[str] = []) -> Group:
-    """
-    Create a group
-    """
-    group: Group = Group.objects.get_or_create(name=group_name)[0]
-    content_type: ContentType = ContentType.objects.get_for_model(FinancialRequest)
-    perms: list[Permission] = Permission.objects.filter(content_type=content_type, codename__in=permissions)
-    group.permissions.set(perms)
-    return group
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth.models import User, Group
+
+from financial.anomalies import rescore
+from financial.models import DepartmentBudget, DepartmentStatistics, FinancialRequest, OverBudgetError
+from financial.statistics import RunningStatistics
+from workflow.testing import create_group, create_user
 
 class ServiceManagerTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user: User = create_user()
+        cls.group: Group = create_group('Service Manager', ['add_financialrequest', 'delete_financialrequest', 'view_financialrequest', 'change_financialrequest'])
+        cls.user.groups.add(cls.group)
+
     def setUp(self) -> None:
-        self.user: User = create_user()
-        self.group: Group = create_group('Service Manager', ['add_financialrequest', 'delete_financialrequest', 'view_financialrequest', 'change_financialrequest'])
-        self.user.groups.add(self.group)
-        self.client.login(username='testuser', password='testpass')
+        self.client.force_login(self.user)
 
     def test_user_has_change_permission(self) -> None:
         """
@@ -129,11 +118,14 @@ class ServiceManagerTestCase(TestCase):
 
 
 class FinancialManagerTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user: User = create_user()
+        cls.group: Group = create_group('Financial Manager', ['view_financialrequest', 'change_financialrequest'])
+        cls.user.groups.add(cls.group)
+
     def setUp(self) -> None:
-        self.user: User = create_user()
-        self.group: Group = create_group('Financial Manager', ['view_financialrequest', 'change_financialrequest'])
-        self.user.groups.add(self.group)
-        self.client.login(username='testuser', password='testpass')
+        self.client.force_login(self.user)
 
     def test_user_has_change_permission(self) -> None:
         """
@@ -241,4 +233,185 @@ class FinancialManagerTestCase(TestCase):
         self.assertEqual(financial_request.requesting_department, 'financial')
         self.assertEqual(financial_request.project_reference, 'test')
         self.assertEqual(financial_request.required_amount, 1000)
-        self.assertEqual(financial_request.reason, '')
\ No newline at end of file
+        self.assertEqual(financial_request.reason, '')
+class DepartmentBudgetTestCase(TestCase):
+    def setUp(self) -> None:
+        today = timezone.localdate()
+        self.budget = DepartmentBudget.objects.create(
+            department='admin',
+            period_start=today.replace(month=1, day=1),
+            period_end=today.replace(month=12, day=31),
+            ceiling=1500,
+        )
+
+    def create_financial_request(self, amount: int, department: str = 'admin') -> FinancialRequest:
+        return FinancialRequest.objects.create(
+            requesting_department=department,
+            project_reference='Project',
+            required_amount=amount,
+            reason='Test',
+        )
+
+    def approve(self, financial_request: FinancialRequest) -> FinancialRequest:
+        financial_request = FinancialRequest.objects.get(pk=financial_request.pk)
+        with transaction.atomic():
+            financial_request.save()
+        return financial_request
+
+    def test_approval_commits_amount(self):
+        """
+        Test that approving a request adds its amount to the department's committed total
+        """
+        self.approve(self.create_financial_request(1000))
+        self.budget.refresh_from_db()
+        self.assertEqual((self.budget.committed, self.budget.remaining), (1000, 500))
+
+    def test_over_budget_approval_is_refused(self):
+        """
+        Test that an approval exceeding the remaining budget fails and changes nothing
+        """
+        self.approve(self.create_financial_request(1000))
+        financial_request = self.create_financial_request(600)
+        with self.assertRaises(OverBudgetError):
+            self.approve(financial_request)
+        financial_request.refresh_from_db()
+        self.budget.refresh_from_db()
+        self.assertEqual(financial_request._status, 'pending_financial_approval')
+        self.assertEqual(self.budget.committed, 1000)
+
+    def test_departments_without_budget_are_not_limited(self):
+        """
+        Test that departments without a budget for the period can still be approved
+        """
+        self.assertEqual(self.approve(self.create_financial_request(10 ** 6, 'services'))._status, 'approved')
+
+    def test_check_cost_does_not_grow_with_history(self):
+        """
+        Test that an approval runs the same queries however many requests were approved before
+        """
+        def approval_queries() -> int:
+            financial_request = FinancialRequest.objects.get(pk=self.create_financial_request(1).pk)
+            with CaptureQueriesContext(connection) as queries:
+                financial_request.save()
+            return len(queries)
+
+        approval_queries()
+        first = approval_queries()
+        for _ in range(20):
+            self.approve(self.create_financial_request(1))
+        self.assertEqual(approval_queries(), first)
+
+    def test_admin_guard_and_balance(self):
+        """
+        Test that the change form shows the balance and refuses an over-budget approval
+        """
+        user = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(user)
+        financial_request = self.create_financial_request(2000)
+        url = f'/financial/financialrequest/{financial_request.pk}/change/'
+        response = self.client.get(url)
+        self.assertContains(response, '0.00 of 1500.00 committed, 1500.00 remaining')
+        self.assertContains(response, 'Approving this request would exceed the budget.')
+        response = self.client.post(url, {
+            'requesting_department': 'admin',
+            'project_reference': 'Project',
+            'required_amount': 2000,
+            'reason': 'Test',
+            '_status': 'pending_financial_approval',
+            'loaded_version': financial_request.version,
+        })
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        response = self.client.get(url)
+        self.assertContains(response, 'exceeds the remaining budget')
+        financial_request.refresh_from_db()
+        self.assertEqual(financial_request._status, 'pending_financial_approval')
+
+class AnomalyScoreTestCase(TestCase):
+    def create_financial_request(self, amount, department: str = 'admin') -> FinancialRequest:
+        return FinancialRequest.objects.create(
+            requesting_department=department,
+            project_reference='Project',
+            required_amount=amount,
+            reason='Test',
+        )
+
+    def test_outlier_is_scored_high(self):
+        """
+        Test that amounts far from the department's usual ones get a high score once there is enough history
+        """
+        first = [self.create_financial_request(amount) for amount in (900, 1000, 1100, 1000, 950)]
+        self.assertEqual({r.anomaly_score for r in first}, {None})
+        usual = self.create_financial_request(1050)
+        unusual = self.create_financial_request(50000)
+        other_department = self.create_financial_request(50000, 'services')
+        self.assertLess(usual.anomaly_score, 1)
+        self.assertGreater(unusual.anomaly_score, 100)
+        self.assertIsNone(other_department.anomaly_score)
+
+        stats = DepartmentStatistics.objects.get(department='admin').running()
+        amounts = [900, 1000, 1100, 1000, 950, 1050, 50000]
+        self.assertEqual(stats.count, 7)
+        self.assertAlmostEqual(stats.mean, statistics.mean(amounts))
+        self.assertAlmostEqual(stats.std, statistics.stdev(amounts))
+        self.assertEqual(stats.quantile(0.5), 1000)
+
+    def test_quantile_sketch(self):
+        """
+        Test that the streaming quantiles stay close to the exact ones
+        """
+        generator = random.Random(7)
+        amounts = [generator.lognormvariate(7, 0.5) for _ in range(2000)]
+        running = RunningStatistics()
+        for amount in amounts:
+            running.add(amount)
+        amounts.sort()
+        self.assertAlmostEqual(running.quantile(0.5) / amounts[1000], 1, delta=0.02)
+        self.assertAlmostEqual(running.quantile(0.95) / amounts[1900], 1, delta=0.03)
+
+    def test_rescore(self):
+        """
+        Test that rescoring rebuilds the statistics and reproduces the scores given on create
+        """
+        for amount in (900, 1000, 1100, 1000, 950, 1050, 50000):
+            self.create_financial_request(amount)
+        scores = list(FinancialRequest.objects.order_by('pk').values_list('anomaly_score', flat=True))
+        DepartmentStatistics.objects.all().delete()
+        FinancialRequest.objects.update(anomaly_score=None)
+        call_command('rescore_financial_requests', batch_size=3, stdout=StringIO())
+        self.assertEqual(list(FinancialRequest.objects.order_by('pk').values_list('anomaly_score', flat=True)), scores)
+        self.assertEqual(DepartmentStatistics.objects.get(department='admin').count, 7)
+
+    def test_rescore_commits_every_batch(self):
+        """
+        Test that every batch is written in its own transaction and requests created meanwhile are counted once
+        """
+        for amount in (900, 1000, 1100, 1000, 950, 1050, 50000):
+            self.create_financial_request(amount)
+        created = []
+
+        def create_between_batches(done: int) -> None:
+            if not created:
+                created.append(self.create_financial_request(1000))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(rescore(batch_size=3, progress=create_between_batches), 8)
+        sql = [query['sql'] for query in queries]
+        updates = [position for position, query in enumerate(sql) if query.startswith('UPDATE "financial_financialrequest"')]
+        self.assertEqual(len(updates), 3)
+        for position in updates:
+            self.assertTrue(sql[position + 1].startswith('RELEASE SAVEPOINT'))
+        self.assertEqual(DepartmentStatistics.objects.get(department='admin').count, 8)
+        created[0].refresh_from_db()
+        self.assertIsNotNone(created[0].anomaly_score)
+
+    def test_admin_sort_and_filter(self):
+        """
+        Test that the changelist sorts by score and filters unusual amounts
+        """
+        user = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(user)
+        for amount in (900, 1000, 1100, 1000, 950, 1050, 50000):
+            self.create_financial_request(amount)
+        response = self.client.get('/financial/financialrequest/', {'anomalous': '1'})
+        self.assertEqual([r.required_amount for r in response.context['cl'].result_list], [50000])
+        response = self.client.get('/financial/financialrequest/', {'o': '-4'})
+        self.assertEqual(response.context['cl'].result_list[0].required_amount, 50000)
@@ -0,0 +1,71 @@
+from django.contrib import admin
+from django.db.models.query import QuerySet
+from django.http import HttpRequest
+from django.utils import timezone
+from django.utils.html import format_html
+
+from jobs.models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    """
+    Read-only view over the background job queue
+    """
+    list_display = (
+        '__str__',
+        'status',
+        'priority',
+        'progress_bar',
+        'attempts',
+        'worker',
+        'created_at',
+        'finished_at',
+    )
+    list_filter = (
+        'status',
+        'kind',
+    )
+    fields = (
+        'kind',
+        'payload',
+        'priority',
+        'status',
+        'progress_bar',
+        'attempts',
+        'max_attempts',
+        'run_after',
+        'worker',
+        'created_at',
+        'started_at',
+        'finished_at',
+        'error',
+    )
+    readonly_fields = fields
+    actions = ['retry']
+
+    @admin.display(description='Progress')
+    def progress_bar(self, obj: Job) -> str:
+        return format_html(
+            '<progress value="{}" max="100"></progress> {}',
+            obj.progress, obj.progress_message or f'{obj.progress}%',
+        )
+
+    @admin.action(description='Retry selected failed jobs', permissions=['retry'])
+    def retry(self, request: HttpRequest, queryset: QuerySet[Job]) -> None:
+        retried = queryset.filter(status='failed').update(
+            status='queued', attempts=0, run_after=timezone.now(), finished_at=None,
+            worker='', started_at=None, progress=0, progress_message='',
+        )
+        self.message_user(request, f'{retried} jobs queued again.')
+
+    def has_retry_permission(self, request: HttpRequest) -> bool:
+        # Jobs are never edited in the admin, but requeueing is a change
+        return request.user.has_perm('jobs.change_job')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,51 @@
+import multiprocessing
+import signal
+import socket
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.registry import job_types
+from jobs.worker import requeue_stale, work
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2)
+        parser.add_argument('--kind', action='append', dest='kinds', choices=sorted(job_types),
+                            help='Only run jobs of this type, may be given several times')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=3600,
+                            help='Requeue jobs that have been running for this many seconds')
+    def handle(self, *args, **options):
+        requeued = requeue_stale(timedelta(seconds=options['stale_after']))
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale jobs')
+
+        # Children must open their own database connections
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(
+                target=work,
+                args=(f'{socket.gethostname()}-{number}', options['kinds'], options['interval'], options['burst']),
+                daemon=True,
+            )
+            for number in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f'Started {len(processes)} workers')
+
+        def stop(signum, frame):
+            for process in processes:
+                process.terminate()
+        signal.signal(signal.SIGTERM, stop)
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            stop(None, None)
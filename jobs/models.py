@@ -0,0 +1,45 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    A unit of background work, run by ``manage.py run_workers``
+    """
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(encoder=DjangoJSONEncoder, default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0, help_text='Higher priorities run first')
+    status = models.CharField(max_length=20, choices=[
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ], default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    progress = models.PositiveSmallIntegerField(default=0)
+    progress_message = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_after', 'id'], name='job_queue_idx'),
+            models.Index(fields=['kind', 'status'], name='job_kind_status_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.kind} #{self.pk}'
+
+    def report_progress(self, progress: int, message: str = '') -> None:
+        """
+        Record how far the job got, shown in the admin while it runs
+        """
+        self.progress = max(0, min(100, int(progress)))
+        self.progress_message = message[:255]
+        Job.objects.filter(pk=self.pk).update(progress=self.progress, progress_message=self.progress_message)
@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+from django.db import transaction
+
+from jobs.models import Job
+
+
+@dataclass(frozen=True)
+class JobType:
+    name: str
+    function: Callable[[Job], None]
+    # Maximum number of jobs of this type running at once, None for no limit
+    concurrency: Optional[int] = None
+    max_attempts: int = 3
+
+
+job_types: dict[str, JobType] = {}
+
+
+def job(name: str, concurrency: Optional[int] = None, max_attempts: int = 3):
+    """
+    Register a function as a job type. The function receives the
+    :class:`Job` and reads its arguments from ``job.payload``.
+    """
+    def register(function: Callable[[Job], None]) -> Callable[[Job], None]:
+        job_types[name] = JobType(name, function, concurrency, max_attempts)
+        return function
+    return register
+
+
+def enqueue(kind: str, payload: Optional[dict] = None, priority: int = 0, run_after: Optional[datetime] = None) -> Job:
+    if kind not in job_types:
+        raise KeyError(f'Unknown job type {kind}')
+    fields = {'kind': kind, 'payload': payload or {}, 'priority': priority, 'max_attempts': job_types[kind].max_attempts}
+    if run_after is not None:
+        fields['run_after'] = run_after
+    return Job.objects.create(**fields)
+
+
+def enqueue_once(kind: str, payload: Optional[dict] = None, priority: int = 0) -> None:
+    """
+    Enqueue ``kind`` after the current transaction commits, unless
+    such a job is already waiting to run
+    """
+    def enqueue_if_idle() -> None:
+        if not Job.objects.filter(kind=kind, status='queued').exists():
+            enqueue(kind, payload, priority)
+    transaction.on_commit(enqueue_if_idle)
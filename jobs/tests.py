@@ -0,0 +1,168 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import Permission, User
+from django.test import TestCase
+from django.utils import timezone
+
+from financial.models import FinancialRequest
+from jobs.models import Job
+from jobs.registry import enqueue, job
+from jobs.worker import Worker, requeue_stale
+
+calls = []
+
+
+@job('tests.record', max_attempts=2)
+def record(job: Job) -> None:
+    calls.append(job.payload['name'])
+    job.report_progress(50, 'Halfway')
+
+
+@job('tests.fail', max_attempts=2)
+def fail(job: Job) -> None:
+    raise ValueError('Broken')
+
+
+@job('tests.single', concurrency=1)
+def single(job: Job) -> None:
+    pass
+
+
+class WorkerTestCase(TestCase):
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker('test-worker')
+
+    def test_jobs_run_by_priority(self):
+        """
+        Test that higher priority jobs run first and queued order breaks ties
+        """
+        enqueue('tests.record', {'name': 'low'})
+        enqueue('tests.record', {'name': 'high'}, priority=10)
+        enqueue('tests.record', {'name': 'low again'})
+        self.worker.run_forever(burst=True)
+        self.assertEqual(calls, ['high', 'low', 'low again'])
+        self.assertEqual(Job.objects.filter(status='succeeded', progress=100).count(), 3)
+
+    def test_future_jobs_wait(self):
+        """
+        Test that a job is not claimed before its run_after time
+        """
+        enqueue('tests.record', {'name': 'later'}, run_after=timezone.now() + timedelta(hours=1))
+        self.assertFalse(self.worker.run_once())
+
+    def test_failed_job_is_retried_then_failed(self):
+        """
+        Test that a failing job is retried after a delay until it runs out of attempts
+        """
+        failing = enqueue('tests.fail')
+        self.assertTrue(self.worker.run_once())
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), ('queued', 1))
+        self.assertGreater(failing.run_after, timezone.now())
+        self.assertIn('Broken', failing.error)
+
+        Job.objects.filter(pk=failing.pk).update(run_after=timezone.now())
+        self.assertTrue(self.worker.run_once())
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), ('failed', 2))
+        self.assertIsNotNone(failing.finished_at)
+
+    def test_concurrency_limit(self):
+        """
+        Test that a job type at its concurrency limit is skipped while other types run
+        """
+        running = enqueue('tests.single')
+        Job.objects.filter(pk=running.pk).update(status='running', started_at=timezone.now())
+        waiting = enqueue('tests.single', priority=10)
+        enqueue('tests.record', {'name': 'other'})
+        self.assertTrue(self.worker.run_once())
+        self.assertEqual(calls, ['other'])
+        self.assertFalse(self.worker.run_once())
+        waiting.refresh_from_db()
+        self.assertEqual(waiting.status, 'queued')
+
+    def test_racing_claim_over_limit_is_undone(self):
+        """
+        Test that a job claimed beside an earlier running job of a limited type goes back to the queue
+        """
+        earlier = enqueue('tests.single')
+        later = enqueue('tests.single')
+        Job.objects.filter(pk=earlier.pk).update(status='running')
+        self.assertTrue(self.worker.over_concurrency(later))
+        self.assertFalse(self.worker.over_concurrency(earlier))
+
+    def test_stale_jobs_are_requeued(self):
+        """
+        Test that jobs left running by a dead worker are queued again
+        """
+        stale = enqueue('tests.record', {'name': 'stale'})
+        Job.objects.filter(pk=stale.pk).update(status='running', started_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(requeue_stale(timedelta(hours=1)), 1)
+        self.worker.run_forever(burst=True)
+        self.assertEqual(calls, ['stale'])
+
+    def test_unknown_job_type(self):
+        """
+        Test that enqueueing an unregistered job type fails
+        """
+        with self.assertRaises(KeyError):
+            enqueue('tests.missing')
+
+
+class BulkApprovalJobTestCase(TestCase):
+    def test_approve_requests(self):
+        """
+        Test that the bulk approval job approves the pending requests it was given
+        """
+        requests = [
+            FinancialRequest.objects.create(
+                requesting_department='admin',
+                project_reference=f'Project {number}',
+                required_amount=1000,
+                reason='Test',
+            )
+            for number in range(3)
+        ]
+        bulk = enqueue('financial.approve_requests', {'ids': [r.pk for r in requests[:2]]})
+        Worker('test-worker').run_forever(burst=True)
+        bulk.refresh_from_db()
+        self.assertEqual(bulk.status, 'succeeded')
+        self.assertEqual(
+            list(FinancialRequest.objects.order_by('id').values_list('_status', flat=True)),
+            ['approved', 'approved', 'pending_financial_approval'],
+        )
+
+
+class JobAdminTestCase(TestCase):
+    def setUp(self):
+        self.job = Job.objects.create(
+            kind='tests.fail', status='failed', attempts=2, worker='gone-worker',
+            started_at=timezone.now(), finished_at=timezone.now(), progress=40,
+        )
+
+    def retry_as(self, *codenames: str):
+        user = User.objects.create(username='operator', is_staff=True)
+        user.user_permissions.set(Permission.objects.filter(codename__in=codenames))
+        self.client.force_login(user)
+        return self.client.post('/jobs/job/', {'action': 'retry', '_selected_action': [self.job.pk]})
+
+    def test_viewers_cannot_retry(self):
+        """
+        Test that users who can only view jobs do not get the retry action
+        """
+        response = self.retry_as('view_job')
+        self.assertNotContains(response, 'value="retry"', status_code=200)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'failed')
+
+    def test_retry_clears_the_lease(self):
+        """
+        Test that a retried job is queued without the worker and start of its last attempt
+        """
+        self.retry_as('view_job', 'change_job')
+        self.job.refresh_from_db()
+        self.assertEqual(
+            (self.job.status, self.job.attempts, self.job.worker, self.job.started_at, self.job.progress),
+            ('queued', 0, '', None, 0),
+        )
@@ -0,0 +1,122 @@
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+from typing import Optional
+
+from django.db.models import Count, F
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.registry import job_types
+
+logger = logging.getLogger(__name__)
+
+# Candidates a worker tries to claim before concluding others took them all
+CLAIM_ATTEMPTS = 10
+# Base of the exponential delay before a failed job is retried
+RETRY_DELAY = timedelta(seconds=30)
+
+
+class Worker:
+    """
+    Claims queued jobs one at a time and runs them
+    """
+    def __init__(self, name: Optional[str] = None, kinds: Optional[list[str]] = None):
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.kinds = kinds
+
+    def full_kinds(self) -> list[str]:
+        """
+        Job types already running as many jobs as their concurrency allows
+        """
+        running = dict(
+            Job.objects.filter(status='running').values_list('kind').annotate(count=Count('id')).order_by()
+        )
+        return [
+            name for name, job_type in job_types.items()
+            if job_type.concurrency is not None and running.get(name, 0) >= job_type.concurrency
+        ]
+
+    def claim(self) -> Optional[Job]:
+        now = timezone.now()
+        candidates = Job.objects.filter(status='queued', run_after__lte=now, kind__in=list(job_types))
+        if self.kinds is not None:
+            candidates = candidates.filter(kind__in=self.kinds)
+        candidates = candidates.exclude(kind__in=self.full_kinds()).order_by('-priority', 'run_after', 'id')
+        for job in candidates[:CLAIM_ATTEMPTS]:
+            claimed = Job.objects.filter(pk=job.pk, status='queued').update(
+                status='running', worker=self.name, started_at=now, attempts=F('attempts') + 1,
+            )
+            if not claimed:
+                continue
+            if self.over_concurrency(job):
+                # Another worker claimed a job of the same type at the same time
+                Job.objects.filter(pk=job.pk).update(status='queued', worker='', attempts=F('attempts') - 1)
+                continue
+            job.refresh_from_db()
+            return job
+        return None
+
+    def over_concurrency(self, job: Job) -> bool:
+        limit = job_types[job.kind].concurrency
+        if limit is None:
+            return False
+        earlier_running = Job.objects.filter(kind=job.kind, status='running', id__lt=job.pk).count()
+        return earlier_running >= limit
+
+    def run(self, job: Job) -> None:
+        try:
+            job_types[job.kind].function(job)
+        except Exception:
+            logger.exception('Job %s failed', job)
+            retry = job.attempts < job.max_attempts
+            Job.objects.filter(pk=job.pk).update(
+                status='queued' if retry else 'failed',
+                run_after=timezone.now() + RETRY_DELAY * 2 ** (job.attempts - 1),
+                error=traceback.format_exc(),
+                finished_at=None if retry else timezone.now(),
+            )
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status='succeeded', progress=100, error='', finished_at=timezone.now(),
+            )
+
+    def run_once(self) -> bool:
+        """
+        Run the next job, returning False when there was nothing to do
+        """
+        job = self.claim()
+        if job is None:
+            return False
+        self.run(job)
+        return True
+
+    def run_forever(self, poll_interval: float = 1, burst: bool = False) -> None:
+        while True:
+            if not self.run_once():
+                if burst:
+                    return
+                time.sleep(poll_interval)
+
+
+def requeue_stale(timeout: timedelta) -> int:
+    """
+    Put back jobs whose worker died while running them
+    """
+    return Job.objects.filter(status='running', started_at__lt=timezone.now() - timeout).update(
+        status='queued', worker='',
+    )
+
+
+def work(name: str, kinds: Optional[list[str]], poll_interval: float, burst: bool) -> None:
+    """
+    Entry point of a worker process started by ``run_workers``
+    """
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    Worker(name, kinds).run_forever(poll_interval, burst)
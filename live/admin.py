@@ -0,0 +1,124 @@
+import asyncio
+import json
+from typing import AsyncIterator, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpRequest, StreamingHttpResponse
+from django.urls import path, reverse
+
+from archive.archiver import ARCHIVED_MODELS
+from live.broadcaster import broadcaster, read_since
+from notifications.dispatcher import NEXT_ROLES
+from outbox.models import OutboxEvent
+from roles.models import Role
+from roles.registry import user_roles
+
+# The statuses each role works on, pool tasks included
+QUEUE_ROLES = {**NEXT_ROLES, ('tasks.Task', 'pending_subteam_approval'): frozenset({Role.SUBTEAM})}
+# Seconds between keepalive comments on an idle stream
+HEARTBEAT = 15
+
+
+def stream_lifetime() -> float:
+    # Streams are closed after a while and the browser reconnects, so
+    # a client that went away without a disconnect is not kept forever
+    return getattr(settings, 'LIVE_STREAM_SECONDS', 300)
+
+
+class LiveQueueMixin:
+    """
+    Adds a ``live/`` server-sent events stream to a changelist, pushing
+    rows as they enter, change in or leave the queue the user sees
+    """
+    class Media:
+        js = ('live/queue.js',)
+
+    def visible_statuses(self, roles: frozenset[int]) -> Optional[set[str]]:
+        """
+        Statuses of the records the changelist shows to a user with
+        ``roles``, None for all of them. Keep in line with get_queryset.
+        """
+        return None
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('live/', self.live_view, name='%s_%s_live' % info),
+        ] + super().get_urls()
+
+    def authorize_live(self, request: HttpRequest) -> frozenset[int]:
+        if not (request.user.is_active and request.user.is_staff and self.has_view_permission(request)):
+            raise PermissionDenied
+        return user_roles(request.user)
+
+    def live_message(self, event: OutboxEvent, roles: frozenset[int], visible: Optional[set[str]]) -> Optional[dict]:
+        """
+        What the outbox event changes in the changelist of a user, if anything
+        """
+        was_visible = event.kind != 'created' and (visible is None or event.previous_status in visible)
+        is_visible = visible is None or event.status in visible
+        if was_visible and is_visible:
+            action = 'changed'
+        elif is_visible:
+            action = 'added'
+        elif was_visible:
+            action = 'removed'
+        else:
+            return None
+        fields = ARCHIVED_MODELS.get(event.model, ())
+        return {
+            'action': action,
+            'id': event.object_id,
+            'label': ' '.join(str(event.payload[f]) for f in fields if event.payload.get(f) not in (None, '')),
+            'status': event.status,
+            'status_display': dict(self.model._meta.get_field('_status').flatchoices).get(event.status, event.status),
+            'yours': not roles.isdisjoint(QUEUE_ROLES.get((event.model, event.status), ())),
+            'url': reverse(
+                'admin:%s_%s_change' % (self.model._meta.app_label, self.model._meta.model_name),
+                args=[event.object_id],
+                current_app=self.admin_site.name,
+            ),
+        }
+
+    async def live_events(self, roles: frozenset[int], last_event_id: int) -> AsyncIterator[str]:
+        label = self.model._meta.label
+        visible = self.visible_statuses(roles)
+        queue = await broadcaster.subscribe()
+        try:
+            yield 'retry: 3000\n\n'
+            # Catch up on what a reconnecting browser missed
+            backlog = await sync_to_async(read_since)(last_event_id) if last_event_id else []
+            loop = asyncio.get_running_loop()
+            closes_at = loop.time() + stream_lifetime()
+            while (remaining := closes_at - loop.time()) > 0:
+                if backlog:
+                    event = backlog.pop(0)
+                else:
+                    try:
+                        event = await asyncio.wait_for(queue.get(), min(HEARTBEAT, remaining))
+                    except asyncio.TimeoutError:
+                        yield ': keepalive\n\n'
+                        continue
+                if event is None:
+                    return
+                if event.pk <= last_event_id or event.model != label:
+                    continue
+                last_event_id = event.pk
+                message = self.live_message(event, roles, visible)
+                if message is not None:
+                    yield f'id: {event.pk}\nevent: queue\ndata: {json.dumps(message)}\n\n'
+        finally:
+            broadcaster.unsubscribe(queue)
+
+    async def live_view(self, request: HttpRequest) -> StreamingHttpResponse:
+        roles = await sync_to_async(self.authorize_live)(request)
+        last_event_id = request.headers.get('Last-Event-ID', '')
+        response = StreamingHttpResponse(
+            self.live_events(roles, int(last_event_id) if last_event_id.isdigit() else 0),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -0,0 +1,81 @@
+import asyncio
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Max
+
+from outbox.models import OutboxEvent
+
+# Events kept for a client that stopped reading before it is dropped
+QUEUE_SIZE = 1000
+BATCH_SIZE = 500
+
+
+def poll_interval() -> float:
+    return getattr(settings, 'LIVE_POLL_INTERVAL', 1.0)
+
+
+def latest_position() -> int:
+    return OutboxEvent.objects.aggregate(position=Max('id'))['position'] or 0
+
+
+def read_since(position: int) -> list[OutboxEvent]:
+    return list(OutboxEvent.objects.filter(id__gt=position).order_by('id')[:BATCH_SIZE])
+
+
+class Broadcaster:
+    """
+    Polls the outbox once per interval on behalf of every connected
+    client of the process, so the database cost does not grow with the
+    number of open pages, and stops polling when the last client leaves.
+    """
+    def __init__(self):
+        self.subscribers: set[asyncio.Queue] = set()
+        self.position: int = 0
+        self.task: Optional[asyncio.Task] = None
+
+    async def subscribe(self) -> asyncio.Queue:
+        if self.task is None or self.task.done() or self.task.get_loop() is not asyncio.get_running_loop():
+            self.subscribers.clear()
+            self.position = await sync_to_async(latest_position)()
+            self.task = asyncio.create_task(self.run())
+        queue = asyncio.Queue(QUEUE_SIZE)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.subscribers.discard(queue)
+
+    def drop(self, queue: asyncio.Queue) -> None:
+        """
+        Disconnect a client that fell too far behind. Its browser
+        reconnects and catches up from the last event id it received.
+        """
+        self.unsubscribe(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    async def poll(self) -> None:
+        events = await sync_to_async(read_since)(self.position)
+        if not events:
+            return
+        self.position = events[-1].pk
+        for queue in list(self.subscribers):
+            for event in events:
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    self.drop(queue)
+                    break
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(poll_interval())
+            if not self.subscribers:
+                return
+            await self.poll()
+
+
+broadcaster = Broadcaster()
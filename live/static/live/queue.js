@@ -0,0 +1,71 @@
+/*
+ * Keeps a changelist up to date from its live/ server-sent events stream:
+ * patches the result count and adds, updates or removes rows in place.
+ */
+'use strict';
+{
+    function findRow(url) {
+        const link = document.querySelector('#result_list tbody a[href="' + url + '"]');
+        return link ? link.closest('tr') : null;
+    }
+
+    function patchCount(delta) {
+        const paginator = document.querySelector('#changelist .paginator');
+        if (!paginator) {
+            return;
+        }
+        for (const node of paginator.childNodes) {
+            if (node.nodeType === Node.TEXT_NODE && /\d/.test(node.textContent)) {
+                node.textContent = node.textContent.replace(/\d+/, count => Math.max(0, Number(count) + delta));
+                return;
+            }
+        }
+    }
+
+    function addRow(message) {
+        const table = document.querySelector('#result_list tbody');
+        const columns = document.querySelectorAll('#result_list thead th').length;
+        const row = document.createElement('tr');
+        row.className = 'live-added';
+        const cell = document.createElement('td');
+        cell.colSpan = columns;
+        const link = document.createElement('a');
+        link.href = message.url;
+        link.textContent = message.label || '#' + message.id;
+        cell.append(link, ' — ', message.status_display);
+        row.append(cell);
+        table.prepend(row);
+    }
+
+    function apply(message) {
+        const row = findRow(message.url);
+        if (message.action === 'removed') {
+            if (row) {
+                row.remove();
+                patchCount(-1);
+            }
+        } else if (message.action === 'added' && !row) {
+            addRow(message);
+            patchCount(1);
+        } else if (row) {
+            const status = row.querySelector('.field-_status');
+            if (status) {
+                status.textContent = message.status_display;
+            }
+        }
+        const updated = findRow(message.url);
+        if (updated) {
+            updated.classList.toggle('live-yours', message.yours);
+            updated.style.fontWeight = message.yours ? 'bold' : '';
+        }
+    }
+
+    window.addEventListener('load', function() {
+        if (!document.querySelector('#result_list tbody') || !window.EventSource) {
+            return;
+        }
+        const source = new EventSource(new URL('live/', window.location.href.split('?')[0]).href);
+        source.addEventListener('queue', event => apply(JSON.parse(event.data)));
+        window.addEventListener('beforeunload', () => source.close());
+    });
+}
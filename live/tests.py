@@ -0,0 +1,114 @@
+import asyncio
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import Group, Permission, User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from financial.models import FinancialRequest
+from live.broadcaster import broadcaster
+from outbox.models import OutboxEvent
+from roles.models import Role
+
+def create_financial_request(reference: str = 'Project') -> FinancialRequest:
+    """
+    Create a financial request pending approval
+    """
+    return FinancialRequest.objects.create(
+        requesting_department='admin',
+        project_reference=reference,
+        required_amount=1000,
+        reason='Test',
+    )
+
+class LiveMessageTestCase(TestCase):
+    def setUp(self) -> None:
+        self.admin = site._registry[FinancialRequest]
+
+    def messages(self, roles: frozenset[int]) -> list:
+        visible = self.admin.visible_statuses(roles)
+        return [
+            self.admin.live_message(event, roles, visible)
+            for event in OutboxEvent.objects.order_by('id')
+        ]
+
+    def test_financial_manager_queue(self):
+        """
+        Test that an approved request leaves the queue of a financial manager
+        """
+        financial_request = create_financial_request()
+        financial_request.save()
+        added, removed = self.messages(frozenset({Role.FINANCIAL_MANAGER}))
+        self.assertEqual((added['action'], added['yours']), ('added', True))
+        self.assertEqual(added['label'], 'Project admin')
+        self.assertEqual(added['url'], f'/financial/financialrequest/{financial_request.pk}/change/')
+        self.assertEqual((removed['action'], removed['status_display']), ('removed', 'Approved'))
+
+    def test_other_roles_see_status_change(self):
+        """
+        Test that users seeing every request get the approval as a change of an existing row
+        """
+        create_financial_request().save()
+        added, changed = self.messages(frozenset({Role.HR}))
+        self.assertEqual((added['action'], added['yours']), ('added', False))
+        self.assertEqual(changed['action'], 'changed')
+
+
+@override_settings(LIVE_POLL_INTERVAL=0.01)
+class LiveStreamTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user: User = User.objects.create(username='finance', is_staff=True)
+        group = Group.objects.create(name='Financial Managers')
+        group.permissions.add(Permission.objects.get(codename='view_financialrequest'))
+        self.user.groups.add(group)
+
+    # Only the explicit polls, however long the scenario takes
+    @override_settings(LIVE_POLL_INTERVAL=60)
+    def test_idle_clients_share_one_query(self):
+        """
+        Test that connected clients cost one outbox query per poll between them
+        """
+        async def scenario():
+            queues = [await broadcaster.subscribe() for _ in range(50)]
+            await broadcaster.poll()
+            await sync_to_async(create_financial_request)()
+            await broadcaster.poll()
+            for queue in queues:
+                broadcaster.unsubscribe(queue)
+            broadcaster.task.cancel()
+            return [queue.qsize() for queue in queues]
+
+        with CaptureQueriesContext(connection) as queries:
+            sizes = async_to_sync(scenario)()
+        outbox_reads = [q for q in queries.captured_queries if 'outbox_outboxevent' in q['sql'] and 'SELECT' in q['sql']]
+        # The starting position, then one read per poll
+        self.assertEqual(len(outbox_reads), 3)
+        self.assertEqual(sizes, [1] * 50)
+
+    async def test_stream_pushes_new_rows(self):
+        """
+        Test that the changelist stream pushes a request created after connecting
+        """
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get('/financial/financialrequest/live/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        self.assertEqual(await stream.__anext__(), b'retry: 3000\n\n')
+        read = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.05)
+        await sync_to_async(create_financial_request)('Live project')
+        chunk = (await asyncio.wait_for(read, 5)).decode()
+        self.assertIn('event: queue', chunk)
+        self.assertIn('"action": "added"', chunk)
+        self.assertIn('Live project', chunk)
+        await stream.aclose()
+        broadcaster.task.cancel()
+
+    async def test_stream_requires_staff(self):
+        """
+        Test that anonymous users cannot open the stream
+        """
+        response = await self.async_client.get('/financial/financialrequest/live/')
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,73 @@
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db.models.query import QuerySet
+from django.http import HttpRequest
+from django.utils import timezone
+
+from notifications.models import Notification
+
+
+class UnreadFilter(admin.SimpleListFilter):
+    title = 'read'
+    parameter_name = 'unread'
+
+    def lookups(self, request, model_admin):
+        return [('1', 'Unread')]
+
+    def queryset(self, request, queryset):
+        if self.value() == '1':
+            return queryset.filter(read_at__isnull=True)
+        return queryset
+
+
+class NotificationAdmin(admin.ModelAdmin):
+    """
+    In-app inbox: every user sees their own notifications
+    """
+    list_display = (
+        'message',
+        'created_at',
+        'delivered_at',
+        'read_at',
+    )
+    list_filter = (
+        UnreadFilter,
+        'model',
+    )
+    readonly_fields = (
+        'recipient',
+        'model',
+        'object_id',
+        'status',
+        'message',
+        'created_at',
+        'delivered_at',
+        'read_at',
+    )
+    actions = ['mark_read']
+
+    def get_queryset(self, request: HttpRequest) -> QuerySet[Notification]:
+        user: User = request.user
+        queryset = super().get_queryset(request)
+        if user.is_superuser:
+            return queryset
+        return queryset.filter(recipient=user)
+
+    def has_module_permission(self, request):
+        return request.user.is_active and request.user.is_staff
+
+    def has_view_permission(self, request, obj=None):
+        user: User = request.user
+        return user.is_active and user.is_staff and (obj is None or user.is_superuser or obj.recipient_id == user.pk)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description='Mark selected notifications as read')
+    def mark_read(self, request: HttpRequest, queryset: QuerySet[Notification]) -> None:
+        queryset.filter(read_at__isnull=True).update(read_at=timezone.now())
+
+admin.site.register(Notification, NotificationAdmin)
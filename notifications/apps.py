@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_save
+
+
+class NotificationsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'notifications'
+
+    def ready(self):
+        from notifications.dispatcher import schedule_dispatch
+        from outbox.models import OutboxEvent
+        post_save.connect(schedule_dispatch, sender=OutboxEvent, dispatch_uid='notifications_schedule_dispatch')
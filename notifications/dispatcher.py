@@ -0,0 +1,173 @@
+import time
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from jobs.registry import enqueue_once
+from notifications.models import Notification
+from outbox.consumer import Consumer
+from outbox.models import OutboxEvent
+from roles.models import Role
+from roles.registry import MANAGER_ROLES, users_with_role
+
+CONSUMER = 'notifications'
+
+# The roles responsible for a record in each status
+NEXT_ROLES: dict[tuple[str, str], frozenset[Role]] = {
+    ('events.Event', 'pending_senior_approval'): frozenset({Role.SENIOR_CUSTOMER_SERVICE}),
+    ('events.Event', 'pending_finance_approval'): frozenset({Role.FINANCIAL_MANAGER}),
+    ('events.Event', 'pending_admin_approval'): frozenset({Role.ADMINISTRATION_MANAGER}),
+    ('events.Event', 'pending_senior_final_approval'): frozenset({Role.SENIOR_CUSTOMER_SERVICE}),
+    ('tasks.Task', 'pending_manager_approval'): MANAGER_ROLES,
+    ('staff.Recruitment', 'pending_hr_approval'): frozenset({Role.HR}),
+    ('staff.Recruitment', 'pending_manager_approval'): MANAGER_ROLES,
+    ('financial.FinancialRequest', 'pending_financial_approval'): frozenset({Role.FINANCIAL_MANAGER}),
+}
+
+
+@dataclass
+class DispatchReport:
+    events: int = 0
+    notifications: int = 0
+    digests: int = 0
+    seconds: float = 0
+    recipients: set[int] = field(default_factory=set, repr=False)
+
+    @property
+    def rate(self) -> float:
+        """
+        Notifications per second
+        """
+        return self.notifications / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f'{self.events} changes, {self.notifications} notifications, {self.digests} digests '
+            f'in {self.seconds:.2f}s ({self.rate:.0f} notifications/s)'
+        )
+
+
+class Router:
+    """
+    Resolves who to notify about an outbox event, remembering the members
+    of each role and group for the rest of the batch
+    """
+    def __init__(self):
+        self.members: dict = {}
+
+    def recipients(self, event: OutboxEvent) -> list[int]:
+        if event.model == 'tasks.Task' and event.status == 'pending_subteam_approval':
+            if event.payload.get('assigned_to_id'):
+                return [event.payload['assigned_to_id']]
+            # A pool task: any member of its subteam group may claim it
+            group_id = event.payload['group_id']
+            key = ('group', group_id)
+            if key not in self.members:
+                self.members[key] = list(
+                    User.objects.filter(groups=group_id, is_active=True).values_list('pk', flat=True)
+                )
+            return self.members[key]
+        roles = NEXT_ROLES.get((event.model, event.status))
+        if roles is None:
+            return []
+        if roles not in self.members:
+            self.members[roles] = list(users_with_role(*roles).filter(is_active=True).values_list('pk', flat=True))
+        return self.members[roles]
+
+
+def message(event: OutboxEvent) -> str:
+    model = apps.get_model(event.model)
+    status = dict(model._meta.get_field('_status').flatchoices).get(event.status, event.status)
+    return f'{model._meta.verbose_name.capitalize()} #{event.object_id}: {status}'[:255]
+
+
+def fan_out(batch_size: int = 500, report: Optional[DispatchReport] = None) -> DispatchReport:
+    """
+    Turn the unread outbox events into notifications for the next
+    responsible users
+    """
+    report = report or DispatchReport()
+    consumer = Consumer(CONSUMER, batch_size)
+    router = Router()
+    while batch := consumer.read():
+        notifications = [
+            Notification(
+                recipient_id=recipient,
+                model=event.model,
+                object_id=event.object_id,
+                status=event.status,
+                message=message(event),
+            )
+            for event in batch
+            for recipient in router.recipients(event)
+        ]
+        Notification.objects.bulk_create(notifications, batch_size=batch_size)
+        consumer.acknowledge(batch)
+        report.events += len(batch)
+        report.notifications += len(notifications)
+        report.recipients.update(n.recipient_id for n in notifications)
+    return report
+
+
+def digest(recipient: User, notifications: list[Notification]) -> EmailMessage:
+    lines = [f'- {notification.message}' for notification in notifications]
+    return EmailMessage(
+        subject=f'{len(notifications)} workflow items waiting for you',
+        body='\n'.join(['The following items need your attention:', '', *lines]),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[recipient.email],
+    )
+
+
+def deliver_digests(batch_size: int = 500, report: Optional[DispatchReport] = None) -> DispatchReport:
+    """
+    Mail every recipient one digest of their undelivered notifications.
+    Recipients without an email address only see them in the admin.
+    """
+    report = report or DispatchReport()
+    connection = get_connection()
+    while True:
+        recipient_ids = list(
+            Notification.objects.filter(delivered_at__isnull=True)
+            .values_list('recipient_id', flat=True).distinct().order_by('recipient_id')[:batch_size]
+        )
+        if not recipient_ids:
+            return report
+        pending = (
+            Notification.objects.filter(delivered_at__isnull=True, recipient_id__in=recipient_ids)
+            .select_related('recipient').order_by('recipient_id', 'id')
+        )
+        messages, delivered = [], []
+        for recipient, notifications in groupby(pending, key=lambda n: n.recipient):
+            notifications = list(notifications)
+            delivered += [n.pk for n in notifications]
+            if recipient.email:
+                messages.append(digest(recipient, notifications))
+        connection.send_messages(messages)
+        Notification.objects.filter(pk__in=delivered).update(delivered_at=timezone.now())
+        report.digests += len(messages)
+
+
+def dispatch(batch_size: int = 500) -> DispatchReport:
+    """
+    Fan out the outbox into notifications and deliver the digests
+    """
+    started = time.perf_counter()
+    report = fan_out(batch_size)
+    deliver_digests(batch_size, report)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def schedule_dispatch(sender, instance: OutboxEvent, created: bool, **kwargs) -> None:
+    """
+    Dispatch notifications off the request path once the change commits
+    """
+    if created:
+        enqueue_once('notifications.dispatch')
@@ -0,0 +1,9 @@
+from jobs.models import Job
+from jobs.registry import job
+from notifications.dispatcher import dispatch
+
+
+@job('notifications.dispatch', concurrency=1)
+def dispatch_job(job: Job) -> None:
+    report = dispatch()
+    job.report_progress(100, str(report))
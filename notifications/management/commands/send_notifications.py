@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from notifications.dispatcher import dispatch
+
+
+class Command(BaseCommand):
+    help = 'Turn outstanding workflow changes into notifications and mail the digests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        report = dispatch(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(str(report)))
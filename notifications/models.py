@@ -0,0 +1,30 @@
+from django.db import models
+
+
+class Notification(models.Model):
+    """
+    Tells a user a workflow record is waiting for them. Undelivered
+    notifications are mailed in one digest per recipient and stay
+    visible in the admin until read.
+    """
+    recipient = models.ForeignKey('auth.User', on_delete=models.CASCADE, related_name='notifications')
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    status = models.CharField(max_length=40)
+    message = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(blank=True, null=True)
+    read_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['recipient', 'id'],
+                condition=models.Q(delivered_at__isnull=True),
+                name='notification_undelivered_idx',
+            ),
+            models.Index(fields=['recipient', 'read_at'], name='notification_unread_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return self.message
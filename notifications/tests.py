@@ -0,0 +1,137 @@
+from django.contrib.auth.models import Group, User
+from django.core import mail
+from django.test import TestCase
+
+from events.models import Event
+from financial.models import FinancialRequest
+from jobs.models import Job
+from jobs.registry import enqueue
+from jobs.worker import Worker
+from notifications.dispatcher import deliver_digests, dispatch, fan_out
+from notifications.models import Notification
+from tasks.models import Task
+
+def create_member(username: str, group_name: str, email: str = '') -> User:
+    """
+    Create a user in the given group, without a password to keep the tests fast
+    """
+    user = User.objects.create(username=username, email=email, is_staff=True)
+    user.groups.add(Group.objects.get_or_create(name=group_name)[0])
+    return user
+
+def create_event(client_name: str = 'Test Client') -> Event:
+    """
+    Create a pending event
+    """
+    return Event.objects.create(
+        client_name=client_name,
+        event_type='Test Event',
+        from_date='2021-01-01',
+        to_date='2021-01-01',
+        attendes=100,
+        expected_budget=1000,
+    )
+
+class FanOutTestCase(TestCase):
+    def setUp(self) -> None:
+        self.senior = create_member('senior', 'Senior Customer Service', 'senior@example.com')
+        self.finance = create_member('finance', 'Financial Managers', 'finance@example.com')
+        self.subteam = create_member('subteam', 'Subteam Audio')
+        self.other_subteam = create_member('other', 'Subteam Decorations')
+
+    def test_event_transitions_notify_next_role(self):
+        """
+        Test that each event transition notifies the role responsible for the new status
+        """
+        event = create_event()
+        event.save()
+        fan_out()
+        self.assertEqual(
+            list(Notification.objects.order_by('id').values_list('recipient__username', 'status')),
+            [('senior', 'pending_senior_approval'), ('finance', 'pending_finance_approval')],
+        )
+        self.assertEqual(
+            Notification.objects.get(recipient=self.finance).message,
+            f'Event #{event.pk}: Pending Finance Manager Approval',
+        )
+
+    def test_assigned_task_notifies_assignee(self):
+        """
+        Test that an assigned task notifies only the assignee and a pool task its whole group
+        """
+        group = Group.objects.get(name='Subteam Audio')
+        create_member('subteam2', 'Subteam Audio')
+        Task.objects.create(project_ref='P1', description='Assigned', sender=self.senior, group=group, assigned_to=self.subteam)
+        Task.objects.create(project_ref='P2', description='Pool', sender=self.senior, group=group)
+        fan_out()
+        self.assertEqual(
+            sorted(Notification.objects.values_list('object_id', 'recipient__username')),
+            sorted([
+                (Task.objects.get(project_ref='P1').pk, 'subteam'),
+                (Task.objects.get(project_ref='P2').pk, 'subteam'),
+                (Task.objects.get(project_ref='P2').pk, 'subteam2'),
+            ]),
+        )
+
+    def test_outbox_is_read_once(self):
+        """
+        Test that running the fan out again does not duplicate notifications
+        """
+        create_event()
+        self.assertEqual(fan_out().notifications, 1)
+        self.assertEqual(fan_out().notifications, 0)
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_change_schedules_dispatch_job(self):
+        """
+        Test that a workflow change queues a single dispatch job once committed
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            create_event('First')
+            create_event('Second')
+        self.assertEqual(Job.objects.filter(kind='notifications.dispatch', status='queued').count(), 1)
+
+
+class DigestTestCase(TestCase):
+    def setUp(self) -> None:
+        self.finance = create_member('finance', 'Financial Managers', 'finance@example.com')
+        self.finance_without_email = create_member('finance2', 'Financial Managers')
+
+    def test_one_digest_per_recipient(self):
+        """
+        Test that pending notifications are mailed as one digest per recipient with an email address
+        """
+        for number in range(3):
+            FinancialRequest.objects.create(
+                requesting_department='admin',
+                project_reference=f'Project {number}',
+                required_amount=1000,
+                reason='Test',
+            )
+        report = dispatch()
+        self.assertEqual((report.events, report.notifications, report.digests), (3, 6, 1))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['finance@example.com'])
+        self.assertEqual(mail.outbox[0].subject, '3 workflow items waiting for you')
+        self.assertFalse(Notification.objects.filter(delivered_at__isnull=True).exists())
+        self.assertEqual(Notification.objects.filter(recipient=self.finance_without_email).count(), 3)
+
+        self.assertEqual(dispatch().digests, 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_bulk_approval_throughput(self):
+        """
+        Test that notifications for a bulk approval are dispatched by the job runner and measured
+        """
+        create_member('admin-manager', 'Administration Manager', 'admin@example.com')
+        events = [create_event(f'Client {number}') for number in range(50)]
+        for event in events:
+            event.save()
+        enqueue('notifications.dispatch')
+        Worker('test-worker').run_forever(burst=True)
+        job = Job.objects.get(kind='notifications.dispatch')
+        self.assertEqual(job.status, 'succeeded')
+        self.assertIn('100 notifications', job.progress_message)
+        self.assertIn('notifications/s', job.progress_message)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['finance@example.com'])
+        self.assertEqual(deliver_digests().digests, 0)
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_save
+
+
+class OutboxConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'outbox'
+
+    def ready(self):
+        from outbox.recorder import record_change
+        from workflow.models import workflow_models
+        for model in workflow_models():
+            post_save.connect(record_change, sender=model, dispatch_uid=f'outbox_record_change_{model._meta.label}')
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from outbox.models import OutboxCursor, OutboxEvent
+
+# Ids are handed out before commit, so on databases with concurrent
+# writers (PostgreSQL) an event can become visible after events with
+# higher ids. Ids skipped by a batch are read again for this long, the
+# longest a transaction writing to the outbox is expected to stay open.
+GAP_WINDOW = 60
+# A jump of more ids than this is not in-flight transactions, e.g. the
+# first read after older events were pruned
+MAX_GAP = 1000
+
+
+class Consumer:
+    """
+    Reads the outbox from the position the named consumer last acknowledged.
+
+        consumer = Consumer('reporting')
+        while batch := consumer.read():
+            handle(batch)
+            consumer.acknowledge(batch)
+    """
+    def __init__(self, name: str, batch_size: int = 500):
+        self.name = name
+        self.batch_size = batch_size
+
+    @property
+    def cursor(self) -> OutboxCursor:
+        return OutboxCursor.objects.get_or_create(consumer=self.name)[0]
+
+    @property
+    def position(self) -> int:
+        return self.cursor.position
+
+    def read(self) -> list[OutboxEvent]:
+        """
+        The next events after the position, and those that were missing
+        when the cursor moved past them and have been committed since
+        """
+        cursor = self.cursor
+        missing = Q(id__in=[int(event_id) for event_id in cursor.gaps]) if cursor.gaps else Q(pk__in=[])
+        return list(
+            OutboxEvent.objects.filter(Q(id__gt=cursor.position) | missing).order_by('id')[:self.batch_size]
+        )
+
+    def acknowledge(self, batch: list[OutboxEvent]) -> None:
+        if not batch:
+            return
+        window = getattr(settings, 'OUTBOX_GAP_WINDOW', GAP_WINDOW)
+        now = timezone.now().timestamp()
+        delivered = {event.pk for event in batch}
+        with transaction.atomic():
+            cursor = OutboxCursor.objects.select_for_update().get_or_create(consumer=self.name)[0]
+            gaps = {int(event_id): seen for event_id, seen in cursor.gaps.items() if int(event_id) not in delivered}
+            last_id = max(delivered)
+            if last_id > cursor.position:
+                previous = cursor.position
+                for event_id in sorted(event_id for event_id in delivered if event_id > previous):
+                    if event_id - previous - 1 <= MAX_GAP:
+                        gaps.update((missing, now) for missing in range(previous + 1, event_id))
+                    previous = event_id
+                cursor.position = last_id
+            cursor.gaps = {str(event_id): seen for event_id, seen in gaps.items() if now - seen < window}
+            cursor.save(update_fields=['position', 'gaps', 'updated_at'])
+
+
+def prune_acknowledged() -> int:
+    """
+    Delete the events every registered consumer has acknowledged, keeping
+    those a consumer may still receive late
+    """
+    position = None
+    for cursor_position, gaps in OutboxCursor.objects.values_list('position', 'gaps'):
+        cursor_position = min([cursor_position] + [int(event_id) - 1 for event_id in gaps])
+        position = cursor_position if position is None else min(position, cursor_position)
+    if position is None:
+        return 0
+    return OutboxEvent.objects.filter(id__lte=position).delete()[0]
@@ -0,0 +1,45 @@
+import json
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from outbox.consumer import Consumer
+
+
+class Command(BaseCommand):
+    help = 'Append workflow outbox events to a JSON lines file for downstream consumers to tail'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumer', default='file_sink',
+                            help='Name under which the read position is stored')
+        parser.add_argument('--output', default='-',
+                            help='File to append to, or - for standard output')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--follow', action='store_true',
+                            help='Keep waiting for new events')
+        parser.add_argument('--interval', type=float, default=1,
+                            help='Seconds between reads when following')
+
+    def handle(self, *args, **options):
+        consumer = Consumer(options['consumer'], options['batch_size'])
+        sink = sys.stdout if options['output'] == '-' else open(options['output'], 'a', encoding='utf-8')
+        try:
+            while True:
+                batch = consumer.read()
+                for event in batch:
+                    sink.write(json.dumps(event.as_dict(), cls=DjangoJSONEncoder) + '\n')
+                sink.flush()
+                if sink is not sys.stdout:
+                    os.fsync(sink.fileno())
+                # Only move the cursor once the batch is safely written
+                consumer.acknowledge(batch)
+                if len(batch) < options['batch_size']:
+                    if not options['follow']:
+                        break
+                    time.sleep(options['interval'])
+        finally:
+            if sink is not sys.stdout:
+                sink.close()
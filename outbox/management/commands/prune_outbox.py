@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from outbox.consumer import prune_acknowledged
+
+
+class Command(BaseCommand):
+    help = 'Delete outbox events that every consumer has acknowledged'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f'Deleted {prune_acknowledged()} outbox events'))
@@ -0,0 +1,47 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class OutboxEvent(models.Model):
+    """
+    A workflow change, written in the same transaction as the change itself.
+    Consumers read the outbox in ``id`` order instead of polling the
+    workflow tables.
+    """
+    created_at = models.DateTimeField(auto_now_add=True)
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    kind = models.CharField(max_length=20, choices=[
+        ('created', 'Created'),
+        ('status_changed', 'Status changed'),
+    ])
+    status = models.CharField(max_length=40)
+    previous_status = models.CharField(max_length=40, blank=True)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+
+    def as_dict(self) -> dict:
+        return {
+            'id': self.pk,
+            'created_at': self.created_at,
+            'model': self.model,
+            'object_id': self.object_id,
+            'kind': self.kind,
+            'status': self.status,
+            'previous_status': self.previous_status,
+            'payload': self.payload,
+        }
+
+
+class OutboxCursor(models.Model):
+    """
+    The last outbox event a consumer acknowledged, and the ids below it
+    that were not visible yet when it moved past them
+    """
+    consumer = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    # Missing id -> when it was first skipped, as a POSIX timestamp
+    gaps = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f'{self.consumer} at {self.position}'
@@ -0,0 +1,36 @@
+from outbox.models import OutboxEvent
+from workflow.models import WorkflowModel
+
+
+def payload(instance: WorkflowModel) -> dict:
+    """
+    Field values of the saved record, including ones still given as strings
+    """
+    return {
+        field.attname: field.to_python(getattr(instance, field.attname))
+        for field in instance._meta.concrete_fields
+    }
+
+
+def record_change(sender, instance: WorkflowModel, created: bool, raw: bool, **kwargs) -> None:
+    """
+    Write an outbox event when a workflow record is created or changes status
+    """
+    if raw:
+        return
+    loaded_values = getattr(instance, '_loaded_values', None)
+    previous_status = loaded_values.get('_status', '') if loaded_values else ''
+    if created:
+        kind = 'created'
+    elif loaded_values is not None and previous_status != instance._status:
+        kind = 'status_changed'
+    else:
+        return
+    OutboxEvent.objects.using(kwargs.get('using')).create(
+        model=sender._meta.label,
+        object_id=instance.pk,
+        kind=kind,
+        status=instance._status,
+        previous_status='' if created else previous_status,
+        payload=payload(instance),
+    )
@@ -0,0 +1,154 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from events.models import Event
+from outbox.consumer import Consumer, prune_acknowledged
+from outbox.models import OutboxEvent
+from workflow.models import ConcurrentUpdateError
+
+def create_event(client_name: str = 'Test Client') -> Event:
+    """
+    Create a pending event
+    """
+    return Event.objects.create(
+        client_name=client_name,
+        event_type='Test Event',
+        from_date='2021-01-01',
+        to_date='2021-01-01',
+        attendes=100,
+        expected_budget=1000,
+    )
+
+class OutboxRecorderTestCase(TestCase):
+    def test_create_and_status_change_are_recorded(self):
+        """
+        Test that creating a record and moving it forward both write an outbox event
+        """
+        event = create_event()
+        event.save()
+        events = list(OutboxEvent.objects.order_by('id'))
+        self.assertEqual([(e.kind, e.previous_status, e.status) for e in events], [
+            ('created', '', 'pending_senior_approval'),
+            ('status_changed', 'pending_senior_approval', 'pending_finance_approval'),
+        ])
+        self.assertEqual(events[0].model, 'events.Event')
+        self.assertEqual(events[0].object_id, event.pk)
+        self.assertEqual(events[0].payload['client_name'], 'Test Client')
+
+    def test_edit_without_status_change_is_not_recorded(self):
+        """
+        Test that saving a closed record without a status change writes nothing
+        """
+        event = create_event()
+        Event.objects.filter(pk=event.pk).update(_status='approved')
+        event = Event.objects.get(pk=event.pk)
+        event.client_name = 'Other Client'
+        event.save()
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+
+    def test_outbox_event_rolls_back_with_the_change(self):
+        """
+        Test that a failed save leaves no outbox event behind
+        """
+        event = create_event()
+        stale = Event.objects.get(pk=event.pk)
+        Event.objects.get(pk=event.pk).save()
+        with self.assertRaises(ConcurrentUpdateError):
+            with transaction.atomic():
+                stale.save()
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+
+class OutboxConsumerTestCase(TestCase):
+    def test_consumer_reads_from_its_cursor(self):
+        """
+        Test that a consumer gets each event once, in order, and independently of other consumers
+        """
+        for i in range(5):
+            create_event(f'Client {i}')
+        consumer = Consumer('reporting', batch_size=2)
+        seen = []
+        while batch := consumer.read():
+            seen += [event.payload['client_name'] for event in batch]
+            consumer.acknowledge(batch)
+        self.assertEqual(seen, [f'Client {i}' for i in range(5)])
+        self.assertEqual(len(Consumer('notifications').read()), 5)
+
+    def test_unacknowledged_batch_is_read_again(self):
+        """
+        Test that a consumer that crashed before acknowledging gets the same batch again
+        """
+        create_event()
+        consumer = Consumer('reporting')
+        first = consumer.read()
+        self.assertEqual(consumer.read(), first)
+
+    def test_late_commits_are_delivered(self):
+        """
+        Test that an event committed after events with higher ids is still read, once
+        """
+        for i in range(3):
+            create_event(f'Client {i}')
+        first, late, last = OutboxEvent.objects.order_by('id')
+        late_fields = {field.attname: getattr(late, field.attname) for field in OutboxEvent._meta.concrete_fields}
+        late.delete()
+        consumer = Consumer('reporting')
+        batch = consumer.read()
+        self.assertEqual(batch, [first, last])
+        consumer.acknowledge(batch)
+        self.assertEqual(list(consumer.cursor.gaps), [str(late_fields['id'])])
+        self.assertEqual(prune_acknowledged(), 1)
+        OutboxEvent.objects.create(**late_fields)
+        batch = consumer.read()
+        self.assertEqual([event.pk for event in batch], [late_fields['id']])
+        consumer.acknowledge(batch)
+        self.assertEqual(consumer.read(), [])
+        self.assertEqual(consumer.cursor.gaps, {})
+
+    def test_gaps_expire(self):
+        """
+        Test that an id that never shows up is given up after the gap window
+        """
+        for i in range(3):
+            create_event(f'Client {i}')
+        OutboxEvent.objects.order_by('id')[1].delete()
+        consumer = Consumer('reporting')
+        consumer.acknowledge(consumer.read())
+        create_event('Later')
+        later = timezone.now() + timedelta(minutes=5)
+        with mock.patch('outbox.consumer.timezone.now', return_value=later):
+            consumer.acknowledge(consumer.read())
+        self.assertEqual(consumer.cursor.gaps, {})
+
+    def test_prune_keeps_events_some_consumer_still_needs(self):
+        """
+        Test that only events acknowledged by every consumer are deleted
+        """
+        for i in range(3):
+            create_event(f'Client {i}')
+        fast, slow = Consumer('fast'), Consumer('slow', batch_size=1)
+        fast.acknowledge(fast.read())
+        slow.acknowledge(slow.read())
+        self.assertEqual(prune_acknowledged(), 1)
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+
+    def test_tail_command_appends_json_lines(self):
+        """
+        Test that the file sink writes every event once across runs
+        """
+        create_event('First')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'outbox.jsonl')
+            call_command('outbox_tail', output=path)
+            create_event('Second')
+            call_command('outbox_tail', output=path)
+            with open(path) as sink:
+                lines = [json.loads(line) for line in sink]
+        self.assertEqual([line['payload']['client_name'] for line in lines], ['First', 'Second'])
+        self.assertEqual(lines[0]['kind'], 'created')
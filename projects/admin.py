@@ -0,0 +1,92 @@
+from django.contrib import admin
+from django.db.models import Value
+from django.db.models.functions import Concat
+from django.utils.decorators import method_decorator
+
+from backups.routers import reporting_view
+from events.models import Event
+from financial.models import FinancialRequest
+from projects.models import Project, normalize_reference
+from tasks.models import Task
+
+
+class ReadOnlyProjectInline(admin.TabularInline):
+    fk_name = 'project'
+    show_change_link = True
+    extra = 0
+
+    def get_readonly_fields(self, request, obj=None):
+        return self.fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class TaskInline(ReadOnlyProjectInline):
+    model = Task
+    fields = ('project_ref', 'description', 'group', 'assigned_to', 'priority', '_status')
+
+
+class FinancialRequestInline(ReadOnlyProjectInline):
+    model = FinancialRequest
+    fields = ('project_reference', 'requesting_department', 'required_amount', '_status')
+
+
+class EventInline(ReadOnlyProjectInline):
+    model = Event
+    fields = ('record_number', 'client_name', 'event_type', 'from_date', 'expected_budget', '_status')
+
+
+class ProjectAdmin(admin.ModelAdmin):
+    """
+    Per-project summary. The totals are stored on the project, so the
+    list and the summary never aggregate over the workflow tables.
+    """
+    list_display = (
+        'reference',
+        'task_count',
+        'open_task_count',
+        'financial_request_count',
+        'requested_amount',
+        'approved_amount',
+        'event_count',
+    )
+    search_fields = (
+        'reference',
+    )
+    readonly_fields = (
+        'task_count',
+        'open_task_count',
+        'financial_request_count',
+        'requested_amount',
+        'approved_amount',
+        'event_count',
+    )
+    inlines = [TaskInline, FinancialRequestInline, EventInline]
+
+    @method_decorator(reporting_view)
+    def changelist_view(self, request, extra_context=None):
+        return super().changelist_view(request, extra_context)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Prefix match on the reference, as an index range scan
+        """
+        term = normalize_reference(search_term)
+        if not term:
+            return queryset, False
+        return queryset.filter(reference__gte=term, reference__lt=Concat(Value(term), Value(chr(0x10FFFF)))), False
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None:
+            # Tasks and financial requests point at the project by its reference
+            return ('reference',) + self.readonly_fields
+        return self.readonly_fields
+
+admin.site.register(Project, ProjectAdmin)
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
+
+
+class ProjectsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'projects'
+
+    def ready(self):
+        from projects import totals
+        for model in totals.tracked_models():
+            post_save.connect(totals.count_saved, sender=model, dispatch_uid=f'project_totals_saved_{model._meta.label}')
+            post_delete.connect(totals.count_deleted, sender=model, dispatch_uid=f'project_totals_deleted_{model._meta.label}')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from projects.totals import rebuild_project_totals
+
+
+class Command(BaseCommand):
+    help = 'Recompute the task, spend and event totals of every project from scratch'
+
+    def handle(self, *args, **options):
+        rebuild_project_totals()
+        self.stdout.write(self.style.SUCCESS('Project totals rebuilt'))
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Project',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference', models.CharField(max_length=255, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('event_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('task_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('open_task_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('financial_request_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('requested_amount', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14)),
+                ('approved_amount', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14)),
+            ],
+        ),
+    ]
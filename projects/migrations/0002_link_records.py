@@ -0,0 +1,70 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:40
+
+import re
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+BATCH_SIZE = 500
+
+
+def normalize_reference(reference):
+    return re.sub(r'\s+', ' ', reference).strip().upper()[:255]
+
+
+def link_records(apps, schema_editor):
+    """
+    Link tasks and financial requests to projects by their references,
+    in primary key batches, then compute the project totals
+    """
+    Project = apps.get_model('projects', 'Project')
+    projects = {}
+    for label, reference_field in [('tasks.Task', 'project_ref'), ('financial.FinancialRequest', 'project_reference')]:
+        model = apps.get_model(label)
+        last_pk = 0
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_pk, project__isnull=True)
+                .order_by('pk').only(reference_field)[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+            for record in batch:
+                reference = normalize_reference(getattr(record, reference_field))
+                if reference not in projects:
+                    projects[reference] = Project.objects.get_or_create(reference=reference)[0].pk
+                record.project_id = projects[reference]
+            model.objects.bulk_update(batch, ['project'])
+            last_pk = batch[-1].pk
+
+    Task = apps.get_model('tasks', 'Task')
+    FinancialRequest = apps.get_model('financial', 'FinancialRequest')
+    for row in Task.objects.values('project').annotate(
+        count=Count('id'), open=Count('id', filter=~Q(_status='approved')),
+    ).order_by():
+        Project.objects.filter(pk=row['project']).update(task_count=row['count'], open_task_count=row['open'])
+    for row in FinancialRequest.objects.values('project').annotate(
+        count=Count('id'),
+        requested=Sum('required_amount'),
+        approved=Sum('required_amount', filter=Q(_status='approved')),
+    ).order_by():
+        Project.objects.filter(pk=row['project']).update(
+            financial_request_count=row['count'],
+            requested_amount=row['requested'],
+            approved_amount=row['approved'] or 0,
+        )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('projects', '0001_initial'),
+        ('events', '0008_event_project'),
+        ('financial', '0004_financialrequest_project'),
+        ('tasks', '0005_task_project'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_records, migrations.RunPython.noop),
+    ]
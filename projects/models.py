@@ -0,0 +1,33 @@
+import re
+
+from django.db import models
+
+
+def normalize_reference(reference: str) -> str:
+    """
+    " p-12 " and "P-12" are the same project
+    """
+    return re.sub(r'\s+', ' ', reference).strip().upper()
+
+
+class Project(models.Model):
+    """
+    A project tasks, financial requests and events refer to. The totals
+    are kept up to date as the linked records change.
+    """
+    reference = models.CharField(max_length=255, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    event_count = models.PositiveIntegerField(default=0, editable=False)
+    task_count = models.PositiveIntegerField(default=0, editable=False)
+    open_task_count = models.PositiveIntegerField(default=0, editable=False)
+    financial_request_count = models.PositiveIntegerField(default=0, editable=False)
+    requested_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    approved_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+
+    def __str__(self) -> str:
+        return self.reference
+
+
+def project_for_reference(reference: str) -> Project:
+    return Project.objects.get_or_create(reference=normalize_reference(reference)[:255])[0]
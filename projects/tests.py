@@ -0,0 +1,117 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import Group, User
+from django.test import TestCase
+from django.utils import timezone
+
+from archive.archiver import archive_closed
+
+from events.models import Event
+from financial.models import FinancialRequest
+from projects.models import Project
+from projects.totals import rebuild_project_totals
+from tasks.models import Task
+
+def create_financial_request(reference: str, amount: int = 1000) -> FinancialRequest:
+    """
+    Create a financial request pending approval
+    """
+    return FinancialRequest.objects.create(
+        requesting_department='admin',
+        project_reference=reference,
+        required_amount=amount,
+        reason='Test',
+    )
+
+def totals(reference: str) -> dict:
+    """
+    The stored totals of a project
+    """
+    return Project.objects.filter(reference=reference).values(
+        'event_count', 'task_count', 'open_task_count',
+        'financial_request_count', 'requested_amount', 'approved_amount',
+    ).get()
+
+class ProjectTotalsTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='sender')
+        self.group = Group.objects.create(name='Subteam Audio')
+
+    def create_task(self, reference: str) -> Task:
+        return Task.objects.create(project_ref=reference, description='Test', sender=self.user, group=self.group)
+
+    def test_references_resolve_to_one_project(self):
+        """
+        Test that a task and a financial request with the same reference share a project
+        """
+        task = self.create_task('p-12')
+        financial_request = create_financial_request(' P-12 ')
+        self.assertEqual(Project.objects.count(), 1)
+        self.assertEqual(task.project, financial_request.project)
+        self.assertEqual(task.project.reference, 'P-12')
+
+    def test_totals_follow_changes(self):
+        """
+        Test that the project totals follow creates, approvals, moves and deletes
+        """
+        task = self.create_task('P-1')
+        first = create_financial_request('P-1', 1000)
+        second = create_financial_request('P-1', 250)
+        event = Event.objects.create(
+            client_name='Acme', event_type='Test', from_date='2021-01-01', to_date='2021-01-01',
+            attendes=10, expected_budget=100, project=task.project,
+        )
+        first = FinancialRequest.objects.get(pk=first.pk)
+        first.save()
+        task = Task.objects.get(pk=task.pk)
+        task.save()
+        task.save()
+        self.assertEqual(totals('P-1'), {
+            'event_count': 1, 'task_count': 1, 'open_task_count': 0,
+            'financial_request_count': 2, 'requested_amount': Decimal('1250'), 'approved_amount': Decimal('1000'),
+        })
+
+        second = FinancialRequest.objects.get(pk=second.pk)
+        second.project_reference = 'P-2'
+        second.save()
+        Event.objects.get(pk=event.pk).delete()
+        self.assertEqual(totals('P-1')['requested_amount'], Decimal('1000'))
+        self.assertEqual(totals('P-1')['event_count'], 0)
+        self.assertEqual(totals('P-2')['approved_amount'], Decimal('250'))
+
+        before = {reference: totals(reference) for reference in ('P-1', 'P-2')}
+        rebuild_project_totals()
+        self.assertEqual({reference: totals(reference) for reference in ('P-1', 'P-2')}, before)
+
+    def test_archiving_keeps_totals(self):
+        """
+        Test that archived records still count towards their project, also after a rebuild
+        """
+        self.create_task('P-1')
+        approved = create_financial_request('P-1', 1000)
+        approved = FinancialRequest.objects.get(pk=approved.pk)
+        approved._status = 'approved'
+        approved.save()
+        FinancialRequest.objects.filter(pk=approved.pk).update(closed_at=timezone.now() - timedelta(days=1))
+        expected = totals('P-1')
+        self.assertEqual((expected['financial_request_count'], expected['approved_amount']), (1, Decimal('1000')))
+        self.assertEqual(archive_closed(timedelta(0)), 1)
+        self.assertFalse(FinancialRequest.objects.exists())
+        self.assertEqual(totals('P-1'), expected)
+        rebuild_project_totals()
+        self.assertEqual(totals('P-1'), expected)
+
+    def test_summary_page(self):
+        """
+        Test that the project page shows the linked records and the list needs no aggregation
+        """
+        admin = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        task = self.create_task('P-7')
+        create_financial_request('p-7', 500)
+        response = self.client.get(f'/projects/project/{task.project_id}/change/')
+        self.assertContains(response, 'Subteam Audio')
+        self.assertContains(response, '500')
+        response = self.client.get('/projects/project/', {'q': 'p-'})
+        self.assertEqual(list(response.context['cl'].result_list), [task.project])
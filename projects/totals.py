@@ -0,0 +1,106 @@
+from decimal import Decimal
+from typing import Optional
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from archive.archiver import archiving
+from archive.models import ArchivedRecord
+from projects.models import Project
+
+
+def tracked_models() -> list:
+    return [apps.get_model(label) for label in ('events.Event', 'tasks.Task', 'financial.FinancialRequest')]
+
+
+def contribution(label: str, values: dict) -> dict:
+    """
+    What one record with the given field values adds to its project totals
+    """
+    if label == 'events.Event':
+        return {'event_count': 1}
+    if label == 'tasks.Task':
+        return {'task_count': 1, 'open_task_count': int(values['_status'] != 'approved')}
+    amount = Decimal(str(values['required_amount']))
+    return {
+        'financial_request_count': 1,
+        'requested_amount': amount,
+        'approved_amount': amount if values['_status'] == 'approved' else Decimal(0),
+    }
+
+
+def record_values(instance) -> dict:
+    return {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+
+
+def adjust(project_id: Optional[int], totals: dict, sign: int) -> None:
+    if project_id is None:
+        return
+    changes = {field: F(field) + sign * value for field, value in totals.items() if value}
+    if changes:
+        Project.objects.filter(pk=project_id).update(**changes)
+
+
+def count_saved(sender, instance, created: bool, raw: bool, **kwargs) -> None:
+    if raw:
+        return
+    label = sender._meta.label
+    new_values = record_values(instance)
+    loaded_values = None if created else getattr(instance, '_loaded_values', None)
+    if loaded_values is not None:
+        old = contribution(label, loaded_values)
+        new = contribution(label, new_values)
+        if loaded_values.get('project_id') == instance.project_id:
+            adjust(instance.project_id, {field: new[field] - old[field] for field in new}, 1)
+            return
+        adjust(loaded_values.get('project_id'), old, -1)
+    adjust(instance.project_id, contribution(label, new_values), 1)
+
+
+def count_deleted(sender, instance, **kwargs) -> None:
+    if archiving.get():
+        # Archived records stay part of their project's history
+        return
+    values = getattr(instance, '_loaded_values', None) or record_values(instance)
+    adjust(values.get('project_id'), contribution(sender._meta.label, values), -1)
+
+
+def rebuild_project_totals() -> None:
+    """
+    Recompute every project's totals from scratch, e.g. after bulk
+    updates that bypass save(). Archived records still count.
+    """
+    Event, Task, FinancialRequest = tracked_models()
+    content_types = ContentType.objects.get_for_models(Event, Task, FinancialRequest)
+    with transaction.atomic():
+        Project.objects.update(
+            event_count=0, task_count=0, open_task_count=0,
+            financial_request_count=0, requested_amount=0, approved_amount=0,
+        )
+        for row in Event.objects.filter(project__isnull=False).values('project').annotate(count=Count('id')).order_by():
+            Project.objects.filter(pk=row['project']).update(event_count=row['count'])
+        for row in Task.objects.filter(project__isnull=False).values('project').annotate(
+            count=Count('id'), open=Count('id', filter=~Q(_status='approved')),
+        ).order_by():
+            Project.objects.filter(pk=row['project']).update(task_count=row['count'], open_task_count=row['open'])
+        for row in FinancialRequest.objects.filter(project__isnull=False).values('project').annotate(
+            count=Count('id'),
+            requested=Sum('required_amount'),
+            approved=Sum('required_amount', filter=Q(_status='approved')),
+        ).order_by():
+            Project.objects.filter(pk=row['project']).update(
+                financial_request_count=row['count'],
+                requested_amount=row['requested'],
+                approved_amount=row['approved'] or 0,
+            )
+        archived: dict[int, dict] = {}
+        for model, content_type in content_types.items():
+            records = ArchivedRecord.objects.filter(content_type=content_type, data__project__isnull=False)
+            for data in records.values_list('data', flat=True).iterator():
+                project_totals = archived.setdefault(data['project'], {})
+                for field, value in contribution(model._meta.label, data).items():
+                    project_totals[field] = project_totals.get(field, 0) + value
+        for project_id, project_totals in archived.items():
+            adjust(project_id, project_totals, 1)
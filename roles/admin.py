@@ -0,0 +1,17 @@
+from django.contrib import admin
+from django.contrib.auth.admin import GroupAdmin
+from django.contrib.auth.models import Group
+
+from roles.models import GroupRole
+
+
+class GroupRoleInline(admin.TabularInline):
+    model = GroupRole
+    extra = 0
+
+
+class RoleGroupAdmin(GroupAdmin):
+    inlines = [GroupRoleInline]
+
+admin.site.unregister(Group)
+admin.site.register(Group, RoleGroupAdmin)
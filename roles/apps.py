@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_save
+
+
+class RolesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'roles'
+
+    def ready(self):
+        from django.contrib.auth.models import Group
+        from roles.registry import assign_default_roles
+        post_save.connect(assign_default_roles, sender=Group, dispatch_uid='assign_default_roles')
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.6 on 2026-10-19 01:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupRole',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.PositiveSmallIntegerField(choices=[(1, 'Customer Service'), (2, 'Senior Customer Service'), (3, 'Financial Manager'), (4, 'Administration Manager'), (5, 'Service Manager'), (6, 'Production Manager'), (7, 'Subteam'), (8, 'Human Resources')])),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='roles', to='auth.group')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['role', 'group'], name='group_role_role_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='grouprole',
+            constraint=models.UniqueConstraint(fields=('group', 'role'), name='group_role_unique'),
+        ),
+    ]
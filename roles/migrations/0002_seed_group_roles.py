@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Role codes of the group names the admins used to match on
+EXACT_NAMES = {
+    'Customer Service': 1,
+    'Senior Customer Service': 2,
+    'Administration Manager': 4,
+    'Service Manager': 5,
+    'Production Manager': 6,
+    'HR': 8,
+    'Human Resources': 8,
+}
+PREFIXES = {
+    'Financial': 3,
+    'Subteam': 7,
+}
+
+
+def seed_group_roles(apps, schema_editor):
+    Group = apps.get_model('auth', 'Group')
+    GroupRole = apps.get_model('roles', 'GroupRole')
+    group_roles = []
+    for group in Group.objects.all():
+        roles = {role for prefix, role in PREFIXES.items() if group.name.startswith(prefix)}
+        if group.name in EXACT_NAMES:
+            roles.add(EXACT_NAMES[group.name])
+        group_roles += [GroupRole(group=group, role=role) for role in roles]
+    GroupRole.objects.bulk_create(group_roles, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_group_roles, migrations.RunPython.noop),
+    ]
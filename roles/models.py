@@ -0,0 +1,31 @@
+from django.db import models
+
+
+class Role(models.IntegerChoices):
+    CUSTOMER_SERVICE = 1, 'Customer Service'
+    SENIOR_CUSTOMER_SERVICE = 2, 'Senior Customer Service'
+    FINANCIAL_MANAGER = 3, 'Financial Manager'
+    ADMINISTRATION_MANAGER = 4, 'Administration Manager'
+    SERVICE_MANAGER = 5, 'Service Manager'
+    PRODUCTION_MANAGER = 6, 'Production Manager'
+    SUBTEAM = 7, 'Subteam'
+    HR = 8, 'Human Resources'
+
+
+class GroupRole(models.Model):
+    """
+    Grants a workflow role to every member of a group
+    """
+    group = models.ForeignKey('auth.Group', on_delete=models.CASCADE, related_name='roles')
+    role = models.PositiveSmallIntegerField(choices=Role.choices)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['group', 'role'], name='group_role_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['role', 'group'], name='group_role_role_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.group}: {self.get_role_display()}'
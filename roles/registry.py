@@ -0,0 +1,70 @@
+from django.contrib.auth.models import Group, User
+from django.db.models import Exists, OuterRef
+from django.db.models.query import QuerySet
+
+from roles.models import GroupRole, Role
+
+MANAGER_ROLES = frozenset({Role.SERVICE_MANAGER, Role.PRODUCTION_MANAGER})
+
+
+def default_roles(group_name: str) -> set[Role]:
+    """
+    Roles implied by the group names the admins used to match on
+    """
+    roles = set()
+    exact = {
+        'Customer Service': Role.CUSTOMER_SERVICE,
+        'Senior Customer Service': Role.SENIOR_CUSTOMER_SERVICE,
+        'Administration Manager': Role.ADMINISTRATION_MANAGER,
+        'Service Manager': Role.SERVICE_MANAGER,
+        'Production Manager': Role.PRODUCTION_MANAGER,
+        'HR': Role.HR,
+        'Human Resources': Role.HR,
+    }
+    if group_name in exact:
+        roles.add(exact[group_name])
+    if group_name.startswith('Financial'):
+        roles.add(Role.FINANCIAL_MANAGER)
+    if group_name.startswith('Subteam'):
+        roles.add(Role.SUBTEAM)
+    return roles
+
+
+def assign_default_roles(sender, instance: Group, created: bool, **kwargs) -> None:
+    if created:
+        GroupRole.objects.bulk_create(
+            [GroupRole(group=instance, role=role) for role in default_roles(instance.name)],
+            ignore_conflicts=True,
+        )
+
+
+def user_roles(user: User) -> frozenset[int]:
+    """
+    Every role of ``user``, resolved with a single query and remembered
+    on the user object for the rest of the request
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    if not hasattr(user, '_role_codes'):
+        user._role_codes = frozenset(
+            GroupRole.objects.filter(group__user=user).values_list('role', flat=True)
+        )
+    return user._role_codes
+
+
+def has_role(user: User, *roles: Role) -> bool:
+    return not user_roles(user).isdisjoint(roles)
+
+
+def users_with_role(*roles: Role) -> QuerySet[User]:
+    """
+    An EXISTS rather than a join and DISTINCT, so the users can still be
+    searched and ordered through their own indexes
+    """
+    return User.objects.filter(Exists(
+        User.groups.through.objects.filter(user_id=OuterRef('pk'), group__roles__role__in=roles)
+    ))
+
+
+def groups_with_role(*roles: Role) -> QuerySet[Group]:
+    return Group.objects.filter(Exists(GroupRole.objects.filter(group_id=OuterRef('pk'), role__in=roles)))
@@ -0,0 +1,64 @@
+from django.contrib.auth.models import Group, Permission, User
+from django.test import TestCase
+
+from financial.models import FinancialRequest
+from roles.models import GroupRole, Role
+from roles.registry import default_roles, has_role, user_roles, users_with_role
+
+class DefaultRolesTestCase(TestCase):
+    def test_default_roles_follow_legacy_group_names(self):
+        """
+        Test that new groups get the roles their name used to imply
+        """
+        self.assertEqual(default_roles('Financial Manager'), {Role.FINANCIAL_MANAGER})
+        self.assertEqual(default_roles('Subteam Photography'), {Role.SUBTEAM})
+        self.assertEqual(default_roles('Human Resources'), {Role.HR})
+        self.assertEqual(default_roles('Service Manager'), {Role.SERVICE_MANAGER})
+        self.assertEqual(default_roles('Customer service'), set())
+
+    def test_new_group_gets_default_roles(self):
+        """
+        Test that creating a group registers its default roles
+        """
+        group = Group.objects.create(name='Production Manager')
+        self.assertEqual(list(group.roles.values_list('role', flat=True)), [Role.PRODUCTION_MANAGER])
+
+class UserRolesTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass', is_staff=True)
+        self.user.groups.add(Group.objects.create(name='Subteam Photography'))
+        self.user.groups.add(Group.objects.create(name='Service Manager'))
+
+    def test_roles_are_resolved_with_one_query(self):
+        """
+        Test that every role of a user comes from a single query, reused afterwards
+        """
+        with self.assertNumQueries(1):
+            self.assertEqual(user_roles(self.user), {Role.SUBTEAM, Role.SERVICE_MANAGER})
+            self.assertTrue(has_role(self.user, Role.SUBTEAM))
+            self.assertTrue(has_role(self.user, Role.HR, Role.SERVICE_MANAGER))
+            self.assertFalse(has_role(self.user, Role.HR))
+
+    def test_users_with_role_are_distinct(self):
+        """
+        Test that a user holding a role through several groups is listed once
+        """
+        GroupRole.objects.create(group=Group.objects.get(name='Service Manager'), role=Role.SUBTEAM)
+        self.assertEqual(list(users_with_role(Role.SUBTEAM)), [self.user])
+
+class ExplicitRoleTestCase(TestCase):
+    def test_admin_uses_registered_role_not_group_name(self):
+        """
+        Test that a group with any name acts as financial manager once it has the role
+        """
+        user = User.objects.create_user(username='testuser', password='testpass', is_staff=True)
+        group = Group.objects.create(name='Finance Team')
+        group.permissions.set(Permission.objects.filter(codename__in=['view_financialrequest', 'change_financialrequest']))
+        GroupRole.objects.create(group=group, role=Role.FINANCIAL_MANAGER)
+        user.groups.add(group)
+        FinancialRequest.objects.create(requesting_department='admin', project_reference='pending', required_amount=10)
+        FinancialRequest.objects.create(requesting_department='admin', project_reference='done', required_amount=10, _status='approved')
+        self.client.login(username='testuser', password='testpass')
+        response = self.client.get('/financial/financialrequest/')
+        self.assertContains(response, 'pending')
+        self.assertNotContains(response, '>done<')
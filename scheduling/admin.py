@@ -0,0 +1,44 @@
+from django import forms
+from django.contrib import admin
+
+from roles.models import Role
+from roles.registry import groups_with_role, users_with_role
+from scheduling.models import Assignment
+from scheduling.planner import conflicting_assignment, event_dates
+
+
+class AssignmentAdminForm(forms.ModelForm):
+    class Meta:
+        model = Assignment
+        fields = ['event', 'member', 'group']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['group'].queryset = groups_with_role(Role.SUBTEAM)
+        self.fields['member'].queryset = users_with_role(Role.SUBTEAM)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        event, member, group = cleaned_data.get('event'), cleaned_data.get('member'), cleaned_data.get('group')
+        if event is None or member is None or group is None:
+            return cleaned_data
+        if not member.groups.filter(pk=group.pk).exists():
+            raise forms.ValidationError(f'{member} is not a member of {group}.')
+        conflicting = conflicting_assignment(member.pk, *event_dates(event), exclude=self.instance.pk)
+        if conflicting is not None:
+            raise forms.ValidationError(
+                f'{member} is already booked on event {conflicting.event_id} '
+                f'from {conflicting.from_date} to {conflicting.to_date}.'
+            )
+        return cleaned_data
+
+
+class AssignmentAdmin(admin.ModelAdmin):
+    form = AssignmentAdminForm
+    list_display = ['event', 'member', 'group', 'from_date', 'to_date']
+    list_filter = ['group']
+    date_hierarchy = 'from_date'
+    raw_id_fields = ['event']
+    list_select_related = ['event', 'member', 'group']
+
+admin.site.register(Assignment, AssignmentAdmin)
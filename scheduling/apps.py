@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_save
+
+
+class SchedulingConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'scheduling'
+
+    def ready(self):
+        from events.models import Event
+        from scheduling.planner import follow_event_dates
+        post_save.connect(follow_event_dates, sender=Event, dispatch_uid='scheduling_follow_event_dates')
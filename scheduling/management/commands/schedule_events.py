@@ -0,0 +1,39 @@
+import re
+
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+
+from scheduling.planner import apply_proposal, propose
+
+
+class Command(BaseCommand):
+    help = 'Propose, and optionally book, subteam members for the events starting in a month'
+
+    def add_arguments(self, parser):
+        parser.add_argument('group', help='Name of the subteam group, e.g. subteam_photography')
+        parser.add_argument('month', help='YYYY-MM')
+        parser.add_argument('--per-event', type=int, default=1, help='Members every event needs from the group')
+        parser.add_argument('--apply', action='store_true', help='Book the proposal instead of only printing it')
+
+    def handle(self, *args, **options):
+        match = re.fullmatch(r'(\d{4})-(\d{2})', options['month'])
+        if not match or not 1 <= int(match.group(2)) <= 12:
+            raise CommandError(f'Invalid month {options["month"]!r}, expected YYYY-MM')
+        try:
+            group = Group.objects.get(name=options['group'])
+        except Group.DoesNotExist:
+            raise CommandError(f'Unknown group {options["group"]!r}')
+
+        proposal = propose(group, int(match.group(1)), int(match.group(2)), options['per_event'])
+        for event, member in proposal.assignments:
+            self.stdout.write(f'{event.from_date}..{event.to_date} event {event.record_number}: {member}')
+        for event in proposal.unstaffed:
+            self.stdout.write(self.style.WARNING(f'Not enough free members for event {event.record_number}'))
+        if not options['apply']:
+            self.stdout.write(f'Proposed {len(proposal.assignments)} bookings; run with --apply to book them')
+            return
+
+        created, conflicts = apply_proposal(proposal)
+        for conflict in conflicts:
+            self.stdout.write(self.style.WARNING(str(conflict)))
+        self.stdout.write(self.style.SUCCESS(f'Booked {len(created)} members, {len(conflicts)} conflicts'))
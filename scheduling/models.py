@@ -0,0 +1,41 @@
+from django.db import models
+
+
+class SchedulingConflict(Exception):
+    def __init__(self, member, conflicting: 'Assignment'):
+        self.member = member
+        self.conflicting = conflicting
+        super().__init__(
+            f'{member} is already booked on event {conflicting.event_id} '
+            f'from {conflicting.from_date} to {conflicting.to_date}'
+        )
+
+
+class Assignment(models.Model):
+    """
+    A subteam member booked on an event. The event's dates are copied so
+    a member's bookings can be searched by date through one index; they
+    never overlap, which is what makes a conflict check a single seek.
+    """
+    event = models.ForeignKey('events.Event', on_delete=models.CASCADE, related_name='assignments')
+    member = models.ForeignKey('auth.User', on_delete=models.CASCADE, related_name='event_assignments')
+    group = models.ForeignKey('auth.Group', on_delete=models.CASCADE)
+    from_date = models.DateField(editable=False)
+    to_date = models.DateField(editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'member'], name='assignment_event_member_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['member', 'from_date'], name='assignment_member_date_idx'),
+            models.Index(fields=['group', 'from_date'], name='assignment_group_date_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.member} on event {self.event_id}'
+
+    def save(self, *args, **kwargs) -> None:
+        self.from_date, self.to_date = self.event.from_date, self.event.to_date
+        super().save(*args, **kwargs)
@@ -0,0 +1,192 @@
+import datetime
+from bisect import bisect_right
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+
+from events.models import Event
+from jobs.registry import enqueue_once
+from notifications.models import Notification
+from scheduling.models import Assignment, SchedulingConflict
+
+
+class MemberSchedule:
+    """
+    One member's bookings as intervals sorted by start. As they never
+    overlap they are sorted by end as well, so only the last booking
+    starting on or before a new interval's end can overlap it.
+    """
+    def __init__(self):
+        self.starts: list[datetime.date] = []
+        self.bookings: list[tuple[datetime.date, datetime.date, int]] = []
+        self.days = 0
+
+    def conflict(self, start: datetime.date, end: datetime.date) -> Optional[tuple[datetime.date, datetime.date, int]]:
+        index = bisect_right(self.starts, end) - 1
+        if index >= 0 and self.bookings[index][1] >= start:
+            return self.bookings[index]
+        return None
+
+    def book(self, start: datetime.date, end: datetime.date, event_id: int) -> None:
+        index = bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.bookings.insert(index, (start, end, event_id))
+        self.days += (end - start).days + 1
+
+
+@dataclass
+class Proposal:
+    group: Group
+    assignments: list[tuple[Event, User]] = field(default_factory=list)
+    # Events that could not get as many members as they need
+    unstaffed: list[Event] = field(default_factory=list)
+
+
+def event_dates(event: Event) -> tuple[datetime.date, datetime.date]:
+    return (
+        Event._meta.get_field('from_date').to_python(event.from_date),
+        Event._meta.get_field('to_date').to_python(event.to_date),
+    )
+
+
+def conflicting_assignment(
+    member_id: int, from_date: datetime.date, to_date: datetime.date, exclude: Optional[int] = None,
+) -> Optional[Assignment]:
+    """
+    The booking of a member overlapping the dates, found with one seek on
+    assignment_member_date_idx: the member's last booking starting on or
+    before ``to_date``
+    """
+    queryset = Assignment.objects.filter(member_id=member_id, from_date__lte=to_date)
+    if exclude is not None:
+        queryset = queryset.exclude(pk=exclude)
+    previous = queryset.order_by('-from_date').first()
+    return previous if previous is not None and previous.to_date >= from_date else None
+
+
+def assign(event: Event, member: User, group: Group) -> Assignment:
+    """
+    Book ``member`` on ``event``, raising SchedulingConflict if they are
+    already booked on an overlapping event
+    """
+    from_date, to_date = event_dates(event)
+    with transaction.atomic():
+        # Bookings of the same member are checked one after the other
+        list(User.objects.select_for_update().filter(pk=member.pk).values_list('pk'))
+        existing = Assignment.objects.filter(event=event, member=member).first()
+        if existing is not None:
+            return existing
+        conflicting = conflicting_assignment(member.pk, from_date, to_date)
+        if conflicting is not None:
+            raise SchedulingConflict(member, conflicting)
+        return Assignment.objects.create(event=event, member=member, group=group)
+
+
+def propose(group: Group, year: int, month: int, per_event: int = 1) -> Proposal:
+    """
+    Propose bookings of the active members of ``group`` on the events
+    starting in a month. Events are swept in order of their start date and
+    each gets the free members with the fewest booked days, so the month
+    is spread evenly; existing bookings, of any month, are respected.
+    """
+    proposal = Proposal(group=group)
+    events = list(Event.objects.in_month(year, month).exclude(_status='rejected').order_by('from_date', 'to_date', 'pk'))
+    members = list(group.user_set.filter(is_active=True).order_by('pk'))
+    if not events or not members:
+        proposal.unstaffed = events if not members else []
+        return proposal
+
+    first_day = datetime.date(year, month, 1)
+    last_day = max(event.to_date for event in events)
+    schedules = {member.pk: MemberSchedule() for member in members}
+    for member_id, from_date, to_date, event_id in (
+        Assignment.objects.filter(member__in=members, from_date__lte=last_day, to_date__gte=first_day)
+        .order_by('from_date').values_list('member_id', 'from_date', 'to_date', 'event_id')
+    ):
+        schedules[member_id].book(from_date, to_date, event_id)
+    staffed = Counter(
+        Assignment.objects.filter(group=group, event__in=[event.pk for event in events]).values_list('event_id', flat=True)
+    )
+
+    for event in events:
+        needed = per_event - staffed[event.pk]
+        if needed <= 0:
+            continue
+        free = [member for member in members if schedules[member.pk].conflict(event.from_date, event.to_date) is None]
+        free.sort(key=lambda member: (schedules[member.pk].days, member.pk))
+        for member in free[:needed]:
+            schedules[member.pk].book(event.from_date, event.to_date, event.pk)
+            proposal.assignments.append((event, member))
+        if len(free) < needed:
+            proposal.unstaffed.append(event)
+    return proposal
+
+
+def apply_proposal(proposal: Proposal) -> tuple[list[Assignment], list[SchedulingConflict]]:
+    """
+    Book a proposal. Bookings made since it was proposed win; the
+    conflicts they cause are returned instead of raised.
+    """
+    created, conflicts = [], []
+    with transaction.atomic():
+        for event, member in proposal.assignments:
+            try:
+                created.append(assign(event, member, proposal.group))
+            except SchedulingConflict as conflict:
+                conflicts.append(conflict)
+    return created, conflicts
+
+
+def release(event: Event, assignments: list[Assignment], reason: str) -> None:
+    """
+    Delete bookings of ``event`` and notify their members, who would
+    otherwise only find them gone
+    """
+    if not assignments:
+        return
+    Notification.objects.bulk_create([
+        Notification(
+            recipient_id=assignment.member_id,
+            model=event._meta.label,
+            object_id=event.pk,
+            status=event._status,
+            message=(
+                f'Your booking on event #{event.record_number} from {assignment.from_date} '
+                f'to {assignment.to_date} was released: {reason}'
+            )[:255],
+        )
+        for assignment in assignments
+    ])
+    Assignment.objects.filter(pk__in=[assignment.pk for assignment in assignments]).delete()
+    enqueue_once('notifications.dispatch')
+
+
+def follow_event_dates(sender, instance: Event, created: bool, raw: bool, **kwargs) -> None:
+    """
+    Move the bookings of an event along with its dates, releasing those
+    that would now overlap another booking of the member, and release
+    every booking of a rejected event
+    """
+    if created or raw:
+        return
+    if instance._status == 'rejected':
+        release(instance, list(Assignment.objects.filter(event=instance)), 'the event was rejected')
+        return
+    from_date, to_date = event_dates(instance)
+    moved = Assignment.objects.filter(event=instance).exclude(from_date=from_date, to_date=to_date)
+    released = []
+    for assignment in moved:
+        overlapping = Assignment.objects.filter(
+            member_id=assignment.member_id, from_date__lte=to_date, to_date__gte=from_date,
+        ).exclude(pk=assignment.pk)
+        if overlapping.exists():
+            released.append(assignment)
+        else:
+            assignment.save()
+    release(
+        instance, released,
+        f'the event moved to {from_date} to {to_date}, which overlaps another of your bookings',
+    )
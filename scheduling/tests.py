@@ -0,0 +1,170 @@
+import datetime
+import random
+from io import StringIO
+
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.test import TestCase
+
+from events.models import Event
+from jobs.models import Job
+from notifications.models import Notification
+from scheduling.models import Assignment, SchedulingConflict
+from scheduling.planner import MemberSchedule, apply_proposal, assign, propose
+
+def create_event(from_date: str, to_date: str, **kwargs) -> Event:
+    """
+    Create an event pending approval
+    """
+    fields = {
+        'client_name': 'Test Client',
+        'event_type': 'Wedding',
+        'from_date': from_date,
+        'to_date': to_date,
+        'attendes': 100,
+        'expected_budget': 10000,
+    }
+    fields.update(kwargs)
+    return Event.objects.create(**fields)
+
+def create_members(group: Group, count: int) -> list[User]:
+    members = [User.objects.create(username=f'member{i}') for i in range(count)]
+    group.user_set.add(*members)
+    return members
+
+class SchedulingTestCase(TestCase):
+    def setUp(self) -> None:
+        self.group = Group.objects.create(name='Subteam Photography')
+
+    def test_member_schedule_matches_brute_force(self):
+        """
+        Test that the bisection finds an overlap exactly when comparing against every booking does
+        """
+        generator = random.Random(7)
+        schedule = MemberSchedule()
+        bookings = []
+        base = datetime.date(2024, 1, 1)
+        for _ in range(500):
+            start = base + datetime.timedelta(days=generator.randint(0, 365))
+            end = start + datetime.timedelta(days=generator.randint(0, 5))
+            overlapping = [b for b in bookings if b[0] <= end and b[1] >= start]
+            found = schedule.conflict(start, end)
+            self.assertEqual(found is None, not overlapping)
+            if found is None:
+                schedule.book(start, end, len(bookings))
+                bookings.append((start, end))
+
+    def test_assign_rejects_overlapping_events(self):
+        """
+        Test that a member cannot be booked on two events sharing a day, but can on adjacent ones
+        """
+        member, = create_members(self.group, 1)
+        first = create_event('2024-05-01', '2024-05-03')
+        assign(first, member, self.group)
+        with self.assertRaises(SchedulingConflict):
+            assign(create_event('2024-05-03', '2024-05-04'), member, self.group)
+        with self.assertRaises(SchedulingConflict):
+            assign(create_event('2024-04-20', '2024-05-10'), member, self.group)
+        assign(create_event('2024-05-04', '2024-05-05'), member, self.group)
+        self.assertEqual(assign(first, member, self.group).event, first)
+        self.assertEqual(Assignment.objects.filter(member=member).count(), 2)
+
+    def test_month_proposal_is_feasible_and_balanced(self):
+        """
+        Test that a batch run books every event it can without double-booking and spreads the days
+        """
+        members = create_members(self.group, 3)
+        generator = random.Random(11)
+        for _ in range(30):
+            start = datetime.date(2024, 6, generator.randint(1, 30))
+            create_event(start.isoformat(), (start + datetime.timedelta(days=generator.randint(0, 3))).isoformat())
+        create_event('2024-07-01', '2024-07-02')
+        proposal = propose(self.group, 2024, 6)
+        created, conflicts = apply_proposal(proposal)
+        self.assertEqual(conflicts, [])
+        self.assertEqual(len(created) + len(proposal.unstaffed), 30)
+        for member in members:
+            bookings = list(Assignment.objects.filter(member=member).order_by('from_date'))
+            for previous, following in zip(bookings, bookings[1:]):
+                self.assertLess(previous.to_date, following.from_date)
+        # Every unstaffed event overlaps a booking of every member
+        for event in proposal.unstaffed:
+            for member in members:
+                self.assertTrue(Assignment.objects.filter(
+                    member=member, from_date__lte=event.to_date, to_date__gte=event.from_date,
+                ).exists())
+        self.assertEqual(propose(self.group, 2024, 6).assignments, [])
+
+    def test_proposal_respects_existing_bookings(self):
+        """
+        Test that bookings from another group or month are kept free and staffed events are skipped
+        """
+        first, second = create_members(self.group, 2)
+        other_group = Group.objects.create(name='Subteam Production')
+        assign(create_event('2024-05-30', '2024-06-02'), first, other_group)
+        staffed = create_event('2024-06-10', '2024-06-10')
+        assign(staffed, second, self.group)
+        event = create_event('2024-06-01', '2024-06-01')
+        proposal = propose(self.group, 2024, 6)
+        self.assertEqual([(e.pk, m.pk) for e, m in proposal.assignments], [(event.pk, second.pk)])
+
+    def test_bookings_follow_event_dates(self):
+        """
+        Test that moving an event moves its bookings, releasing those that would overlap
+        """
+        first, second = create_members(self.group, 2)
+        event = create_event('2024-06-01', '2024-06-02')
+        assign(event, first, self.group)
+        assign(event, second, self.group)
+        assign(create_event('2024-06-10', '2024-06-11'), second, self.group)
+        event.from_date, event.to_date = '2024-06-09', '2024-06-10'
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save()
+        self.assertEqual(
+            list(Assignment.objects.filter(event=event).values_list('member_id', 'from_date')),
+            [(first.pk, datetime.date(2024, 6, 9))],
+        )
+        notification = Notification.objects.get()
+        self.assertEqual((notification.recipient, notification.object_id), (second, event.pk))
+        self.assertIn('from 2024-06-01 to 2024-06-02 was released', notification.message)
+        self.assertTrue(Job.objects.filter(kind='notifications.dispatch').exists())
+
+    def test_rejected_event_releases_bookings(self):
+        """
+        Test that the members of a rejected event are told their bookings were released
+        """
+        member, = create_members(self.group, 1)
+        event = create_event('2024-06-01', '2024-06-02')
+        assign(event, member, self.group)
+        event._status = 'rejected'
+        event.save()
+        self.assertFalse(Assignment.objects.exists())
+        self.assertEqual(list(Notification.objects.values_list('recipient_id', 'status')), [(member.pk, 'rejected')])
+
+    def test_command(self):
+        """
+        Test that the command only prints a proposal unless asked to book it
+        """
+        create_members(self.group, 1)
+        create_event('2024-06-01', '2024-06-02')
+        output = StringIO()
+        call_command('schedule_events', 'Subteam Photography', '2024-06', stdout=output)
+        self.assertIn('Proposed 1 bookings', output.getvalue())
+        self.assertFalse(Assignment.objects.exists())
+        call_command('schedule_events', 'Subteam Photography', '2024-06', '--apply', stdout=output)
+        self.assertIn('Booked 1 members, 0 conflicts', output.getvalue())
+
+    def test_admin_rejects_double_booking(self):
+        """
+        Test that the admin form refuses a booking overlapping another one of the member
+        """
+        member, = create_members(self.group, 1)
+        assign(create_event('2024-06-01', '2024-06-03'), member, self.group)
+        event = create_event('2024-06-02', '2024-06-02')
+        admin = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        response = self.client.post('/scheduling/assignment/add/', {
+            'event': event.pk, 'member': member.pk, 'group': self.group.pk,
+        })
+        self.assertContains(response, 'is already booked on event')
+        self.assertEqual(Assignment.objects.count(), 1)
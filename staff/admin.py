@@ -6,9 +6,13 @@ from django.db.models.query import QuerySet
 from django.forms.models import ModelChoiceField
 from django.http.request import HttpRequest
 
+from roles.models import Role
+from roles.registry import MANAGER_ROLES, has_role, users_with_role
 from staff.models import Recruitment
+from workflow.admin import ScopedAutocompleteMixin, VersionedAdminMixin
+from workflow.filters import FacetCountFieldListFilter
 
-class RecruitmentAdmin(admin.ModelAdmin):
+class RecruitmentAdmin(VersionedAdminMixin, ScopedAutocompleteMixin, admin.ModelAdmin):
     list_display = (
         'job_title',
         'requesting_department',
@@ -16,9 +20,9 @@ class RecruitmentAdmin(admin.ModelAdmin):
         '_status',
     )
     list_filter = (
-        'requesting_department',
-        'contract_type',
-        '_status',
+        ('requesting_department', FacetCountFieldListFilter),
+        ('contract_type', FacetCountFieldListFilter),
+        ('_status', FacetCountFieldListFilter),
     )
     search_fields = (
         'job_title',
@@ -27,32 +31,35 @@ class RecruitmentAdmin(admin.ModelAdmin):
         'requester',
         '_status',
     )
+    scoped_autocomplete_fields = (
+        'requester',
+    )
 
     def get_queryset(self, request: HttpRequest) -> QuerySet[Any]:
         user: User = request.user
-        if user.groups.filter(name__in=['HR', 'Human Resources']).exists():
+        if has_role(user, Role.HR):
             return Recruitment.objects.filter(_status='pending_hr_approval')
-        elif user.groups.filter(name__in=['Production Manager', 'Service Manager']).exists():
+        elif has_role(user, *MANAGER_ROLES):
             return Recruitment.objects.filter(requester=user)
         return super().get_queryset(request)
     
     def has_change_permission(self, request, obj=None):
         if obj:
             user = request.user
-            if user.groups.filter(name__in=['HR', 'Human Resources']).exists() and obj._status != 'pending_hr_approval':
+            if has_role(user, Role.HR) and obj._status != 'pending_hr_approval':
                 return False
-            elif user.groups.filter(name__in=['Production Manager', 'Service Manager']).exists() and obj._status != 'pending_manager_approval':
+            elif has_role(user, *MANAGER_ROLES) and obj._status != 'pending_manager_approval':
                 return False
         return super().has_change_permission(request, obj)
     
     def get_readonly_fields(self, request, obj=None):
         user: User = request.user
-        if user.groups.filter(name__in=['HR', 'Human Resources']).exists():
+        if has_role(user, Role.HR):
             return ['requester', 'requesting_department','years_of_experience','_status']
-        elif user.groups.filter(name__in=['Production Manager', 'Service Manager']).exists() \
+        elif has_role(user, *MANAGER_ROLES) \
             and obj._status == 'pending_manager_approval':
             return [f.name for f in self.model._meta.fields]
-        elif user.groups.filter(name__in=['Production Manager', 'Service Manager']).exists():
+        elif has_role(user, *MANAGER_ROLES):
             return [f.name for f in self.model._meta.fields if f.name != 'requester']
         return super().get_readonly_fields(request, obj)
 
@@ -62,6 +69,11 @@ class RecruitmentAdmin(admin.ModelAdmin):
             return []
         return super().get_readonly_fields(request, obj)
     
+    def get_scoped_queryset(self, request, field_name):
+        if field_name == 'requester':
+            return users_with_role(*MANAGER_ROLES)
+        return super().get_scoped_queryset(request, field_name)
+
     def save_model(self, request, obj, form, change):
         if not change:
             obj.requester = request.user
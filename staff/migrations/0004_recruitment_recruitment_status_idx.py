@@ -0,0 +1,20 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:43
+
+from django.db import migrations, models
+
+from workflow.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('staff', '0003_recruitment_closed_at'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='recruitment',
+            index=models.Index(fields=['_status'], name='recruitment_status_idx'),
+        ),
+    ]
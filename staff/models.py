@@ -1,6 +1,10 @@
 from django.db import models
 
-class Recruitment(models.Model):
+from workflow.models import WorkflowModel
+
+class Recruitment(WorkflowModel):
+    facet_fields = ('requesting_department', 'contract_type', '_status')
+
     contract_type = models.CharField(max_length=5, choices=[("full", "Full-time"),("part", "Part-time")], default="full")
     requester = models.ForeignKey("auth.User", on_delete=models.CASCADE)
     requesting_department = models.CharField(max_length=20, choices=[
@@ -22,6 +26,11 @@ class Recruitment(models.Model):
         default='pending_hr_approval'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['_status'], name='recruitment_status_idx'),
+        ]
+
     def save(self, *args, **kwargs) -> None:
         self.move_to_next_status()
         super(Recruitment, self).save(*args, **kwargs)
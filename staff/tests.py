@@ -1,38 +1,18 @@
 from django.test import TestCase
-from django.contrib.auth.models import User, Group, Permission
-from django.contrib.contenttypes.models import ContentType
+from django.contrib.auth.models import User, Group
 
 from staff.models import Recruitment
-
-def create_user(
-    username: str = 'testuser',
-    password: str = 'testpass',
-) -> User:
-    """
-    Create a user for testing
-    """
-    return User.objects.create_user(
-        username=username,
-        password=password,
-        is_staff=True,
-    )
-
-def create_group(group_name: str, permissions: list[str] = []) -> Group:
-    """
-    Create a group
-    """
-    group: Group = Group.objects.get_or_create(name=group_name)[0]
-    content_type: ContentType = ContentType.objects.get_for_model(Recruitment)
-    perms: list[Permission] = Permission.objects.filter(content_type=content_type, codename__in=permissions)
-    group.permissions.set(perms)
-    return group
+from workflow.testing import create_group, create_user
 
 class ServiceManagerTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user: User = create_user()
+        cls.group: Group = create_group('Service Manager', ['add_recruitment', 'delete_recruitment', 'view_recruitment', 'change_recruitment'])
+        cls.user.groups.add(cls.group)
+
     def setUp(self) -> None:
-        self.user: User = create_user()
-        self.group: Group = create_group('Service Manager', ['add_recruitment', 'delete_recruitment', 'view_recruitment', 'change_recruitment'])
-        self.user.groups.add(self.group)
-        self.client.login(username='testuser', password='testpass')
+        self.client.force_login(self.user)
 
     def test_user_has_change_permission(self) -> None:
         """
@@ -127,11 +107,14 @@ class ServiceManagerTestCase(TestCase):
         self.assertEqual(Recruitment.objects.count(), 1)
 
 class HRTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user: User = create_user()
+        cls.group: Group = create_group('HR', ['view_recruitment', 'change_recruitment'])
+        cls.user.groups.add(cls.group)
+
     def setUp(self) -> None:
-        self.user: User = create_user()
-        self.group: Group = create_group('HR', ['view_recruitment', 'change_recruitment'])
-        self.user.groups.add(self.group)
-        self.client.login(username='testuser', password='testpass')
+        self.client.force_login(self.user)
 
     def test_user_has_change_permission(self) -> None:
         """
@@ -1,25 +1,36 @@
 from typing import Any
-from django.contrib import admin
-from django.contrib.auth.models import User, Group
+from django.contrib import admin, messages
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
 from django.db.models.query import QuerySet
+from django.http import HttpResponseNotAllowed, JsonResponse
 from django.http.request import HttpRequest
+from django.urls import path, reverse
+from roles.models import Role
+from roles.registry import MANAGER_ROLES, groups_with_role, has_role, users_with_role
 from tasks.models import Task
+from tasks.queue import claim_next_task
+from workflow.admin import ScopedAutocompleteMixin, VersionedAdminMixin
+from workflow.facets import facet_counts
+from workflow.filters import FacetCountFieldListFilter, cached_choices, scoped
 
 class SubteamGroupFilter(admin.SimpleListFilter):
     title = 'group'
     parameter_name = 'group'
 
     def lookups(self, request, model_admin):
-        groups = Group.objects.filter(name__startswith='Subteam')
-        group_tuples = [(group.id, group.name) for group in groups]
-        return group_tuples
+        groups = cached_choices('subteam_groups', lambda: groups_with_role(Role.SUBTEAM).values_list('id', 'name'))
+        if scoped(model_admin, request):
+            return list(groups)
+        counts = facet_counts(Task, 'group')
+        return [(group_id, f'{name} ({counts.get(str(group_id), 0)})') for group_id, name in groups]
 
     def queryset(self, request, queryset):
         if self.value():
-            return queryset.filter(assigned_to__groups__id=self.value())
+            return queryset.filter(group_id=self.value())
         return queryset
 
-class TaskAdmin(admin.ModelAdmin): 
+class TaskAdmin(VersionedAdminMixin, ScopedAutocompleteMixin, admin.ModelAdmin):
     list_display = (
         'project_ref',
         'assigned_to',
@@ -29,7 +40,7 @@ class TaskAdmin(admin.ModelAdmin):
     )
     list_filter = (
         SubteamGroupFilter,
-        'priority',
+        ('priority', FacetCountFieldListFilter),
     )
     search_fields = (
         'project_ref',
@@ -38,37 +49,96 @@ class TaskAdmin(admin.ModelAdmin):
     readonly_fields = (
         '_status',
     )
+    actions = ['claim_next']
+    scoped_autocomplete_fields = (
+        'sender',
+        'assigned_to',
+        'group',
+    )
+
+    def get_urls(self):
+        return [
+            path(
+                'claim/',
+                self.admin_site.admin_view(self.claim_view),
+                name='tasks_task_claim',
+            ),
+        ] + super().get_urls()
+
+    def claim_view(self, request: HttpRequest) -> JsonResponse:
+        """
+        Claim the next task of the pools of the user's groups, optionally
+        of just one of them, ``group``
+        """
+        if request.method != 'POST':
+            return HttpResponseNotAllowed(['POST'])
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        user: User = request.user
+        group = request.POST.get('group')
+        if group:
+            try:
+                group = int(group)
+            except ValueError:
+                return JsonResponse({'error': 'Invalid group'}, status=400)
+            if not user.groups.filter(pk=group).exists():
+                raise PermissionDenied
+        queryset = self.get_queryset(request).filter(group__in=user.groups.all())
+        task = claim_next_task(user, queryset, group=group)
+        if task is None:
+            return JsonResponse({'task': None})
+        return JsonResponse({'task': {
+            'id': task.pk,
+            'project_ref': task.project_ref,
+            'priority': task.priority,
+            'group': task.group_id,
+            'lease_expires_at': task.lease.expires_at,
+            'url': reverse('admin:tasks_task_change', args=[task.pk]),
+        }})
+
+    @admin.action(description='Claim next task from the pool', permissions=['change'])
+    def claim_next(self, request: HttpRequest, queryset: QuerySet[Any]) -> None:
+        task = claim_next_task(request.user, queryset)
+        if task is None:
+            self.message_user(request, 'No unclaimed task left in the selection.', messages.WARNING)
+        else:
+            self.message_user(request, f'Task {task.project_ref} is now assigned to you.')
 
     def get_readonly_fields(self, request, obj=None):
         user: User = request.user
         if user.is_superuser:
             return []
-        elif user.groups.filter(name__startswith='Subteam').exists():
+        elif has_role(user, Role.SUBTEAM):
             return [f.name for f in self.model._meta.fields]
         return super().get_readonly_fields(request, obj)
 
     def get_queryset(self, request: HttpRequest) -> QuerySet[Any]:
         user: User = request.user
-        if user.groups.filter(name__startswith='Subteam').exists():
-            return Task.objects.filter(assigned_to=user)
+        if has_role(user, Role.SUBTEAM):
+            # A union of two index searches instead of an OR, which no
+            # single index serves and leaves the table scanned in id order
+            assigned = Task.objects.filter(assigned_to=user).values('pk')
+            pool = Task.objects.filter(assigned_to__isnull=True, group__in=user.groups.all()).values('pk')
+            return Task.objects.filter(pk__in=assigned.union(pool))
         return super().get_queryset(request)
 
     def has_change_permission(self, request, obj=None):
         if obj:
             user = request.user
-            if user.groups.filter(name__startswith='Subteam').exists() and obj._status != 'pending_subteam_approval':
+            if has_role(user, Role.SUBTEAM) \
+                and (obj._status != 'pending_subteam_approval' or obj.assigned_to_id != user.pk):
                 return False
-            elif user.groups.filter(name=['Service Manager', 'Production Manager']).exists() and obj._status != 'pending_subteam_approval':
+            elif has_role(user, *MANAGER_ROLES) and obj._status == 'approved':
                 return False
         return super().has_change_permission(request, obj)
 
-    def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        if db_field.name == 'sender':
-            kwargs["queryset"] = User.objects.filter(groups__name__in=['Service Manager', 'Production Manager'])
-        if db_field.name == 'assigned_to':
-            kwargs["queryset"] = User.objects.filter(groups__name__startswith='Subteam')
-        if db_field.name == 'group':
-            kwargs["queryset"] = Group.objects.filter(name__startswith='Subteam')
-        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+    def get_scoped_queryset(self, request, field_name):
+        if field_name == 'sender':
+            return users_with_role(*MANAGER_ROLES)
+        if field_name == 'assigned_to':
+            return users_with_role(Role.SUBTEAM)
+        if field_name == 'group':
+            return groups_with_role(Role.SUBTEAM)
+        return super().get_scoped_queryset(request, field_name)
 
 admin.site.register(Task, TaskAdmin)
\ No newline at end of file
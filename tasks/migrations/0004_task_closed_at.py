@@ -0,0 +1,31 @@
+# Generated by Django 4.2.6 on 2026-10-19 01:36
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def set_closed_at(apps, schema_editor):
+    """
+    Records closed before closed_at existed count as closed at migration time
+    """
+    Task = apps.get_model('tasks', 'Task')
+    Task.objects.filter(
+        _status__in=['approved'],
+        closed_at__isnull=True,
+    ).update(closed_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_tasklease_alter_task_assigned_to_task_task_pool_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(set_closed_at, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,20 @@
 from django.db import models
 
-class Task(models.Model):
+from workflow.models import WorkflowModel
+
+class Task(WorkflowModel):
+    facet_fields = ('group', 'priority')
+
     project_ref = models.CharField(max_length=50,blank=False, null=False)
+    # Resolved from project_ref on save
+    project = models.ForeignKey(
+        'projects.Project',
+        on_delete=models.PROTECT,
+        blank=True,
+        null=True,
+        editable=False,
+        related_name='tasks',
+    )
     description = models.TextField()
     sender = models.ForeignKey(
         'auth.User',
@@ -12,9 +25,13 @@ class Task(models.Model):
         'auth.Group',
         on_delete=models.CASCADE
     )
+    # Left empty, the task goes to the shared pool of its subteam group
+    # until a member claims it
     assigned_to = models.ForeignKey(
         'auth.User',
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
     )
     priority = models.CharField(
         max_length=1, 
@@ -32,10 +49,26 @@ class Task(models.Model):
         default='pending_subteam_approval'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['group', 'priority', 'id'],
+                condition=models.Q(assigned_to__isnull=True, _status='pending_subteam_approval'),
+                name='task_pool_idx',
+            ),
+        ]
+
     def save(self, *args, **kwargs) -> None:
         self.move_to_next_status()
+        self.set_project()
         super(Task, self).save(*args, **kwargs)
 
+    def set_project(self) -> None:
+        loaded_values = getattr(self, '_loaded_values', None) or {}
+        if self.project_id is None or loaded_values.get('project_ref') != self.project_ref:
+            from projects.models import project_for_reference
+            self.project = project_for_reference(self.project_ref)
+
     def move_to_next_status(self) -> None:
         """
         Move the event to the next status
@@ -52,4 +85,12 @@ class Task(models.Model):
         else:
             raise Exception('Invalid status')
 
-    
\ No newline at end of file
+
+class TaskLease(models.Model):
+    """
+    A claim on a pool task. While the lease is valid no other worker can
+    claim the task; once it expires an unfinished task goes back to the pool.
+    """
+    task = models.OneToOneField(Task, on_delete=models.CASCADE, related_name='lease')
+    worker = models.ForeignKey('auth.User', on_delete=models.CASCADE)
+    expires_at = models.DateTimeField(db_index=True)
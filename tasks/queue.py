@@ -0,0 +1,105 @@
+import time
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F
+from django.db.models.query import QuerySet
+from django.utils import timezone
+
+from tasks.models import Task, TaskLease
+
+# How many pool candidates a worker tries before giving up when every
+# one of them was taken by a concurrent worker
+CLAIM_ATTEMPTS = 10
+# How often a claim that found the database locked is started over, and
+# the first wait in seconds, doubled for every further try
+CLAIM_RETRIES = 5
+CLAIM_BACKOFF = 0.05
+
+
+def lease_duration() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'TASK_LEASE_SECONDS', 60 * 60))
+
+
+def pool(queryset: Optional[QuerySet] = None, group=None) -> QuerySet:
+    """
+    Unassigned pending tasks, high priority first and oldest first
+    """
+    queryset = Task.objects.all() if queryset is None else queryset
+    queryset = queryset.filter(assigned_to__isnull=True, _status='pending_subteam_approval')
+    if group:
+        queryset = queryset.filter(group=group)
+    return queryset.order_by('priority', 'id')
+
+
+def release_expired_leases() -> int:
+    """
+    Put tasks whose lease expired before they were submitted back into the pool
+    """
+    now = timezone.now()
+    released = Task.objects.filter(
+        lease__expires_at__lte=now,
+        _status='pending_subteam_approval',
+    ).update(assigned_to=None)
+    TaskLease.objects.filter(expires_at__lte=now).delete()
+    return released
+
+
+def claim_next_task(user: User, queryset: Optional[QuerySet] = None, group=None) -> Optional[Task]:
+    """
+    Atomically assign the next pool task to ``user``.
+
+    On databases with ``SELECT ... FOR UPDATE SKIP LOCKED`` concurrent
+    workers skip the rows locked by each other. Elsewhere (SQLite) the
+    unique lease row is the lock: a worker that loses the race for a task
+    moves on to the next candidate. SQLite does not wait for a transaction
+    that already read to become a writer, so a claim that finds the
+    database locked is started over, waiting ``CLAIM_BACKOFF`` seconds
+    and twice as long every time. Inside an outer transaction it cannot
+    be started over and the error is raised.
+    """
+    for attempt in range(CLAIM_RETRIES):
+        try:
+            return _claim(user, queryset, group)
+        except OperationalError as error:
+            if connection.in_atomic_block or 'locked' not in str(error) or attempt == CLAIM_RETRIES - 1:
+                raise
+            time.sleep(CLAIM_BACKOFF * 2 ** attempt)
+
+
+def _claim(user: User, queryset: Optional[QuerySet], group) -> Optional[Task]:
+    release_expired_leases()
+    candidates = pool(queryset, group).filter(lease__isnull=True)
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            task = candidates.select_for_update(skip_locked=True, of=('self',)).first()
+            if task is None:
+                return None
+            return _assign(task, user)
+        for task in candidates[:CLAIM_ATTEMPTS]:
+            try:
+                with transaction.atomic():
+                    return _assign(task, user)
+            except IntegrityError:
+                continue
+    return None
+
+
+def _assign(task: Task, user: User) -> Task:
+    TaskLease.objects.create(task=task, worker=user, expires_at=timezone.now() + lease_duration())
+    # Not saved: Task.save() would move the task to its next status. No
+    # signals are needed either, the outbox only records creations and
+    # status changes and a claim changes neither, and the only one to
+    # notify about the assignment is the worker who asked for it.
+    updated = Task.objects.filter(pk=task.pk, assigned_to__isnull=True).update(
+        assigned_to=user,
+        version=F('version') + 1,
+    )
+    if not updated:
+        raise IntegrityError(f'task {task.pk} was claimed by another worker')
+    task.assigned_to = user
+    task.version += 1
+    return task
@@ -1,43 +1,32 @@
-from django.test import TestCase
-from django.contrib.auth.models import Group, Permission, User
-from django.contrib.contenttypes.models import ContentType
-from tasks.models import Task
-
-def create_user(
-    username: str = 'testuser',
-    password: str = 'testpass',
-) -> User:
-    """
-    Create a user for testing
-    """
-    return User.objects.create_user(
-        username=username,
-        password=password,
-        is_staff=True,
-    )
-
-def create_group(group_name: str, permissions: list[str] = []) -> Group:
-    """
-    Create a group
-    """
-    group: Group = Group.objects.get_or_create(name=group_name)[0]
-    content_type: ContentType = ContentType.objects.get_for_model(Task)
-    perms: list[Permission] = Permission.objects.filter(content_type=content_type, codename__in=permissions)
-    group.permissions.set(perms)
-    return group
+from datetime import timedelta
+from unittest import mock
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase
+from django.contrib.auth.models import Group, User
+from django.utils import timezone
+from tasks.models import Task, TaskLease
+from tasks.queue import claim_next_task, release_expired_leases
+from workflow.query_plans import capture_plans
+from workflow.testing import create_group, create_user
 
 class ServiceManagerTestCase(TestCase):
-    def setUp(self) -> None:
+    @classmethod
+    def setUpTestData(cls) -> None:
         """
         Set up test case
         """
-        self.user: User = create_user()
-        self.group: Group = create_group('Service Manager', ['change_task', 'view_task', 'add_task', 'delete_task'])
-        self.user.groups.add(self.group)
-        self.subteam_user: User = create_user('subteamuser', 'subteampass')
-        self.subteam_group: Group = create_group('Subteam', ['change_task', 'view_task'])
-        self.subteam_user.groups.add(self.subteam_group)
-        self.client.login(username='testuser', password='testpass')
+        cls.user: User = create_user()
+        cls.group: Group = create_group('Service Manager', ['change_task', 'view_task', 'add_task', 'delete_task'])
+        cls.user.groups.add(cls.group)
+        cls.subteam_user: User = create_user('subteamuser', 'subteampass')
+        cls.subteam_group: Group = create_group('Subteam', ['change_task', 'view_task'])
+        cls.subteam_user.groups.add(cls.subteam_group)
+
+    def setUp(self) -> None:
+        """
+        Log in as the test user
+        """
+        self.client.force_login(self.user)
 
     def test_user_has_permission_to_create_events(self):
         """
@@ -134,18 +123,49 @@ class ServiceManagerTestCase(TestCase):
         self.assertEqual(response.status_code, 302)
         self.assertEqual(Task.objects.count(), 0)
 
+    def test_user_cannot_change_approved_events(self):
+        """
+        Test that user can not change tasks that are already approved
+        """
+        task: Task = Task.objects.create(
+            project_ref='Test Project',
+            description='Test Description',
+            sender=self.user,
+            group=self.subteam_group,
+            assigned_to=self.subteam_user,
+            priority='m',
+            _status='approved',
+        )
+        response = self.client.post(f'/tasks/task/{task.pk}/change/', {
+            'project_ref': 'Changed Project',
+            'description': 'Test Description',
+            'sender': self.user.pk,
+            'group': self.subteam_group.pk,
+            'assigned_to': self.subteam_user.pk,
+            'priority': 'm',
+        })
+        self.assertEqual(response.status_code, 403)
+        task.refresh_from_db()
+        self.assertEqual(task.project_ref, 'Test Project')
+
 class SubteamTestCase(TestCase):
-    def setUp(self) -> None:
+    @classmethod
+    def setUpTestData(cls) -> None:
         """
         Set up test case
         """
-        self.user: User = create_user()
-        self.group: Group = create_group('Subteam', ['change_task', 'view_task'])
-        self.user.groups.add(self.group)
-        self.manager_user: User = create_user('manageruser', 'managerpass')
-        self.manager_group: Group = create_group('Service Manager', ['change_task', 'view_task', 'add_task', 'delete_task'])
-        self.manager_user.groups.add(self.manager_group)
-        self.client.login(username='testuser', password='testpass')
+        cls.user: User = create_user()
+        cls.group: Group = create_group('Subteam', ['change_task', 'view_task'])
+        cls.user.groups.add(cls.group)
+        cls.manager_user: User = create_user('manageruser', 'managerpass')
+        cls.manager_group: Group = create_group('Service Manager', ['change_task', 'view_task', 'add_task', 'delete_task'])
+        cls.manager_user.groups.add(cls.manager_group)
+
+    def setUp(self) -> None:
+        """
+        Log in as the test user
+        """
+        self.client.force_login(self.user)
 
     def test_user_has_not_permission_to_create_events(self):
         """
@@ -260,3 +280,268 @@ class SubteamTestCase(TestCase):
         response = self.client.post(f'/tasks/task/{task.pk}/delete/', {'post': 'yes'})
         self.assertEqual(response.status_code, 403)
         self.assertEqual(Task.objects.count(), 1)
+
+class TaskPoolTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """
+        Set up test case
+        """
+        cls.user: User = create_user()
+        cls.group: Group = create_group('Subteam', ['change_task', 'view_task'])
+        cls.user.groups.add(cls.group)
+        cls.other_user: User = create_user('otheruser', 'otherpass')
+        cls.other_user.groups.add(cls.group)
+        cls.manager_user: User = create_user('manageruser', 'managerpass')
+
+    def setUp(self) -> None:
+        """
+        Log in as the test user
+        """
+        self.client.force_login(self.user)
+
+    def create_pool_task(self, project_ref: str, priority: str = 'm', group: Group = None) -> Task:
+        return Task.objects.create(
+            project_ref=project_ref,
+            description='Test Description',
+            sender=self.manager_user,
+            group=group or self.group,
+            priority=priority,
+        )
+
+    def test_claim_returns_oldest_high_priority_task(self):
+        """
+        Test that high priority tasks are claimed first, oldest first
+        """
+        self.create_pool_task('Medium')
+        first_high = self.create_pool_task('High 1', 'h')
+        self.create_pool_task('High 2', 'h')
+        task = claim_next_task(self.user, group=self.group)
+        self.assertEqual(task, first_high)
+        task.refresh_from_db()
+        self.assertEqual(task.assigned_to, self.user)
+        self.assertEqual(task.lease.worker, self.user)
+
+    def test_workers_never_claim_the_same_task(self):
+        """
+        Test that every claim hands out a different task until the pool is empty
+        """
+        tasks = [self.create_pool_task(f'Project {i}') for i in range(5)]
+        claimed = [claim_next_task(worker) for worker in [self.user, self.other_user] * 3]
+        self.assertEqual(sorted(task.pk for task in claimed[:5]), [task.pk for task in tasks])
+        self.assertIsNone(claimed[5])
+
+    def test_leased_task_is_skipped(self):
+        """
+        Test that a task leased by a worker that has not assigned it yet is skipped
+        """
+        leased = self.create_pool_task('Leased', 'h')
+        TaskLease.objects.create(task=leased, worker=self.other_user, expires_at=timezone.now() + timedelta(minutes=5))
+        free = self.create_pool_task('Free')
+        self.assertEqual(claim_next_task(self.user), free)
+
+    def test_expired_lease_returns_task_to_pool(self):
+        """
+        Test that an unfinished task goes back to the pool once its lease expires
+        """
+        task = self.create_pool_task('Project')
+        claim_next_task(self.other_user)
+        TaskLease.objects.filter(task=task).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(release_expired_leases(), 1)
+        task.refresh_from_db()
+        self.assertIsNone(task.assigned_to)
+        self.assertFalse(TaskLease.objects.exists())
+
+    def test_claim_endpoint(self):
+        """
+        Test that the claim endpoint assigns a task of the pool and describes it
+        """
+        task = self.create_pool_task('Project')
+        other_group = create_group('Subteam Other', ['change_task', 'view_task'])
+        self.create_pool_task('Other Project', group=other_group)
+        response = self.client.post('/tasks/task/claim/', {'group': self.group.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['task']['id'], task.pk)
+        response = self.client.post('/tasks/task/claim/')
+        self.assertEqual(response.json(), {'task': None})
+        self.assertEqual(self.client.get('/tasks/task/claim/').status_code, 405)
+
+    def test_claim_endpoint_checks_the_group(self):
+        """
+        Test that the claim endpoint refuses malformed groups and the pools of groups the user is not in
+        """
+        other_group = create_group('Subteam Other', ['change_task', 'view_task'])
+        other_task = self.create_pool_task('Other Project', group=other_group)
+        self.assertEqual(self.client.post('/tasks/task/claim/', {'group': 'audio'}).status_code, 400)
+        self.assertEqual(self.client.post('/tasks/task/claim/', {'group': other_group.pk}).status_code, 403)
+        self.assertEqual(self.client.post('/tasks/task/claim/').json(), {'task': None})
+        other_task.refresh_from_db()
+        self.assertIsNone(other_task.assigned_to)
+
+    def test_claim_action(self):
+        """
+        Test that the admin action claims the best task of the selection
+        """
+        task = self.create_pool_task('Project', 'h')
+        response = self.client.get('/tasks/task/')
+        self.assertContains(response, 'Project')
+        response = self.client.post('/tasks/task/', {
+            'action': 'claim_next',
+            '_selected_action': [task.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        task.refresh_from_db()
+        self.assertEqual(task.assigned_to, self.user)
+
+class TaskClaimRetryTestCase(TransactionTestCase):
+    """
+    Claims outside a transaction, as the workers make them
+    """
+    def setUp(self) -> None:
+        self.user: User = create_user()
+        self.group: Group = create_group('Subteam', ['change_task', 'view_task'])
+        self.task = Task.objects.create(
+            project_ref='Project',
+            description='Test Description',
+            sender=create_user('manageruser', 'managerpass'),
+            group=self.group,
+        )
+
+    def test_locked_claim_is_retried(self):
+        """
+        Test that a claim that found the database locked backs off and claims the task
+        """
+        create = TaskLease.objects.create
+        errors = [OperationalError('database is locked')] * 2
+
+        def lease(**kwargs):
+            if errors:
+                raise errors.pop()
+            return create(**kwargs)
+        with mock.patch.object(TaskLease.objects, 'create', side_effect=lease), \
+                mock.patch('tasks.queue.time.sleep') as sleep:
+            task = claim_next_task(self.user)
+        self.assertEqual(task, self.task)
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.05, 0.1])
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.assigned_to, self.user)
+
+    def test_claim_gives_up_when_always_locked(self):
+        """
+        Test that a claim raises once the database stayed locked for every retry
+        """
+        with mock.patch.object(TaskLease.objects, 'create', side_effect=OperationalError('database is locked')), \
+                mock.patch('tasks.queue.time.sleep') as sleep:
+            with self.assertRaises(OperationalError):
+                claim_next_task(self.user)
+        self.assertEqual(sleep.call_count, 4)
+        self.task.refresh_from_db()
+        self.assertIsNone(self.task.assigned_to)
+
+
+class TaskAutocompleteTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """
+        Set up test case
+        """
+        cls.user: User = create_user()
+        cls.group: Group = create_group('Service Manager', ['change_task', 'view_task', 'add_task', 'delete_task'])
+        cls.user.groups.add(cls.group)
+        cls.photography: Group = create_group('Subteam Photography', ['change_task', 'view_task'])
+        cls.production: Group = create_group('Subteam Production', ['change_task', 'view_task'])
+        for i in range(25):
+            subteam_user = User.objects.create(username=f'subteam{i:02}', is_staff=True)
+            subteam_user.groups.add(cls.photography, cls.production)
+        create_user('outsider', 'outsiderpass')
+
+    def setUp(self) -> None:
+        """
+        Log in as the test user
+        """
+        self.client.force_login(self.user)
+
+    def autocomplete(self, field_name: str, **params) -> dict:
+        response = self.client.get('/tasks/task/autocomplete/', {
+            'app_label': 'tasks',
+            'model_name': 'task',
+            'field_name': field_name,
+            **params,
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_change_form_does_not_embed_every_user(self):
+        """
+        Test that the add form renders autocomplete widgets instead of full select lists
+        """
+        response = self.client.get('/tasks/task/add/')
+        self.assertContains(response, 'data-ajax--url="/tasks/task/autocomplete/"', count=3)
+        self.assertNotContains(response, 'subteam00')
+
+    def test_autocomplete_is_scoped_distinct_and_paged(self):
+        """
+        Test that users in several subteams appear once and results come in pages
+        """
+        page = self.autocomplete('assigned_to')
+        self.assertEqual(len(page['results']), 20)
+        self.assertTrue(page['pagination']['more'])
+        page_2 = self.autocomplete('assigned_to', page=2)
+        self.assertFalse(page_2['pagination']['more'])
+        usernames = [result['text'] for result in page['results'] + page_2['results']]
+        self.assertEqual(usernames, [f'subteam{i:02}' for i in range(25)])
+
+    def test_autocomplete_matches_prefix(self):
+        """
+        Test that the search term matches the start of the username
+        """
+        page = self.autocomplete('assigned_to', term='subteam1')
+        self.assertEqual([result['text'] for result in page['results']], [f'subteam{i}' for i in range(10, 20)])
+        page = self.autocomplete('sender', term='test')
+        self.assertEqual([result['text'] for result in page['results']], ['testuser'])
+        page = self.autocomplete('group')
+        self.assertEqual([result['text'] for result in page['results']], ['Subteam Photography', 'Subteam Production'])
+
+    def test_autocomplete_uses_the_upper_case_indexes(self):
+        """
+        Test that the prefix search reads users and groups through their upper case indexes
+        """
+        for field_name, index in (('assigned_to', 'auth_user_username_upper_idx'), ('group', 'auth_group_name_upper_idx')):
+            with capture_plans(['auth_user', 'auth_group']) as plans:
+                page = self.autocomplete(field_name, term='SUB')
+            self.assertTrue(page['results'])
+            searches = [plan for plan in plans if 'UPPER' in plan.sql]
+            self.assertTrue(searches)
+            for plan in searches:
+                self.assertFalse(plan.problems, f'{plan.sql}\n' + '\n'.join(plan.plan))
+            self.assertTrue(any(index in step for plan in searches for step in plan.plan))
+
+    def test_autocomplete_rejects_other_fields_and_users(self):
+        """
+        Test that the endpoint only serves the scoped fields of tasks to task editors
+        """
+        response = self.client.get('/tasks/task/autocomplete/', {
+            'app_label': 'staff', 'model_name': 'recruitment', 'field_name': 'requester',
+        })
+        self.assertEqual(response.status_code, 403)
+        self.client.login(username='outsider', password='outsiderpass')
+        response = self.client.get('/tasks/task/autocomplete/', {
+            'app_label': 'tasks', 'model_name': 'task', 'field_name': 'assigned_to',
+        })
+        self.assertEqual(response.status_code, 403)
+
+    def test_user_in_several_subteams_can_be_assigned(self):
+        """
+        Test that assigning a user who is in several subteams validates
+        """
+        subteam_user = User.objects.get(username='subteam00')
+        response = self.client.post('/tasks/task/add/', {
+            'project_ref': 'Test Project',
+            'description': 'Test Description',
+            'sender': self.user.pk,
+            'group': self.photography.pk,
+            'assigned_to': subteam_user.pk,
+            'priority': 'm',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Task.objects.get().assigned_to, subteam_user)
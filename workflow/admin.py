@@ -0,0 +1,116 @@
+from django.contrib import messages
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.db.models.functions import Upper
+from django.http import HttpResponseRedirect
+from django.urls import path, reverse
+
+from workflow.forms import VersionedModelForm
+from workflow.models import ConcurrentUpdateError
+
+
+def prefix_search(field: str, upper_alias: str, term: str) -> Q:
+    """
+    Case-insensitive prefix match of ``field``, whose upper case value is
+    annotated as ``upper_alias``. Taken as the range from the upper case
+    term to the term with its last character incremented, which an index
+    on the upper case expression serves whatever the collation. UPPER
+    only folds ASCII on SQLite, so other terms fall back to a LIKE.
+    """
+    if not term.isascii():
+        return Q(**{f'{field}__istartswith': term})
+    prefix = term.upper()
+    return Q(**{
+        f'{upper_alias}__gte': prefix,
+        f'{upper_alias}__lt': prefix[:-1] + chr(ord(prefix[-1]) + 1),
+    })
+
+
+class VersionedAdminMixin:
+    """
+    Re-renders the change form with fresh data when the record was
+    approved or edited by someone else while the form was open
+    """
+    form = VersionedModelForm
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except ConcurrentUpdateError:
+            self.message_user(
+                request,
+                'This record was changed by someone else while you were editing it. '
+                'The form has been reloaded with the latest data, please review it again.',
+                messages.ERROR,
+            )
+            return HttpResponseRedirect(request.get_full_path())
+
+
+class ScopedAutocompleteSelect(AutocompleteSelect):
+    """
+    Autocomplete widget asking the source model admin for its choices
+    """
+    def get_url(self):
+        opts = self.field.model._meta
+        return reverse(f'{self.admin_site.name}:{opts.app_label}_{opts.model_name}_autocomplete')
+
+
+class ScopedAutocompleteJsonView(AutocompleteJsonView):
+    """
+    Paged JSON choices for a foreign key, limited to what the source model
+    admin allows for the requesting user and matched by prefix on the
+    upper case first search field of the related model admin, which an
+    index of workflow's migrations serves for users and groups
+    """
+    source_admin = None
+
+    def process_request(self, request):
+        term, model_admin, source_field, to_field_name = super().process_request(request)
+        if source_field.model is not self.source_admin.model \
+            or source_field.name not in self.source_admin.scoped_autocomplete_fields:
+            raise PermissionDenied
+        return term, model_admin, source_field, to_field_name
+
+    def has_perm(self, request, obj=None):
+        return self.source_admin.has_add_permission(request) \
+            or self.source_admin.has_change_permission(request)
+
+    def get_queryset(self):
+        search_field = self.model_admin.get_search_fields(self.request)[0].lstrip('^=@')
+        queryset = self.source_admin.get_scoped_queryset(self.request, self.source_field.name)
+        queryset = queryset.alias(search_upper=Upper(search_field))
+        if self.term:
+            queryset = queryset.filter(prefix_search(search_field, 'search_upper', self.term))
+        return queryset.order_by('search_upper', 'pk')
+
+
+class ScopedAutocompleteMixin:
+    """
+    Renders the foreign keys in ``scoped_autocomplete_fields`` as
+    autocomplete widgets, so change forms stay the same size however many
+    users or groups there are. Choices come from ``get_scoped_queryset``.
+    """
+    scoped_autocomplete_fields = ()
+
+    def get_scoped_queryset(self, request, field_name):
+        return self.model._meta.get_field(field_name).related_model._default_manager.all()
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path(
+                'autocomplete/',
+                self.admin_site.admin_view(
+                    ScopedAutocompleteJsonView.as_view(admin_site=self.admin_site, source_admin=self)
+                ),
+                name=f'{opts.app_label}_{opts.model_name}_autocomplete',
+            ),
+        ] + super().get_urls()
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.scoped_autocomplete_fields:
+            kwargs['queryset'] = self.get_scoped_queryset(request, db_field.name)
+            kwargs['widget'] = ScopedAutocompleteSelect(db_field, self.admin_site, using=kwargs.get('using'))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
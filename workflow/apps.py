@@ -0,0 +1,20 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
+
+
+class WorkflowConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'workflow'
+
+    def ready(self):
+        from django.contrib.auth.models import Group
+        from roles.models import GroupRole
+        from workflow import facets
+        from workflow.models import workflow_models
+        from workflow.filters import clear_cached_choices
+        for model in [Group, GroupRole]:
+            post_save.connect(clear_cached_choices, sender=model, dispatch_uid=f'clear_cached_choices_{model._meta.label}')
+            post_delete.connect(clear_cached_choices, sender=model, dispatch_uid=f'clear_cached_choices_{model._meta.label}')
+        for model in workflow_models():
+            post_save.connect(facets.count_saved, sender=model, dispatch_uid=f'facet_count_saved_{model._meta.label}')
+            post_delete.connect(facets.count_deleted, sender=model, dispatch_uid=f'facet_count_deleted_{model._meta.label}')
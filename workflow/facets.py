@@ -0,0 +1,68 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from workflow.models import FacetCount, WorkflowModel, workflow_models
+
+
+def facet_value(value) -> str:
+    return '' if value is None else str(value)
+
+
+def facet_counts(model: type[WorkflowModel], field_name: str) -> dict[str, int]:
+    """
+    Record count per value of ``field_name``
+    """
+    return dict(
+        FacetCount.objects.filter(model=model._meta.label, field=field_name).values_list('value', 'count')
+    )
+
+
+def adjust(model: type[WorkflowModel], field_name: str, value, delta: int) -> None:
+    counter = FacetCount.objects.filter(model=model._meta.label, field=field_name, value=facet_value(value))
+    if counter.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            FacetCount.objects.create(model=model._meta.label, field=field_name, value=facet_value(value), count=delta)
+    except IntegrityError:
+        # Created by a concurrent save in the meantime
+        counter.update(count=F('count') + delta)
+
+
+def facet_attnames(model: type[WorkflowModel]) -> dict[str, str]:
+    return {name: model._meta.get_field(name).attname for name in model.facet_fields}
+
+
+def count_saved(sender, instance: WorkflowModel, created: bool, raw: bool, **kwargs) -> None:
+    if not issubclass(sender, WorkflowModel) or raw:
+        return
+    loaded_values = getattr(instance, '_loaded_values', None)
+    for name, attname in facet_attnames(sender).items():
+        value = getattr(instance, attname)
+        if created or loaded_values is None:
+            adjust(sender, name, value, 1)
+        elif facet_value(loaded_values.get(attname)) != facet_value(value):
+            adjust(sender, name, loaded_values.get(attname), -1)
+            adjust(sender, name, value, 1)
+
+
+def count_deleted(sender, instance: WorkflowModel, **kwargs) -> None:
+    if not issubclass(sender, WorkflowModel):
+        return
+    loaded_values = getattr(instance, '_loaded_values', {})
+    for name, attname in facet_attnames(sender).items():
+        adjust(sender, name, loaded_values.get(attname, getattr(instance, attname)), -1)
+
+
+def rebuild_facet_counts() -> None:
+    """
+    Recount every facet from scratch, e.g. after bulk updates that bypass save()
+    """
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        for model in workflow_models():
+            for name in model.facet_fields:
+                FacetCount.objects.bulk_create([
+                    FacetCount(model=model._meta.label, field=name, value=facet_value(row[name]), count=row['count'])
+                    for row in model.objects.order_by().values(name).annotate(count=Count('pk'))
+                ])
@@ -0,0 +1,59 @@
+from typing import Callable, Iterable
+
+from django.contrib import admin
+from django.core.cache import cache
+
+from workflow.facets import facet_counts
+
+CHOICES_VERSION_KEY = 'workflow:choices:version'
+# Upper bound on staleness when the cache is shared between processes
+CHOICES_TIMEOUT = 5 * 60
+
+
+def cached_choices(name: str, choices: Callable[[], Iterable]) -> list:
+    """
+    Filter choices computed once and kept in the cache until
+    :func:`clear_cached_choices` is called
+    """
+    version = cache.get_or_set(CHOICES_VERSION_KEY, 1, None)
+    return cache.get_or_set(f'workflow:choices:{name}:{version}', lambda: list(choices()), CHOICES_TIMEOUT)
+
+
+def clear_cached_choices(**kwargs) -> None:
+    try:
+        cache.incr(CHOICES_VERSION_KEY)
+    except ValueError:
+        pass
+
+
+def scoped(model_admin: admin.ModelAdmin, request) -> bool:
+    """
+    Whether the changelist shows the user only some of the records, so
+    the facet counters, which count all of them, do not apply
+    """
+    return bool(model_admin.get_queryset(request).query.where)
+
+
+class FacetCountFieldListFilter(admin.ChoicesFieldListFilter):
+    """
+    Choices filter showing how many records have each choice, read from
+    the maintained facet counters rather than a GROUP BY per page view.
+    Users whose changelist is scoped get the choices without counts.
+    """
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.scoped = scoped(model_admin, request)
+
+    def choices(self, changelist):
+        if self.scoped:
+            yield from super().choices(changelist)
+            return
+        counts = facet_counts(self.field.model, self.field.name)
+        choices = super().choices(changelist)
+        all_choice = next(choices)
+        all_choice['display'] = f'{all_choice["display"]} ({sum(counts.values())})'
+        yield all_choice
+        lookups = [(lookup, title) for lookup, title in self.field.flatchoices if lookup is not None]
+        for (lookup, title), choice in zip(lookups, choices):
+            choice['display'] = f'{title} ({counts.get(str(lookup), 0)})'
+            yield choice
@@ -0,0 +1,19 @@
+from django import forms
+
+
+class VersionedModelForm(forms.ModelForm):
+    """
+    Carries the version of the record the user loaded, so saving a stale
+    form fails instead of silently overwriting a newer approval
+    """
+    loaded_version = forms.IntegerField(widget=forms.HiddenInput, required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['loaded_version'].initial = self.instance.version
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('loaded_version') is not None:
+            self.instance.version = cleaned_data['loaded_version']
+        return cleaned_data
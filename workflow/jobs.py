@@ -0,0 +1,8 @@
+from jobs.models import Job
+from jobs.registry import job
+from workflow.facets import rebuild_facet_counts
+
+
+@job('workflow.rebuild_facet_counts', concurrency=1)
+def rebuild_facet_counts_job(job: Job) -> None:
+    rebuild_facet_counts()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from workflow.facets import rebuild_facet_counts
+
+
+class Command(BaseCommand):
+    help = 'Recount the list filter facets of the workflow models from scratch'
+
+    def handle(self, *args, **options):
+        rebuild_facet_counts()
+        self.stdout.write(self.style.SUCCESS('Facet counts rebuilt'))
@@ -0,0 +1,40 @@
+from django.db import migrations
+from django.db.models import Count
+
+FACET_FIELDS = {
+    ('events', 'Event'): ('_status',),
+    ('financial', 'FinancialRequest'): ('requesting_department', '_status'),
+    ('staff', 'Recruitment'): ('requesting_department', 'contract_type', '_status'),
+    ('tasks', 'Task'): ('group', 'priority'),
+}
+
+
+def seed_facet_counts(apps, schema_editor):
+    FacetCount = apps.get_model('workflow', 'FacetCount')
+    for (app_label, model_name), fields in FACET_FIELDS.items():
+        model = apps.get_model(app_label, model_name)
+        for field in fields:
+            FacetCount.objects.bulk_create([
+                FacetCount(
+                    model=f'{app_label}.{model_name}',
+                    field=field,
+                    value='' if row[field] is None else str(row[field]),
+                    count=row['count'],
+                )
+                for row in model.objects.order_by().values(field).annotate(count=Count('pk'))
+            ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0001_initial'),
+        ('events', '0004_alter_event_record_number_and_more'),
+        ('financial', '0003_financialrequest_closed_at'),
+        ('staff', '0003_recruitment_closed_at'),
+        ('tasks', '0004_task_closed_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_facet_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+# The autocomplete widgets match users and groups by the upper case
+# prefix of their first search field
+INDEXES = [
+    ('auth_user_username_upper_idx', 'auth_user', 'username'),
+    ('auth_group_name_upper_idx', 'auth_group', 'name'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('workflow', '0003_backfillprogress'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f'CREATE INDEX {name} ON {table} (UPPER({column}))',
+            f'DROP INDEX {name}',
+        )
+        for name, table, column in INDEXES
+    ]
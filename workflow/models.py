@@ -0,0 +1,99 @@
+from django.apps import apps
+from django.db import models, router, transaction
+from django.utils import timezone
+
+
+class ConcurrentUpdateError(Exception):
+    """
+    Raised when a workflow record was changed by someone else
+    between loading it and saving it
+    """
+
+
+class WorkflowModel(models.Model):
+    """
+    Common base for the approval workflow models.
+
+    Every update is a conditional ``UPDATE ... WHERE version = ?`` so two
+    approvers working on the same record can not both move it forward.
+    ``closed_at`` records when the record reached one of ``closed_statuses``.
+    The values of ``facet_fields`` are counted in :class:`FacetCount`.
+    """
+    closed_statuses = ('approved',)
+    facet_fields = ('_status',)
+
+    version = models.PositiveIntegerField(default=0, editable=False)
+    closed_at = models.DateTimeField(blank=True, null=True, editable=False, db_index=True)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs) -> None:
+        if self.closed_at is None and self._status in self.closed_statuses:
+            self.closed_at = timezone.now()
+        # post_save receivers (facet counters, outbox) write in the same transaction
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+        self._loaded_values = {field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields}
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        if self._state.adding:
+            # Not loaded from the database (e.g. fixtures), nothing to compare against
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        current_version = self.version
+        version_field = self._meta.get_field('version')
+        values = [value for value in values if value[0] is not version_field]
+        values.append((version_field, None, current_version + 1))
+        updated = super()._do_update(
+            base_qs.filter(version=current_version),
+            using, pk_val, values, update_fields, forced_update,
+        )
+        if updated:
+            self.version = current_version + 1
+        elif base_qs.filter(pk=pk_val).exists():
+            raise ConcurrentUpdateError(
+                f'{self._meta.verbose_name} {pk_val} was changed by someone else'
+            )
+        return updated
+
+
+def workflow_models() -> list[type[WorkflowModel]]:
+    return [model for model in apps.get_models() if issubclass(model, WorkflowModel)]
+
+
+class FacetCount(models.Model):
+    """
+    Number of workflow records having a given value in one of their
+    ``facet_fields``, kept up to date on every save and delete
+    """
+    model = models.CharField(max_length=100)
+    field = models.CharField(max_length=100)
+    value = models.CharField(max_length=255)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'field', 'value'], name='facet_count_unique_value'),
+        ]
+
+
+class BackfillProgress(models.Model):
+    """
+    How far a batched data migration got, so a migrate interrupted half
+    way resumes after the last committed batch instead of starting over
+    """
+    name = models.CharField(max_length=255, unique=True)
+    last_pk = models.BigIntegerField(default=0)
+    rows = models.BigIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self) -> str:
+        return self.name
@@ -0,0 +1,349 @@
+"""
+Migration operations that keep the workflow tables available while
+their schema or data changes. All of them need ``atomic = False`` on
+the migration, as their point is to commit as they go.
+"""
+import copy
+import logging
+import time
+from typing import Callable, Optional
+
+from django.apps.registry import Apps
+from django.db import NotSupportedError, migrations, transaction
+from django.db.backends.utils import strip_quotes
+from django.utils import timezone
+
+logger = logging.getLogger('workflow.migrations')
+
+BATCH_SIZE = 1000
+
+
+def require_non_atomic(schema_editor, operation: migrations.operations.base.Operation) -> None:
+    if schema_editor.atomic_migration:
+        raise NotSupportedError(
+            f'{operation.__class__.__name__} commits as it goes and cannot run inside a transaction. '
+            f'Set atomic = False on the migration.'
+        )
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """
+    Build an index without blocking writes on PostgreSQL. SQLite has no
+    such build, so there the index is created as usual.
+    """
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor == 'postgresql':
+            require_non_atomic(schema_editor, self)
+            schema_editor.add_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.add_index(model, self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor == 'postgresql':
+            require_non_atomic(schema_editor, self)
+            schema_editor.remove_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.remove_index(model, self.index)
+
+    def describe(self):
+        return f'{super().describe()} concurrently'
+
+
+class RebuildTableOnline(migrations.operations.base.Operation):
+    """
+    Run a field operation (AddField, AlterField or RemoveField) without
+    locking the table for the length of a copy.
+
+    SQLite can only make most such changes by copying the table, which
+    Django does in one statement holding the write lock throughout.
+    Here the copy goes into a shadow table in committed batches, while
+    triggers replay concurrent writes onto it; only the swap of the two
+    tables and the rebuild of the indexes take the lock. Changes SQLite
+    makes in place, and every change on other databases, are left to the
+    wrapped operation.
+    """
+    reduces_to_sql = False
+
+    def __init__(self, operation, batch_size: int = BATCH_SIZE, pause: float = 0.0):
+        if not isinstance(operation, (migrations.AddField, migrations.AlterField, migrations.RemoveField)):
+            raise TypeError('RebuildTableOnline wraps AddField, AlterField or RemoveField')
+        self.operation = operation
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def deconstruct(self):
+        kwargs = {'operation': self.operation}
+        if self.batch_size != BATCH_SIZE:
+            kwargs['batch_size'] = self.batch_size
+        if self.pause:
+            kwargs['pause'] = self.pause
+        return self.__class__.__qualname__, [], kwargs
+
+    @property
+    def reversible(self):
+        return self.operation.reversible
+
+    def state_forwards(self, app_label, state):
+        self.operation.state_forwards(app_label, state)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self.alter(app_label, schema_editor, from_state, to_state, self.operation.database_forwards)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self.alter(app_label, schema_editor, from_state, to_state, self.operation.database_backwards)
+
+    def describe(self):
+        return f'{self.operation.describe()} (online)'
+
+    @property
+    def migration_name_fragment(self):
+        return self.operation.migration_name_fragment
+
+    def alter(self, app_label, schema_editor, from_state, to_state, fallback) -> None:
+        old_model = from_state.apps.get_model(app_label, self.operation.model_name)
+        new_model = to_state.apps.get_model(app_label, self.operation.model_name)
+        if (
+            schema_editor.connection.vendor != 'sqlite'
+            or not self.allow_migrate_model(schema_editor.connection.alias, new_model)
+            or self.in_place(schema_editor, old_model, new_model)
+        ):
+            fallback(app_label, schema_editor, from_state, to_state)
+            return
+        require_non_atomic(schema_editor, self)
+        rebuild_table(schema_editor, old_model, new_model, self.batch_size, self.pause)
+
+    def in_place(self, schema_editor, old_model, new_model) -> bool:
+        """
+        Whether SQLite makes the change with an ALTER TABLE: adding a
+        nullable column without a default
+        """
+        old_columns = {field.column for field in old_model._meta.local_concrete_fields}
+        added = [field for field in new_model._meta.local_concrete_fields if field.column not in old_columns]
+        return (
+            len(added) == 1
+            and len(new_model._meta.local_concrete_fields) == len(old_model._meta.local_concrete_fields) + 1
+            and added[0].null
+            and not added[0].unique
+            and schema_editor.effective_default(added[0]) is None
+        )
+
+
+def shadow_model(model, db_table: str):
+    """
+    A copy of ``model`` stored in ``db_table``, built the way SQLite's
+    schema editor builds the table it copies into
+    """
+    body = {field.name: copy.deepcopy(field) for field in model._meta.local_concrete_fields}
+    meta = type('Meta', (), {
+        'app_label': model._meta.app_label,
+        'db_table': db_table,
+        'unique_together': model._meta.unique_together,
+        'indexes': model._meta.indexes,
+        'constraints': list(model._meta.constraints),
+        'apps': Apps(),
+    })
+    body.update({'Meta': meta, '__module__': model.__module__})
+    return type(f'Shadow{model._meta.object_name}', model.__bases__, body)
+
+
+def copy_expressions(schema_editor, old_model, new_model) -> dict[str, Callable[[str], str]]:
+    """
+    For every column of the new table, the SQL computing it from a row
+    of the old one, given how that row is referred to
+    """
+    quote = schema_editor.quote_name
+    old_fields = {field.column: field for field in old_model._meta.local_concrete_fields}
+    expressions = {}
+    for field in new_model._meta.local_concrete_fields:
+        old_field = old_fields.get(field.column)
+        default = schema_editor.prepare_default(schema_editor.effective_default(field))
+        if old_field is None:
+            expressions[field.column] = lambda row, default=default: default
+        elif old_field.null and not field.null:
+            expressions[field.column] = lambda row, column=field.column, default=default: f'coalesce({row}{quote(column)}, {default})'
+        else:
+            expressions[field.column] = lambda row, column=field.column: f'{row}{quote(column)}'
+    return expressions
+
+
+def rebuild_table(schema_editor, old_model, new_model, batch_size: int = BATCH_SIZE, pause: float = 0.0) -> None:
+    """
+    Rebuild the table of ``old_model`` as ``new_model`` through a shadow
+    table filled in committed batches
+    """
+    connection = schema_editor.connection
+    quote = schema_editor.quote_name
+    table = old_model._meta.db_table
+    shadow = shadow_model(new_model, f'new__{strip_quotes(table)}')
+    shadow_table = shadow._meta.db_table
+    pk = quote(old_model._meta.pk.column)
+    expressions = copy_expressions(schema_editor, old_model, new_model)
+    columns = ', '.join(quote(column) for column in expressions)
+
+    def values(row: str) -> str:
+        return ', '.join(expression(row) for expression in expressions.values())
+
+    triggers = {
+        'insert': f'INSERT OR REPLACE INTO {quote(shadow_table)} ({columns}) VALUES ({values("NEW.")})',
+        'update': (
+            f'DELETE FROM {quote(shadow_table)} WHERE {pk} = OLD.{pk}; '
+            f'INSERT OR REPLACE INTO {quote(shadow_table)} ({columns}) VALUES ({values("NEW.")})'
+        ),
+        'delete': f'DELETE FROM {quote(shadow_table)} WHERE {pk} = OLD.{pk}',
+    }
+
+    def drop_shadow() -> None:
+        for event in triggers:
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {quote(f"{shadow_table}_{event}")}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {quote(shadow_table)}')
+
+    # Left over by an interrupted run
+    drop_shadow()
+    # Indexes of the shadow table are deferred until it takes the old one's place
+    schema_editor.create_model(shadow)
+    for event, body in triggers.items():
+        schema_editor.execute(
+            f'CREATE TRIGGER {quote(f"{shadow_table}_{event}")} AFTER {event.upper()} ON {quote(table)} '
+            f'FOR EACH ROW BEGIN {body}; END'
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT max({pk}) FROM {quote(table)}')
+        last_pk = cursor.fetchone()[0] or 0
+    started = time.monotonic()
+    copied_to = 0
+    try:
+        while copied_to < last_pk:
+            # Rows already replayed by a trigger are newer than the old table's batch
+            with transaction.atomic(using=connection.alias):
+                schema_editor.execute(
+                    f'INSERT OR IGNORE INTO {quote(shadow_table)} ({columns}) '
+                    f'SELECT {values("")} FROM {quote(table)} WHERE {pk} > %s AND {pk} <= %s',
+                    (copied_to, copied_to + batch_size),
+                )
+            copied_to += batch_size
+            logger.info('%s: copied up to id %d of %d in %.1fs', table, min(copied_to, last_pk), last_pk, time.monotonic() - started)
+            if pause:
+                time.sleep(pause)
+    except BaseException:
+        # The triggers would fail every write once the shadow table is gone
+        schema_editor.deferred_sql = [
+            sql for sql in schema_editor.deferred_sql
+            if not (hasattr(sql, 'references_table') and sql.references_table(shadow_table))
+        ]
+        drop_shadow()
+        raise
+
+    with transaction.atomic(using=connection.alias):
+        for event in triggers:
+            schema_editor.execute(f'DROP TRIGGER {quote(f"{shadow_table}_{event}")}')
+        schema_editor.delete_model(old_model, handle_autom2m=False)
+        schema_editor.alter_db_table(shadow, shadow_table, table, disable_constraints=False)
+        for sql in schema_editor.deferred_sql:
+            schema_editor.execute(sql)
+        schema_editor.deferred_sql = []
+    logger.info('%s: rebuilt in %.1fs', table, time.monotonic() - started)
+
+
+class Backfill(migrations.operations.base.Operation):
+    """
+    Apply ``function(apps, rows)`` to every row of a model in primary key
+    batches, each committed on its own with a ``pause`` after it so the
+    workflow keeps writing in between. Progress is logged and recorded
+    in BackfillProgress, from which a migrate that was interrupted
+    resumes. Migrations using it depend on workflow 0003.
+    """
+    reduces_to_sql = False
+    reversible = True
+
+    def __init__(
+        self,
+        model_name: str,
+        function: Callable,
+        batch_size: int = BATCH_SIZE,
+        pause: float = 0.0,
+        fields: Optional[list[str]] = None,
+        name: Optional[str] = None,
+    ):
+        self.model_name = model_name
+        self.function = function
+        self.batch_size = batch_size
+        self.pause = pause
+        self.fields = fields
+        self.name = name
+
+    def deconstruct(self):
+        kwargs = {'model_name': self.model_name, 'function': self.function}
+        for attribute, default in (('batch_size', BATCH_SIZE), ('pause', 0.0), ('fields', None), ('name', None)):
+            if getattr(self, attribute) != default:
+                kwargs[attribute] = getattr(self, attribute)
+        return self.__class__.__qualname__, [], kwargs
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        require_non_atomic(schema_editor, self)
+        backfill(
+            to_state.apps, model, self.function, self.name or f'{app_label}.{self.model_name}.{self.function.__name__}',
+            self.batch_size, self.pause, self.fields, schema_editor.connection.alias,
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        # Going back forgets the progress, so a new forwards run starts over
+        name = self.name or f'{app_label}.{self.model_name}.{self.function.__name__}'
+        to_state.apps.get_model('workflow', 'BackfillProgress').objects.using(schema_editor.connection.alias).filter(name=name).delete()
+
+    def describe(self):
+        return f'Backfill {self.model_name} with {self.function.__name__}'
+
+
+def backfill(
+    apps, model, function: Callable, name: str, batch_size: int = BATCH_SIZE, pause: float = 0.0,
+    fields: Optional[list[str]] = None, using: str = 'default',
+) -> int:
+    """
+    The batches of a Backfill. Returns the number of rows processed by
+    this run.
+    """
+    BackfillProgress = apps.get_model('workflow', 'BackfillProgress')
+    progress, _ = BackfillProgress.objects.using(using).get_or_create(name=name)
+    if progress.finished_at is not None:
+        return 0
+    queryset = model._base_manager.using(using).order_by('pk')
+    if fields:
+        queryset = queryset.only(*fields)
+    remaining = queryset.filter(pk__gt=progress.last_pk).count()
+    started = time.monotonic()
+    processed = 0
+    while True:
+        with transaction.atomic(using=using):
+            batch = list(queryset.filter(pk__gt=progress.last_pk)[:batch_size])
+            if batch:
+                function(apps, batch)
+                progress.last_pk = batch[-1].pk
+                progress.rows += len(batch)
+            else:
+                progress.finished_at = timezone.now()
+            progress.save(using=using)
+        if not batch:
+            break
+        processed += len(batch)
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed else 0
+        logger.info(
+            '%s: %d of %d rows, %.0f rows/s, %.0fs left',
+            name, processed, remaining, rate, (remaining - processed) / rate if rate else 0,
+        )
+        if pause:
+            time.sleep(pause)
+    return processed
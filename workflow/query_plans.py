@@ -0,0 +1,159 @@
+"""
+Checks that the queries behind the workflow pages use indexes, from the
+plans the database reports for them. Used by the query plan tests with
+the volumes of ``seed_volumes``, so the planner sees realistic tables.
+"""
+import json
+import random
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from django.contrib.auth.models import Group, User
+from django.db import connection as default_connection
+from django.test.utils import CaptureQueriesContext
+
+from financial.models import FinancialRequest
+from staff.models import Recruitment
+from tasks.models import Task
+
+# Lookup tables small enough for a scan to be the best plan
+SMALL_TABLES = frozenset({
+    'auth_group',
+    'auth_permission',
+    'django_content_type',
+    'roles_grouprole',
+    'workflow_facetcount',
+})
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: AS (\w+))?$')
+SQLITE_SORT = re.compile(r'^USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY$')
+
+
+@dataclass
+class QueryPlan:
+    sql: str
+    plan: list[str]
+    problems: list[str] = field(default_factory=list)
+
+
+def explain(sql: str, connection=default_connection) -> list[str]:
+    """
+    The plan of a query, one line per step
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+        document = cursor.fetchone()[0]
+    nodes = []
+
+    def walk(node: dict) -> None:
+        relation = node.get('Relation Name')
+        nodes.append(f"{node['Node Type']} on {relation}" if relation else node['Node Type'])
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk((json.loads(document) if isinstance(document, str) else document)[0]['Plan'])
+    return nodes
+
+
+def plan_problems(plan: list[str], sql: str = '', small_tables=SMALL_TABLES) -> list[str]:
+    """
+    The steps of a plan reading a whole table, other than a small one,
+    or sorting rows no index returns in order. A scan of a query without
+    a WHERE clause but with a LIMIT stops after that many rows, as long
+    as nothing is sorted. Scans of a whole index are accepted.
+    """
+    bounded = ' LIMIT ' in sql and ' WHERE ' not in sql
+    problems = []
+    for step in plan:
+        scan = SQLITE_SCAN.match(step)
+        postgres_scan = step.startswith('Seq Scan on ') and step[len('Seq Scan on '):]
+        table = scan.group(1) if scan else postgres_scan
+        if table and table not in small_tables and table != 'CONSTANT' and not bounded:
+            problems.append(step)
+        elif SQLITE_SORT.match(step) or step in ('Sort', 'Incremental Sort'):
+            problems.append(step)
+    return problems
+
+
+@contextmanager
+def capture_plans(tables, connection=default_connection):
+    """
+    Collect the plans of the SELECTs on ``tables`` run inside the block
+    """
+    plans: list[QueryPlan] = []
+    pattern = re.compile(r'\b(?:%s)\b' % '|'.join(re.escape(table) for table in tables))
+    with CaptureQueriesContext(connection) as context:
+        yield plans
+    for query in context.captured_queries:
+        sql = query['sql']
+        if not sql.lstrip().upper().startswith('SELECT') or not pattern.search(sql):
+            continue
+        plan = explain(sql, connection)
+        plans.append(QueryPlan(sql, plan, plan_problems(plan, sql)))
+
+
+def seed_volumes(records: int = 2000, seed: int = 2207) -> dict[str, object]:
+    """
+    Users of every role and ``records`` financial requests, recruitments
+    and tasks spread over their statuses, then refresh the planner's
+    statistics. Returns the users and groups by role name.
+    """
+    generator = random.Random(seed)
+    groups = {
+        name: Group.objects.create(name=name)
+        for name in ('Financial Managers', 'HR', 'Service Manager', 'Subteam Photography', 'Subteam Production')
+    }
+    users = {}
+    for name, group in groups.items():
+        members = User.objects.bulk_create([
+            User(username=f'{name.lower().replace(" ", "_")}_{i}', is_staff=True) for i in range(10)
+        ])
+        group.user_set.add(*members)
+        users[name] = members
+    subteams = [groups['Subteam Photography'], groups['Subteam Production']]
+    managers = users['Service Manager']
+    departments = ['admin', 'services', 'production', 'financial']
+
+    FinancialRequest.objects.bulk_create([
+        FinancialRequest(
+            requesting_department=generator.choice(departments),
+            project_reference=f'P-{generator.randint(1, 500)}',
+            required_amount=generator.randint(100, 100000),
+            reason='Seeded',
+            anomaly_score=generator.random() * 4,
+            _status=generator.choice(['pending_financial_approval', 'approved', 'approved', 'approved', 'rejected']),
+        )
+        for _ in range(records)
+    ], batch_size=500)
+    Recruitment.objects.bulk_create([
+        Recruitment(
+            requester=generator.choice(managers),
+            requesting_department=generator.choice(departments),
+            contract_type=generator.choice(['full', 'part']),
+            years_of_experience=generator.randint(0, 20),
+            job_title=f'{generator.choice(["Photographer", "Chef", "Decorator", "Accountant"])} {generator.randint(1, 99)}',
+            job_description='Seeded',
+            _status=generator.choice(['pending_hr_approval', 'pending_manager_approval', 'approved', 'approved']),
+        )
+        for _ in range(records)
+    ], batch_size=500)
+    tasks = []
+    for _ in range(records):
+        group = generator.choice(subteams)
+        members = users[group.name]
+        tasks.append(Task(
+            project_ref=f'P-{generator.randint(1, 500)}',
+            description='Seeded',
+            sender=generator.choice(managers),
+            group=group,
+            assigned_to=generator.choice(members) if generator.random() < 0.8 else None,
+            priority=generator.choice(['h', 'm']),
+            _status=generator.choice(['pending_subteam_approval', 'pending_manager_approval', 'approved', 'approved']),
+        ))
+    Task.objects.bulk_create(tasks, batch_size=500)
+    with default_connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return {'users': users, 'groups': groups}
@@ -0,0 +1,310 @@
+"""
+The test runner set as TEST_RUNNER. Instead of migrating a new test
+database for every run it restores a snapshot of the migrated schema,
+hashes passwords with the fast TEST_PASSWORD_HASHERS, runs TEST_PARALLEL
+processes and reports where the time of the run went. Also the user
+and group factories the test suites share in ``setUpTestData``.
+"""
+import hashlib
+import sqlite3
+import time
+import unittest
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission, User
+from django.db import connections
+from django.test import override_settings
+from django.test.runner import (
+    DiscoverRunner, ParallelTestSuite, RemoteTestResult, RemoteTestRunner, get_max_test_processes, parallel_type,
+)
+from django.test.utils import get_unique_databases_and_mirrors
+
+from backups.online import online_backup
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+SLOWEST = 10
+
+
+@dataclass
+class TestTiming:
+    test_class: str
+    class_setup: float
+    setup: float
+    duration: float
+
+
+def snapshot_key() -> str:
+    """
+    Changes with any migration of any installed app, or with Django
+    """
+    digest = hashlib.sha256(django.get_version().encode())
+    for app_config in apps.get_app_configs():
+        for path in sorted((Path(app_config.path) / 'migrations').glob('*.py')):
+            digest.update(f'{app_config.label}/{path.name}'.encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def snapshot_path(alias: str, key: Optional[str] = None) -> Path:
+    directory = Path(getattr(settings, 'TEST_SNAPSHOT_DIR', Path(settings.BASE_DIR) / 'data' / 'test_snapshots'))
+    return directory / f'{alias}-{key or snapshot_key()}.sqlite3'
+
+
+def save_snapshot(alias: str, database_name: str) -> Path:
+    """
+    Copy the freshly migrated test database of ``alias`` and remove the
+    snapshots of older migrations
+    """
+    target = snapshot_path(alias)
+    online_backup(target, source=database_name, pause=0)
+    for stale in target.parent.glob(f'{alias}-*.sqlite3'):
+        if stale != target:
+            stale.unlink(missing_ok=True)
+    return target
+
+
+def restore_snapshot(path: Path, database_name: str) -> sqlite3.Connection:
+    """
+    Fill the in-memory test database from ``path``. The returned
+    connection keeps the database alive and must stay open until the
+    test databases are torn down.
+    """
+    keeper = sqlite3.connect(database_name, uri=True)
+    with closing(sqlite3.connect(path)) as snapshot:
+        snapshot.backup(keeper)
+    return keeper
+
+
+def create_user(username: str = 'testuser', password: str = 'testpass') -> User:
+    """
+    Create a staff user for testing, for ``setUpTestData``
+    """
+    return User.objects.create_user(username=username, password=password, is_staff=True)
+
+
+def create_group(group_name: str, permissions: Iterable[str] = ()) -> Group:
+    """
+    Create a group, or reuse one of that name, with exactly the given
+    permission codenames
+    """
+    group: Group = Group.objects.get_or_create(name=group_name)[0]
+    group.permissions.set(Permission.objects.filter(codename__in=permissions))
+    return group
+
+
+class TimedSetUp:
+    """
+    Stands in for the ``setUp`` of the running test and notes how long
+    it took
+    """
+    def __init__(self, test: unittest.TestCase):
+        self.test = test
+        self.seconds = 0.0
+
+    def __call__(self) -> None:
+        started = time.perf_counter()
+        try:
+            type(self.test).setUp(self.test)
+        finally:
+            self.seconds = time.perf_counter() - started
+
+
+class TimingMixin:
+    """
+    Times every test and the class set up (``setUpClass`` and
+    ``setUpTestData``) run before the first test of its class
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings: list[TestTiming] = []
+        self._last_stop = time.perf_counter()
+        self._last_class = None
+
+    def startTest(self, test):
+        now = time.perf_counter()
+        self._class_setup = now - self._last_stop if type(test) is not self._last_class else 0.0
+        self._last_class = type(test)
+        self._started = now
+        # Only for this run of this test, setUp is looked up on the
+        # instance before the class
+        self._set_up = test.setUp = TimedSetUp(test)
+        super().startTest(test)
+
+    def stopTest(self, test):
+        now = time.perf_counter()
+        vars(test).pop('setUp', None)
+        self.addTiming(test, self._class_setup, self._set_up.seconds, now - self._started)
+        super().stopTest(test)
+        self._last_stop = time.perf_counter()
+
+    def addTiming(self, test, class_setup: float, setup: float, duration: float) -> None:
+        self.timings.append(TestTiming(f'{type(test).__module__}.{type(test).__qualname__}', class_setup, setup, duration))
+
+
+class TimedTextTestResult(TimingMixin, unittest.TextTestResult):
+    pass
+
+
+class ParallelTimingResult(unittest.TextTestResult):
+    """
+    Collects the timings the worker processes send back
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings: list[TestTiming] = []
+
+    def addTiming(self, test, class_setup: float, setup: float, duration: float) -> None:
+        self.timings.append(TestTiming(f'{type(test).__module__}.{type(test).__qualname__}', class_setup, setup, duration))
+
+
+class TimedRemoteTestResult(TimingMixin, RemoteTestResult):
+    def addTiming(self, test, class_setup: float, setup: float, duration: float) -> None:
+        self.events.append(('addTiming', self.test_index, class_setup, setup, duration))
+
+
+class TimedRemoteTestRunner(RemoteTestRunner):
+    resultclass = TimedRemoteTestResult
+
+
+class TimedParallelTestSuite(ParallelTestSuite):
+    runner_class = TimedRemoteTestRunner
+
+
+def timing_report(timings: list[TestTiming], database_setup: float, total: float, slowest: int = SLOWEST) -> str:
+    """
+    The run time and the test classes with the most set up per test
+    """
+    classes: dict[str, list[TestTiming]] = {}
+    for timing in timings:
+        classes.setdefault(timing.test_class, []).append(timing)
+    tests = sum(timing.duration for timing in timings)
+    lines = [
+        f'{len(timings)} tests took {total:.2f}s: databases {database_setup:.2f}s, '
+        f'class set up {sum(t.class_setup for t in timings):.2f}s, tests {tests:.2f}s '
+        f'of which setUp {sum(t.setup for t in timings):.2f}s',
+    ]
+    rows = sorted(
+        (
+            (sum(t.class_setup + t.setup for t in runs) / len(runs), name, runs)
+            for name, runs in classes.items()
+        ),
+        key=lambda row: row[0],
+        reverse=True,
+    )[:slowest]
+    if rows:
+        lines.append(f'{"Set up per test":>15}  {"Tests":>5}  {"Class set up":>12}  {"Total":>7}  Test case')
+    for per_test, name, runs in rows:
+        lines.append(
+            f'{per_test * 1000:13.1f}ms  {len(runs):5}  {runs[0].class_setup:11.3f}s  '
+            f'{sum(t.class_setup + t.duration for t in runs):6.2f}s  {name}'
+        )
+    return '\n'.join(lines)
+
+
+class FastTestRunner(DiscoverRunner):
+    """
+    Runs the suite from a snapshot of the migrated schema, with fast
+    password hashing and TEST_PARALLEL processes, then reports timings
+    """
+    parallel_test_suite = TimedParallelTestSuite
+
+    def __init__(self, parallel=0, snapshot=True, **kwargs):
+        if parallel == 'auto':
+            parallel = get_max_test_processes()
+        super().__init__(parallel=parallel, **kwargs)
+        self.snapshot = snapshot
+        self.database_setup = 0.0
+        self.timings: list[TestTiming] = []
+        self._keepers: list[sqlite3.Connection] = []
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(parallel=parallel_type(str(getattr(settings, 'TEST_PARALLEL', 0))))
+        parser.add_argument(
+            '--no-snapshot',
+            action='store_false',
+            dest='snapshot',
+            help='Migrate the test databases instead of restoring the schema snapshot.',
+        )
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._hashers = override_settings(PASSWORD_HASHERS=getattr(settings, 'TEST_PASSWORD_HASHERS', PASSWORD_HASHERS))
+        self._hashers.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._hashers.disable()
+        super().teardown_test_environment(**kwargs)
+
+    def snapshot_databases(self, aliases) -> dict[str, str]:
+        """
+        The test database names by alias when every test database is an
+        in-memory SQLite one the snapshot can fill, otherwise nothing
+        """
+        if not self.snapshot or self.keepdb:
+            return {}
+        names = {}
+        test_databases, _ = get_unique_databases_and_mirrors(aliases)
+        for _, (_, database_aliases) in test_databases.items():
+            creation = connections[database_aliases[0]].creation
+            name = creation._get_test_db_name()
+            if (
+                connections[database_aliases[0]].vendor != 'sqlite'
+                or not creation.is_in_memory_db(name)
+                or creation.connection.settings_dict['TEST']['MIGRATE'] is False
+            ):
+                return {}
+            names[database_aliases[0]] = name
+        return names
+
+    def setup_databases(self, **kwargs):
+        started = time.perf_counter()
+        names = self.snapshot_databases(kwargs.get('aliases'))
+        snapshots = {alias: snapshot_path(alias) for alias in names}
+        restored = bool(names) and all(path.exists() for path in snapshots.values())
+        if restored:
+            self._keepers = [restore_snapshot(snapshots[alias], name) for alias, name in names.items()]
+            # The restored schema is only checked for unapplied migrations
+            self.keepdb = True
+        try:
+            old_config = super().setup_databases(**kwargs)
+        finally:
+            self.keepdb = False
+        if names and not restored:
+            for alias, name in names.items():
+                save_snapshot(alias, name)
+        self.database_setup = time.perf_counter() - started
+        return old_config
+
+    def teardown_databases(self, old_config, **kwargs):
+        super().teardown_databases(old_config, **kwargs)
+        for keeper in self._keepers:
+            keeper.close()
+        self._keepers = []
+
+    def get_resultclass(self):
+        return super().get_resultclass() or (ParallelTimingResult if self.parallel > 1 else TimedTextTestResult)
+
+    def run_suite(self, suite, **kwargs):
+        result = super().run_suite(suite, **kwargs)
+        self.timings = getattr(result, 'timings', [])
+        return result
+
+    def run_tests(self, test_labels, **kwargs):
+        started = time.perf_counter()
+        failures = super().run_tests(test_labels, **kwargs)
+        if self.verbosity >= 1 and self.timings:
+            self.log(timing_report(
+                self.timings,
+                self.database_setup,
+                time.perf_counter() - started,
+                getattr(settings, 'TEST_REPORT_SLOWEST', SLOWEST),
+            ))
+        return failures
@@ -0,0 +1,453 @@
+import sqlite3
+import tempfile
+import unittest
+from contextlib import closing
+from io import StringIO
+from pathlib import Path
+from typing import Optional
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission, User
+from django.db import NotSupportedError, connection, migrations, models, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.test import TestCase, TransactionTestCase
+
+from events.models import Event
+from financial.models import FinancialRequest
+from staff.models import Recruitment
+from tasks.models import Task
+from workflow.facets import facet_counts, rebuild_facet_counts
+from workflow.filters import cached_choices
+from workflow.models import BackfillProgress, ConcurrentUpdateError, FacetCount, WorkflowModel
+from workflow.operations import AddIndexConcurrently, Backfill, RebuildTableOnline
+from workflow.query_plans import capture_plans, seed_volumes
+from workflow.testing import TimedTextTestResult, create_group, create_user, restore_snapshot, timing_report
+
+APPROVERS = 20
+
+def create_records() -> list[WorkflowModel]:
+    """
+    Create one pending record of every workflow model
+    """
+    user: User = User.objects.create_user(username='testuser', password='testpass')
+    group: Group = Group.objects.create(name='Subteam')
+    return [
+        Event.objects.create(
+            client_name='Test Client',
+            event_type='Test Event',
+            from_date='2021-01-01',
+            to_date='2021-01-01',
+            attendes=100,
+            expected_budget=1000,
+        ),
+        FinancialRequest.objects.create(
+            requesting_department='financial',
+            project_reference='test',
+            required_amount=1000,
+        ),
+        Recruitment.objects.create(
+            requester=user,
+            requesting_department='admin',
+            years_of_experience=1,
+            job_title='test',
+            job_description='test',
+        ),
+        Task.objects.create(
+            project_ref='Test Project',
+            description='Test Description',
+            sender=user,
+            group=group,
+            assigned_to=user,
+        ),
+    ]
+
+class OptimisticConcurrencyTestCase(TestCase):
+    def test_parallel_approvers_advance_status_once(self):
+        """
+        Test that when many approvers load the same record and all of them
+        approve it, exactly one approval wins and the others conflict
+        """
+        for record in create_records():
+            model = type(record)
+            expected = model.objects.get(pk=record.pk)
+            expected.move_to_next_status()
+            approvers = [model.objects.get(pk=record.pk) for _ in range(APPROVERS)]
+            saved, conflicts = 0, 0
+            for approver in approvers:
+                try:
+                    with transaction.atomic():
+                        approver.save()
+                    saved += 1
+                except ConcurrentUpdateError:
+                    conflicts += 1
+            self.assertEqual(saved, 1, model.__name__)
+            self.assertEqual(conflicts, APPROVERS - 1, model.__name__)
+            record.refresh_from_db()
+            self.assertEqual(record.version, 1)
+            self.assertEqual(record._status, expected._status)
+
+    def test_sequential_saves_bump_version(self):
+        """
+        Test that saving a fresh copy keeps working and bumps the version
+        """
+        event: Event = create_records()[0]
+        self.assertEqual(event.version, 0)
+        event.save()
+        event.save()
+        event.refresh_from_db()
+        self.assertEqual(event.version, 2)
+        self.assertEqual(event._status, 'pending_admin_approval')
+
+    def test_deleted_record_is_not_a_conflict(self):
+        """
+        Test that saving a record that was deleted recreates it as before
+        """
+        event: Event = create_records()[0]
+        Event.objects.filter(pk=event.pk).delete()
+        event.save()
+        self.assertTrue(Event.objects.filter(pk=event.pk).exists())
+
+class FacetCountTestCase(TestCase):
+    def test_counts_follow_creates_changes_and_deletes(self):
+        """
+        Test that the counters track every save and delete
+        """
+        event, financial_request, recruitment, task = create_records()
+        self.assertEqual(facet_counts(Event, '_status'), {'pending_senior_approval': 1})
+        self.assertEqual(facet_counts(Recruitment, 'contract_type'), {'full': 1})
+        self.assertEqual(facet_counts(Task, 'group'), {str(task.group_id): 1})
+        event.save()
+        self.assertEqual(facet_counts(Event, '_status'), {'pending_senior_approval': 0, 'pending_finance_approval': 1})
+        financial_request.required_amount = 10
+        financial_request.save()
+        self.assertEqual(facet_counts(FinancialRequest, 'requesting_department'), {'financial': 1})
+        event.delete()
+        self.assertEqual(facet_counts(Event, '_status'), {'pending_senior_approval': 0, 'pending_finance_approval': 0})
+
+    def test_rebuild_matches_maintained_counts(self):
+        """
+        Test that recounting from scratch gives the incrementally maintained numbers
+        """
+        records = create_records()
+        for record in records:
+            record.save()
+        Event.objects.get().delete()
+        maintained = {
+            (count.model, count.field, count.value): count.count
+            for count in FacetCount.objects.exclude(count=0)
+        }
+        rebuild_facet_counts()
+        rebuilt = {
+            (count.model, count.field, count.value): count.count
+            for count in FacetCount.objects.all()
+        }
+        self.assertEqual(maintained, rebuilt)
+
+    def test_changelist_shows_counts(self):
+        """
+        Test that the list filters display the facet counts
+        """
+        create_records()
+        User.objects.create_superuser(username='admin', password='adminpass')
+        self.client.login(username='admin', password='adminpass')
+        response = self.client.get('/financial/financialrequest/')
+        self.assertContains(response, 'Pending Financial Approval (1)')
+        self.assertContains(response, 'Approved (0)')
+        self.assertContains(response, 'Financial (1)')
+        response = self.client.get('/tasks/task/')
+        self.assertContains(response, 'Subteam (1)')
+        self.assertContains(response, 'Medium (1)')
+
+    def test_scoped_changelist_hides_counts(self):
+        """
+        Test that a user who sees only some of the records is not shown the counts of all of them
+        """
+        task = create_records()[3]
+        other_group = Group.objects.create(name='Subteam Other')
+        Task.objects.create(project_ref='Other Project', description='Test', sender=task.sender, group=other_group)
+        user = create_user('subteamuser', 'subteampass')
+        user.groups.add(create_group('Subteam', ['change_task', 'view_task']))
+        self.client.force_login(user)
+        response = self.client.get('/tasks/task/')
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+        self.assertContains(response, 'Medium')
+        self.assertNotContains(response, 'Medium (')
+        self.assertContains(response, 'Subteam Other')
+        self.assertNotContains(response, 'Subteam Other (1)')
+
+class CachedChoicesTestCase(TestCase):
+    def test_choices_are_cached_until_groups_change(self):
+        """
+        Test that cached choices are computed once and recomputed after a group changes
+        """
+        calls = []
+        def choices():
+            calls.append(1)
+            return Group.objects.values_list('name', flat=True)
+        self.assertEqual(cached_choices('test', choices), [])
+        self.assertEqual(cached_choices('test', choices), [])
+        self.assertEqual(len(calls), 1)
+        Group.objects.create(name='Subteam')
+        self.assertEqual(cached_choices('test', choices), ['Subteam'])
+        self.assertEqual(len(calls), 2)
+
+
+def uppercase_names(apps, rows) -> None:
+    for row in rows:
+        row.name = row.name.upper()
+    type(rows[0]).objects.bulk_update(rows, ['name'])
+
+class OnlineMigrationTestCase(TransactionTestCase):
+    """
+    Runs the operations against a scratch table of the workflow app
+    """
+    def setUp(self) -> None:
+        self.state = MigrationLoader(connection).project_state()
+        self.apply(migrations.CreateModel('Widget', [
+            ('id', models.BigAutoField(primary_key=True)),
+            ('name', models.CharField(max_length=20)),
+            ('size', models.IntegerField(null=True)),
+        ], options={'db_table': 'workflow_test_widget'}))
+        self.addCleanup(self.drop_widgets)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO workflow_test_widget (name, size) VALUES (%s, %s)',
+                [(f'widget {i}', i if i % 3 else None) for i in range(1, 251)],
+            )
+
+    def drop_widgets(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS workflow_test_widget')
+
+    def apply(self, operation, atomic: bool = False) -> None:
+        new_state = self.state.clone()
+        operation.state_forwards('workflow', new_state)
+        with connection.schema_editor(atomic=atomic) as schema_editor:
+            operation.database_forwards('workflow', schema_editor, self.state, new_state)
+        self.state = new_state
+
+    def rows(self) -> list[tuple]:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT * FROM workflow_test_widget ORDER BY id')
+            return cursor.fetchall()
+
+    def test_rebuild_keeps_concurrent_writes(self):
+        """
+        Test that writes made while the shadow table is filled end up in the rebuilt table
+        """
+        def write(seconds):
+            with connection.cursor() as cursor:
+                cursor.execute("INSERT INTO workflow_test_widget (name, size) VALUES ('late', 1)")
+                cursor.execute("UPDATE workflow_test_widget SET name = 'changed' WHERE id = 240")
+                cursor.execute('DELETE FROM workflow_test_widget WHERE id = 245')
+
+        operation = RebuildTableOnline(migrations.AddField(
+            'widget', 'weight', models.IntegerField(default=7, db_index=True),
+        ), batch_size=100, pause=0.01)
+        with mock.patch('workflow.operations.time.sleep', side_effect=write) as sleep:
+            self.apply(operation)
+        self.assertEqual(sleep.call_count, 3)
+        rows = self.rows()
+        self.assertEqual(len(rows), 250 - 1 + 3)
+        self.assertEqual(rows[0], (1, 'widget 1', 1, 7))
+        self.assertIn((240, 'changed', None, 7), rows)
+        self.assertNotIn(245, [row[0] for row in rows])
+        with connection.cursor() as cursor:
+            self.assertNotIn('new__workflow_test_widget', connection.introspection.table_names(cursor))
+            constraints = connection.introspection.get_constraints(cursor, 'workflow_test_widget')
+        self.assertTrue(any(c['columns'] == ['weight'] and c['index'] for c in constraints.values()))
+
+    def test_interrupted_rebuild_cleans_up(self):
+        """
+        Test that a rebuild failing half way leaves the table as it was and writable
+        """
+        operation = RebuildTableOnline(migrations.AddField(
+            'widget', 'weight', models.IntegerField(default=7),
+        ), batch_size=100, pause=0.01)
+        with mock.patch('workflow.operations.time.sleep', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self.apply(operation)
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO workflow_test_widget (name) VALUES ('after')")
+            self.assertNotIn('new__workflow_test_widget', connection.introspection.table_names(cursor))
+        self.assertEqual(len(self.rows()[0]), 3)
+
+    def test_rebuild_to_not_null(self):
+        """
+        Test that making a column required fills its missing values with the default
+        """
+        self.apply(RebuildTableOnline(migrations.AlterField('widget', 'size', models.IntegerField(default=0))))
+        self.assertEqual([row[2] for row in self.rows()[:3]], [1, 2, 0])
+
+    def test_in_place_changes_are_left_to_sqlite(self):
+        """
+        Test that a nullable column without default is added without a rebuild
+        """
+        with mock.patch('workflow.operations.rebuild_table') as rebuild:
+            self.apply(RebuildTableOnline(migrations.AddField('widget', 'note', models.TextField(null=True))))
+        rebuild.assert_not_called()
+        self.assertEqual(self.rows()[0], (1, 'widget 1', 1, None))
+
+    def test_needs_non_atomic_migration(self):
+        """
+        Test that the operations refuse to run inside a transaction
+        """
+        with self.assertRaises(NotSupportedError):
+            self.apply(Backfill('widget', uppercase_names), atomic=True)
+
+    def test_backfill_resumes(self):
+        """
+        Test that a backfill interrupted after some batches continues after the last committed one
+        """
+        calls = []
+
+        def failing(apps, rows):
+            calls.append(rows[0].pk)
+            if len(calls) == 3:
+                raise RuntimeError('interrupted')
+            uppercase_names(apps, rows)
+
+        with self.assertRaises(RuntimeError):
+            self.apply(Backfill('widget', failing, batch_size=50, name='widgets'))
+        progress = BackfillProgress.objects.get(name='widgets')
+        self.assertEqual((progress.last_pk, progress.rows, progress.finished_at), (100, 100, None))
+        self.apply(Backfill('widget', uppercase_names, batch_size=50, name='widgets'))
+        self.assertTrue(all(row[1] == row[1].upper() for row in self.rows()))
+        self.assertIsNotNone(BackfillProgress.objects.get(name='widgets').finished_at)
+
+    def test_add_index_concurrently(self):
+        """
+        Test that the index is created, as a plain index on SQLite
+        """
+        self.apply(AddIndexConcurrently('widget', models.Index(fields=['size'], name='widget_size_idx')))
+        with connection.cursor() as cursor:
+            self.assertIn('widget_size_idx', connection.introspection.get_constraints(cursor, 'workflow_test_widget'))
+
+
+PLANNED_TABLES = ['financial_financialrequest', 'staff_recruitment', 'tasks_task']
+
+class QueryPlanTestCase(TestCase):
+    """
+    Checks the plans of the changelist and change view queries of every role
+    against seeded volumes
+    """
+    @classmethod
+    def setUpTestData(cls) -> None:
+        seeded = seed_volumes()
+        cls.users = {name: members[0] for name, members in seeded['users'].items()}
+        permissions = Permission.objects.filter(
+            content_type__app_label__in=['financial', 'staff', 'tasks'],
+            codename__in=[
+                f'{action}_{model}'
+                for action in ('view', 'change')
+                for model in ('financialrequest', 'recruitment', 'task')
+            ],
+        )
+        for group in seeded['groups'].values():
+            group.permissions.set(permissions)
+
+    def assertIndexedPlans(self, role: str, path: str, params: Optional[dict] = None) -> None:
+        self.client.force_login(self.users[role])
+        with capture_plans(PLANNED_TABLES) as plans:
+            response = self.client.get(path, params or {})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(plans)
+        for plan in plans:
+            self.assertFalse(plan.problems, f'{plan.sql}\n' + '\n'.join(plan.plan))
+
+    def test_financial_manager_changelist(self):
+        """
+        Test that the financial managers' changelist and search use the status index
+        """
+        self.assertIndexedPlans('Financial Managers', '/financial/financialrequest/')
+        self.assertIndexedPlans('Financial Managers', '/financial/financialrequest/', {'q': 'P-12'})
+
+    def test_hr_changelist(self):
+        """
+        Test that the HR changelist and search use the status index
+        """
+        self.assertIndexedPlans('HR', '/staff/recruitment/')
+        self.assertIndexedPlans('HR', '/staff/recruitment/', {'q': 'Chef'})
+
+    def test_service_manager_changelists(self):
+        """
+        Test that the service manager's changelists only read the page they show
+        """
+        self.assertIndexedPlans('Service Manager', '/staff/recruitment/')
+        self.assertIndexedPlans('Service Manager', '/tasks/task/')
+
+    def test_subteam_changelist(self):
+        """
+        Test that a subteam member's tasks are found through indexes
+        """
+        self.assertIndexedPlans('Subteam Photography', '/tasks/task/')
+        self.assertIndexedPlans('Subteam Photography', '/tasks/task/', {'q': 'P-1'})
+
+    def test_change_views(self):
+        """
+        Test that opening a visible record looks it up by key
+        """
+        request = FinancialRequest.objects.filter(_status='pending_financial_approval').first()
+        self.assertIndexedPlans('Financial Managers', f'/financial/financialrequest/{request.pk}/change/')
+        task = Task.objects.filter(assigned_to=self.users['Subteam Photography']).first()
+        self.assertIndexedPlans('Subteam Photography', f'/tasks/task/{task.pk}/change/')
+
+class TestRunnerTestCase(TestCase):
+    def test_shared_factories(self):
+        """
+        Test that the shared group factory grants exactly the given permissions, also to an existing group
+        """
+        user = create_user()
+        user.groups.add(create_group('Service Manager', ['add_task', 'change_recruitment']))
+        create_group('Service Manager', ['view_task', 'change_financialrequest'])
+        user = User.objects.get(pk=user.pk)
+        self.assertTrue(user.is_staff)
+        self.assertEqual(user.get_all_permissions(), {'tasks.view_task', 'financial.change_financialrequest'})
+
+    def test_fast_password_hasher(self):
+        """
+        Test that passwords are hashed with the test profile's hasher
+        """
+        self.assertTrue(make_password('secret').startswith('md5$'))
+
+    def test_timings(self):
+        """
+        Test that the class set up is counted once, before the first test of its class
+        """
+        class Sample(unittest.TestCase):
+            def setUp(self):
+                self.value = 1
+
+            def test_one(self):
+                pass
+
+            def test_two(self):
+                pass
+
+        result = TimedTextTestResult(unittest.runner._WritelnDecorator(StringIO()), False, 0)
+        unittest.TestSuite([Sample('test_one'), Sample('test_two')]).run(result)
+        self.assertEqual(len(result.timings), 2)
+        self.assertTrue(result.timings[0].test_class.endswith('Sample'))
+        self.assertEqual(result.timings[1].class_setup, 0.0)
+        self.assertTrue(all(timing.duration >= timing.setup > 0 for timing in result.timings))
+        report = timing_report(result.timings, database_setup=0.1, total=1.0)
+        self.assertIn('2 tests took 1.00s', report)
+        self.assertIn('Sample', report.splitlines()[-1])
+
+    def test_restore_snapshot(self):
+        """
+        Test that a snapshot fills an in-memory database that lives as long as the returned connection
+        """
+        path = Path(tempfile.mkdtemp()) / 'snapshot.sqlite3'
+        with closing(sqlite3.connect(path)) as snapshot:
+            snapshot.execute('CREATE TABLE widget (name TEXT)')
+            snapshot.execute("INSERT INTO widget VALUES ('restored')")
+            snapshot.commit()
+        name = 'file:workflow_test_snapshot?mode=memory&cache=shared'
+        with closing(restore_snapshot(path, name)):
+            with closing(sqlite3.connect(name, uri=True)) as database:
+                self.assertEqual(database.execute('SELECT name FROM widget').fetchall(), [('restored',)])
+        with closing(sqlite3.connect(name, uri=True)) as database:
+            with self.assertRaises(sqlite3.OperationalError):
+                database.execute('SELECT name FROM widget')